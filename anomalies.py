@@ -0,0 +1,154 @@
+import numpy as np
+import pandas as pd
+
+from row_index import period_keys, period_label
+
+# Company-wide detection of sharp drops in each employee's monthly series.
+# The fact table is sorted once by (employee_id, period); every per-employee
+# statistic is then a vectorized transform over contiguous groups: shifts for
+# month-over-month deltas, cumulative sums for trailing means, and group sums
+# for leave-one-out standard deviations. No Python loop runs per employee.
+
+# Metrics checked for drops, with the smallest drop below the trailing mean worth flagging
+ANOMALY_METRICS = {'completion_rate': 0.10, 'quality_score': 0.3}
+DEFAULT_WINDOW = 3
+DEFAULT_Z_THRESHOLD = 2.0
+
+
+def _group_layout(employee_ids):
+    starts = np.flatnonzero(np.concatenate([[True], employee_ids[1:] != employee_ids[:-1]]))
+    lengths = np.diff(np.append(starts, len(employee_ids)))
+    group = np.repeat(np.arange(len(starts)), lengths)
+    return starts, lengths, group, np.arange(len(employee_ids)) - starts[group]
+
+
+# Function to compute trailing means, deltas and z-scores of one metric per employee
+def metric_signals(values, starts, lengths, group, position, window=DEFAULT_WINDOW):
+    """
+    `values` must be sorted by employee and period. Returns a dict of arrays aligned with it:
+    'previous' and 'delta' (month over month), 'rolling_mean' (mean of the previous `window`
+    periods), and 'z_score' of the value against the rolling mean, scaled by the standard
+    deviation of the employee's other periods.
+    """
+    previous = np.roll(values, 1)
+    previous[position == 0] = np.nan
+
+    # Missing values count as neither value nor observation
+    observed = np.isfinite(values)
+    filled = np.where(observed, values, 0.0)
+
+    def earlier_in_group(series):
+        running = np.cumsum(series) - series
+        return running - running[starts][group]
+
+    # Sum and count of the previous `window` periods of the same employee
+    before, before_count = earlier_in_group(filled), earlier_in_group(observed.astype(float))
+    trailing_sum, trailing_count = before.copy(), before_count.copy()
+    lagged = np.flatnonzero(position >= window)
+    trailing_sum[lagged] -= before[lagged - window]
+    trailing_count[lagged] -= before_count[lagged - window]
+
+    # Standard deviation of the employee's other periods (leave one out)
+    sums = np.add.reduceat(filled, starts)[group] - filled
+    squares = np.add.reduceat(filled * filled, starts)[group] - filled * filled
+    others = np.add.reduceat(observed.astype(float), starts)[group] - observed
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rolling_mean = trailing_sum / trailing_count
+        variance = (squares - sums * sums / others) / (others - 1)
+        z_score = (values - rolling_mean) / np.sqrt(np.clip(variance, 0, None))
+    z_score[~np.isfinite(z_score)] = np.nan
+
+    return {
+        'previous': previous,
+        'delta': values - previous,
+        'rolling_mean': rolling_mean,
+        'z_score': z_score
+    }
+
+
+# Function to flag sharp drops across every employee's time series
+def detect_anomalies(performance_data, metrics=None, window=DEFAULT_WINDOW, z_threshold=DEFAULT_Z_THRESHOLD):
+    """
+    Flag the employee-periods whose metric fell at least `z_threshold` standard deviations
+    and the metric's minimum drop (see ANOMALY_METRICS) below the trailing mean.
+    Returns one row per flag, most severe first, or None without employee/period columns.
+    """
+    required = {'employee_id', 'year', 'month'}
+    if not required.issubset(performance_data.columns):
+        return None
+
+    metrics = {metric: min_drop for metric, min_drop in (ANOMALY_METRICS if metrics is None else metrics).items()
+               if metric in performance_data.columns}
+    details = [col for col in ['name', 'department', 'position'] if col in performance_data.columns]
+    columns = ['employee_id'] + details + ['period', 'period_key', 'metric', 'value', 'previous', 'delta',
+                                           'rolling_mean', 'z_score']
+
+    if performance_data.empty:
+        return pd.DataFrame(columns=columns)
+
+    keys = period_keys(performance_data).to_numpy(dtype=float)
+    employee_ids = performance_data['employee_id'].to_numpy()
+    # Merged frames usually come ordered by employee and period already
+    same_employee = employee_ids[1:] == employee_ids[:-1]
+    if np.all(employee_ids[1:] >= employee_ids[:-1]) and np.all(keys[1:][same_employee] >= keys[:-1][same_employee]):
+        order = np.arange(len(employee_ids))
+    else:
+        order = np.lexsort((keys, employee_ids))
+    starts, lengths, group, position = _group_layout(employee_ids[order])
+
+    flags = []
+    for metric, min_drop in metrics.items():
+        values = performance_data[metric].to_numpy(dtype=float)[order]
+        signals = metric_signals(values, starts, lengths, group, position, window)
+
+        drop = values - signals['rolling_mean']
+        flagged = np.flatnonzero((signals['z_score'] <= -z_threshold) & (drop <= -min_drop))
+        if flagged.size == 0:
+            continue
+
+        rows = order[flagged]
+        flags.append(pd.DataFrame({
+            'employee_id': employee_ids[rows],
+            'period_key': keys[rows],
+            'metric': metric,
+            'value': values[flagged],
+            'previous': signals['previous'][flagged],
+            'delta': signals['delta'][flagged],
+            'rolling_mean': signals['rolling_mean'][flagged],
+            'z_score': signals['z_score'][flagged],
+            'row': rows
+        }))
+
+    if not flags:
+        return pd.DataFrame(columns=columns)
+
+    anomalies = pd.concat(flags, ignore_index=True).sort_values('z_score', kind='stable')
+    for col in details:
+        anomalies[col] = performance_data[col].to_numpy()[anomalies['row'].to_numpy()]
+    anomalies['period'] = anomalies['period_key'].map({key: period_label(key) for key in anomalies['period_key'].unique()})
+
+    return anomalies[columns].reset_index(drop=True)
+
+
+# Function to rank employees by their most severe flagged drop
+def rank_flagged_employees(anomalies):
+    """
+    One row per flagged employee: the worst flag, the number of flags and the
+    metrics involved, ordered from the most severe drop.
+    """
+    if anomalies is None or anomalies.empty:
+        return anomalies
+
+    # Flags are sorted by severity, so the first flag of every employee is their worst
+    worst = anomalies.drop_duplicates('employee_id', keep='first').set_index('employee_id')
+    worst['flags'] = anomalies['employee_id'].value_counts()
+
+    # List the flagged metrics with one membership test per metric rather than per employee
+    metric_names = pd.Series('', index=worst.index)
+    for metric in sorted(anomalies['metric'].unique()):
+        has_metric = worst.index.isin(anomalies.loc[anomalies['metric'] == metric, 'employee_id'])
+        metric_names[has_metric] = metric_names[has_metric].where(metric_names[has_metric] == '', metric_names[has_metric] + ', ') + metric
+    worst['metrics'] = metric_names
+
+    return worst
@@ -1,14 +1,42 @@
 import streamlit as st
 import pandas as pd
-import sqlite3
 import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
 import numpy as np
 import os
-import requests
-import json
 import re
-from io import BytesIO
+import hashlib
+from concurrent.futures import wait
+from io import BytesIO, StringIO
+from anomalies import ANOMALY_METRICS, DEFAULT_WINDOW, DEFAULT_Z_THRESHOLD, detect_anomalies, rank_flagged_employees
+from chart_data import bin_histogram, downsample_series, histogram_figure, render_mode
+from cohorts import COHORT_GRANULARITIES, cohort_matrix, cohort_rollup
+from cube import cube_metrics, rollup
+from dashboards import (
+    DEFAULT_TOP_N, dashboard_version, overview_kpis, read_dashboard_snapshot, slice_key, start_snapshot_job
+)
+from demo import DEFAULT_DEMO_EMPLOYEES, DEMO_SCALES, build_demo_data, demo_fingerprint, is_demo_fingerprint
+from engines import get_engine
+from export import EXPORT_DOWNLOAD_MAX_MB, EXPORT_MIME_TYPES, export_formats, export_table
+from figures import approximate_department_figure, get_figure, preload_figures, top_performers_figure
+from hierarchy import direct_reports, manager_ids, org_members, org_rollup
+from insights import generate_ai_insights, query_groq_api, set_api_key
+from ingest import (
+    DB_PATH_ROOT, estimate_row_count, file_fingerprint, has_snapshot, load_data_cached, load_databases, load_snapshot,
+    read_watermarks, refresh_data, resolve_db_paths, spool_upload
+)
+from performance import build_processed_state, filter_by_department, filter_rows, load_out_of_core, refresh_processed_state
+from ranking import RANK_METRICS, leaderboard, leaderboard_for_rows
+from registry import acquire, acquire_in_background, registry_stats
+from row_index import date_key, period_keys, period_label
+from sampling import (
+    FIRST_PAINT_SECONDS, PROGRESSIVE_MIN_ROWS, REFINE_POLL_SECONDS, approximate_department_performance, approximate_kpis,
+    row_weights, stratified_sample, stratified_sample_sqlite, unit_totals
+)
+from skills import (
+    RANK_COLUMNS, SKILLS_TABLE, TRAINING_TABLE, build_skill_index, build_training_index, match_employees, rank_matches
+)
 
 # Set page configuration
 st.set_page_config(
@@ -56,203 +84,578 @@ st.markdown("""
 
 # Groq API details
 GROQ_API_KEY = st.secrets.get("GROQ_API_KEY", "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")
-MODEL = "llama-3.3-70b-versatile"
+set_api_key(GROQ_API_KEY)
+
+# Maximum number of employees listed in the Individual Performance selector
+MAX_EMPLOYEE_OPTIONS = 1000
+
+# Engine that merges and aggregates the data (PERFORMX_ENGINE: pandas, duckdb or polars)
+analytics_engine = get_engine()
 
 # Title
 st.markdown("<h1 class='main-header'>PerformX - Employee Performance Tracker</h1>", unsafe_allow_html=True)
 
-# Function to extract data from SQLite database
-def load_data(db_file):
-    try:
-        conn = sqlite3.connect(db_file)
-        
-        # Get list of all tables
-        cursor = conn.cursor()
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-        tables = cursor.fetchall()
-        
-        # Create a dictionary to store dataframes
-        data_dict = {}
-        
-        # Load each table into a dataframe
-        for table in tables:
-            table_name = table[0]
-            data_dict[table_name] = pd.read_sql_query(f"SELECT * FROM {table_name}", conn)
-        
-        conn.close()
-        return data_dict, None
-    except Exception as e:
-        return None, str(e)
-
-# Function to analyze employee performance
-def analyze_performance(employee_data, metrics_data):
+# Function to get the processed artifacts for the current dataset
+def get_processed_state(data_dict, employee_table, performance_table, dataset_fingerprint, dataset_refresh=None,
+                        progressive=False, performance_data=None):
     """
-    Analyze employee performance based on available metrics
-    This is a simplified version - in a real app, more complex analysis would be done
+    Merge and aggregate the selected tables once per dataset and share the results with every
+    session on the same dataset through the registry. View and filter changes reuse them; a new
+    upload or table selection invalidates them.
+    After an incremental refresh only the appended rows are merged and aggregated.
+    With `progressive`, they are built in the background and None is returned until they are ready.
+    `performance_data` passes the selected tables already merged (e.g. by DuckDB from the upload).
     """
-    # Merge employee data with metrics
-    if 'employee_id' in employee_data.columns and 'employee_id' in metrics_data.columns:
-        performance_data = pd.merge(
-            employee_data, 
-            metrics_data, 
-            on='employee_id', 
-            how='inner'
-        )
+    state_key = (dataset_fingerprint, employee_table, performance_table)
+    
+    if dataset_fingerprint is None:
+        return build_processed_state(data_dict[employee_table], data_dict[performance_table], key=state_key,
+                                     engine=analytics_engine, performance_data=performance_data)
+    
+    lease = st.session_state.get('processed_lease')
+    if lease is not None and lease.key == ('processed',) + state_key:
+        return lease.value
+    
+    previous = lease.value if lease is not None else None
+    
+    def build():
+        if (
+            dataset_refresh is not None and previous is not None
+            and previous['key'] == (dataset_refresh['from'], employee_table, performance_table)
+        ):
+            processed = refresh_processed_state(
+                previous,
+                data_dict[employee_table],
+                data_dict[performance_table],
+                dataset_refresh['new_rows'].get(performance_table),
+                key=state_key,
+                engine=analytics_engine
+            )
+            if processed is not None:
+                return processed, None
         
-        # Calculate additional metrics (example)
-        if 'tasks_completed' in performance_data.columns and 'tasks_assigned' in performance_data.columns:
-            performance_data['completion_rate'] = (
-                performance_data['tasks_completed'] / performance_data['tasks_assigned']
-            ).fillna(0)
-            
-        if 'working_hours' in performance_data.columns and 'tasks_completed' in performance_data.columns:
-            performance_data['productivity'] = (
-                performance_data['tasks_completed'] / performance_data['working_hours']
-            ).fillna(0)
-            
-        return performance_data
+        return build_processed_state(data_dict[employee_table], data_dict[performance_table], key=state_key,
+                                     engine=analytics_engine, performance_data=performance_data), None
+    
+    if progressive:
+        # Build in the background; the caller shows sample estimates until this rerun finds it done
+        job = st.session_state.get('processing_job')
+        if job is None or job['key'] != ('processed',) + state_key:
+            job = {'key': ('processed',) + state_key, 'future': acquire_in_background(('processed',) + state_key, build)}
+            st.session_state['processing_job'] = job
+        wait([job['future']], timeout=FIRST_PAINT_SECONDS)
+        if not job['future'].done():
+            return None
+        new_lease, _ = job['future'].result()
+        del st.session_state['processing_job']
     else:
-        # Return basic employee data if metrics cannot be merged
-        return employee_data
-
-# Function to get department performance
-def get_department_performance(performance_data):
-    if 'department' not in performance_data.columns:
-        return None
+        new_lease, _ = acquire(('processed',) + state_key, build)
+    if lease is not None:
+        lease.release()
+    st.session_state['processed_lease'] = new_lease
     
-    # Group by department and calculate averages
-    dept_performance = performance_data.groupby('department').agg({
-        'tasks_completed': 'sum',
-        'tasks_assigned': 'sum',
-        'working_hours': 'sum',
-        'productivity': 'mean',
-        'completion_rate': 'mean'
-    }).reset_index()
-    
-    # Calculate department completion rate
-    dept_performance['dept_completion_rate'] = (
-        dept_performance['tasks_completed'] / dept_performance['tasks_assigned']
-    ).fillna(0)
-    
-    return dept_performance
+    return new_lease.value
 
-# Function to query Groq API for AI insights
-def query_groq_api(prompt):
-    try:
-        url = "https://api.groq.com/openai/v1/chat/completions"
-        headers = {
-            "Authorization": f"Bearer {GROQ_API_KEY}",
-            "Content-Type": "application/json"
-        }
-        payload = {
-            "model": MODEL,
-            "messages": [{"role": "user", "content": prompt}]
-        }
-        response = requests.post(url, headers=headers, data=json.dumps(payload))
-        return response.json().get("choices", [{}])[0].get("message", {}).get("content", "No response from AI.")
-    except Exception as e:
-        return f"Error querying AI: {str(e)}"
+# Function to get the stratified sample of the current dataset
+def get_progressive_sample(data_dict, employee_table, performance_table, dataset_fingerprint, db_path=None):
+    """
+    With `db_path` (the saved upload) the sample is drawn in SQL from the file, so it needs
+    neither the loaded tables nor a scan of the performance table in memory.
+    """
+    key = ('sample', dataset_fingerprint, employee_table, performance_table)
+    
+    def draw():
+        if db_path is not None:
+            return stratified_sample_sqlite(db_path, employee_table, performance_table, immutable=True), None
+        return stratified_sample(data_dict[employee_table], data_dict[performance_table]), None
+    
+    lease = st.session_state.get('sample_lease')
+    if lease is None or lease.key != key:
+        new_lease, _ = acquire(key, draw)
+        if lease is not None:
+            lease.release()
+        lease = st.session_state['sample_lease'] = new_lease
+    
+    return lease.value
 
-# Function to generate AI performance insights
-def generate_ai_insights(employee_data, performance_data, employee_name=None, department=None):
-    if employee_name:
-        # Filter data for specific employee
-        emp_data = performance_data[performance_data['name'] == employee_name]
-        
-        if emp_data.empty:
-            return "No data available for this employee."
-        
-        # Create prompt for individual employee
-        prompt = f"""
-        Analyze the following employee's performance:
-        
-        Name: {employee_name}
-        Department: {emp_data.iloc[0].get('department', 'N/A')}
-        Position: {emp_data.iloc[0].get('position', 'N/A')}
-        
-        Performance metrics:
-        - Tasks assigned: {emp_data['tasks_assigned'].sum()}
-        - Tasks completed: {emp_data['tasks_completed'].sum()}
-        - Completion rate: {(emp_data['tasks_completed'].sum() / emp_data['tasks_assigned'].sum() * 100):.1f}%
-        - Average working hours: {emp_data['working_hours'].mean():.1f}
-        - Average quality score: {emp_data['quality_score'].mean():.2f}/5.0
-        - Average review score: {emp_data['review_score'].mean():.2f}/5.0
-        
-        Provide a concise professional performance analysis with 3-4 specific insights, strengths, and areas for improvement.
-        Format your response with bullet points where appropriate. Keep it under 300 words.
-        """
-        
-        return query_groq_api(prompt)
+# Function to load a large upload in the background, sampling it straight from the file first
+def load_tables_progressively(uploaded_file, dataset_fingerprint, load_tables):
+    """
+    Spool the upload to disk and, when its performance table is large, draw the stratified
+    sample from the file (see get_progressive_sample) and load the tables in the background.
+    Returns (lease, error) like acquire, or (None, None) while the tables are still loading.
+    `load_tables(db_path)` loads the tables from the spooled file.
+    """
+    key = ('tables', dataset_fingerprint)
+    job = st.session_state.get('loading_job')
     
-    elif department:
-        # For department analysis
-        dept_data = performance_data[performance_data['department'] == department]
-        
-        if dept_data.empty:
-            return "No data available for this department."
-        
-        prompt = f"""
-        Analyze the following department performance:
+    if job is None or job['key'] != key:
+        db_path, _ = spool_upload(uploaded_file)
         
-        Department: {department}
-        Number of employees: {len(dept_data['name'].unique())}
+        def load():
+            try:
+                return load_tables(db_path)
+            finally:
+                os.remove(db_path)
         
-        Department metrics:
-        - Tasks assigned: {dept_data['tasks_assigned'].sum()}
-        - Tasks completed: {dept_data['tasks_completed'].sum()}
-        - Completion rate: {(dept_data['tasks_completed'].sum() / dept_data['tasks_assigned'].sum() * 100):.1f}%
-        - Average working hours: {dept_data['working_hours'].mean():.1f}
-        - Average quality score: {dept_data['quality_score'].mean():.2f}/5.0
-        - Average review score: {dept_data['review_score'].mean():.2f}/5.0
+        if estimate_row_count(db_path, 'performance_metrics', immutable=True) < PROGRESSIVE_MIN_ROWS:
+            return acquire(key, load)
+        try:
+            get_progressive_sample(None, 'employees', 'performance_metrics', dataset_fingerprint, db_path)
+        except Exception:
+            # Tables the sample cannot be drawn from (e.g. without employee_id) are loaded as usual
+            return acquire(key, load)
         
-        Provide a concise professional department performance analysis with 3-4 key insights, strengths, and areas for improvement.
-        Format your response with bullet points where appropriate. Keep it under 300 words.
-        """
-        
-        return query_groq_api(prompt)
+        job = {'key': key, 'future': acquire_in_background(key, load)}
+        st.session_state['loading_job'] = job
     
-    else:
-        # For overall performance
-        prompt = f"""
-        Analyze the following overall company performance:
-        
-        Number of employees: {len(performance_data['name'].unique())}
-        Number of departments: {len(performance_data['department'].unique())}
-        
-        Overall metrics:
-        - Tasks assigned: {performance_data['tasks_assigned'].sum()}
-        - Tasks completed: {performance_data['tasks_completed'].sum()}
-        - Completion rate: {(performance_data['tasks_completed'].sum() / performance_data['tasks_assigned'].sum() * 100):.1f}%
-        - Average working hours: {performance_data['working_hours'].mean():.1f}
-        - Average quality score: {performance_data['quality_score'].mean():.2f}/5.0
-        - Average review score: {performance_data['review_score'].mean():.2f}/5.0
+    wait([job['future']], timeout=FIRST_PAINT_SECONDS)
+    if not job['future'].done():
+        return None, None
+    del st.session_state['loading_job']
+    return job['future'].result()
+
+# Function to show the estimates from the stratified sample while the exact figures are computed
+def show_sample_estimates(sample, value_filters, range_filters, job_name, waiting_message):
+    """
+    Render approximate KPIs, department charts and distributions, and rerun the page once the
+    background job in st.session_state[`job_name`] is done.
+    """
+    sample_rows, _ = filter_rows(sample, value_filters, range_filters)
+    units = unit_totals(sample, sample_rows)
+    kpis = approximate_kpis(units)
+    
+    st.markdown("<h2 class='sub-header'>Key Performance Metrics</h2>", unsafe_allow_html=True)
+    st.badge("Approximate", icon=":material/hourglass_top:", color="orange")
+    st.caption(f"Estimated from {sample['sampled']:,} of {sample['population']:,} employees, sampled per "
+               "department; ± is the 95% confidence interval. Exact values replace these once the full "
+               "dataset is aggregated.")
+    
+    kpi_specs = [
+        ("Total Employees", 'employees', "{:,.0f}", "{:,.0f}"),
+        ("Task Completion Rate", 'completion_rate', "{:.1f}%", "{:.1f}"),
+        ("Avg. Quality Score", 'quality_score', "{:.2f}/5.0", "{:.3f}"),
+        ("Avg. Review Score", 'review_score', "{:.2f}/5.0", "{:.3f}")
+    ]
+    for column, (label, kpi, value_format, ci_format) in zip(st.columns(4), kpi_specs):
+        with column:
+            if kpis[kpi] is not None:
+                estimate, half_width = kpis[kpi]
+                st.metric(label, f"~{value_format.format(estimate)} ± {ci_format.format(half_width)}")
+            else:
+                st.metric(label, "N/A")
+    
+    estimates = approximate_department_performance(units)
+    if estimates is not None and not estimates.empty:
+        st.markdown("<h2 class='sub-header'>Department Performance</h2>", unsafe_allow_html=True)
+        col1, col2 = st.columns(2)
+        with col1:
+            fig = approximate_department_figure(
+                estimates, 'dept_completion_rate', 'Task Completion Rate by Department (estimated)',
+                'Completion Rate', '.1%'
+            )
+            st.plotly_chart(fig, use_container_width=True)
+        with col2:
+            fig = approximate_department_figure(
+                estimates, 'dept_productivity', 'Productivity by Department (estimated)', 'Productivity', '.2f'
+            )
+            st.plotly_chart(fig, use_container_width=True)
+    
+    # Histograms count every sampled row for the employees it stands for
+    weights = row_weights(sample, sample_rows)
+    histogram_columns = [col for col in ['quality_score', 'productivity'] if col in sample_rows.columns]
+    if histogram_columns and not sample_rows.empty:
+        st.markdown("<h2 class='sub-header'>Distributions</h2>", unsafe_allow_html=True)
+        for column, col in zip(st.columns(len(histogram_columns)), histogram_columns):
+            with column:
+                label = col.replace('_', ' ').title()
+                fig = histogram_figure(
+                    bin_histogram(sample_rows[col], nbins=20, weights=weights),
+                    f'{label} Distribution (estimated)',
+                    label
+                )
+                st.plotly_chart(fig, use_container_width=True)
+    
+    # Rerun the page as soon as the exact aggregates are ready
+    @st.fragment(run_every=REFINE_POLL_SECONDS)
+    def refine_when_ready():
+        job = st.session_state.get(job_name)
+        if job is None or job['future'].done():
+            st.rerun(scope="app")
+        st.caption(waiting_message)
+    
+    refine_when_ready()
+
+# Function to get the sidebar filter choices for the current dataset
+def get_filter_options(data_dict, employee_table, performance_table, dataset_fingerprint, cube=None):
+    """
+    Collect the departments, positions, join date bounds and periods once per dataset
+    so the sidebar does not rescan the tables on every rerun. Periods come from `cube`
+    when the performance table was not loaded (large file mode).
+    """
+    state_key = (dataset_fingerprint, employee_table, performance_table)
+    options = st.session_state.get('filter_options')
+    
+    if dataset_fingerprint is None or options is None or options['key'] != state_key:
+        employees = data_dict.get(employee_table, pd.DataFrame())
+        metrics = data_dict.get(performance_table, pd.DataFrame())
+        options = {'key': state_key, 'departments': [], 'positions': [], 'join_dates': None, 'periods': []}
         
-        Provide a concise professional company performance analysis with 3-4 key insights, strengths, and areas for improvement.
-        Format your response with bullet points where appropriate. Keep it under 300 words.
-        """
+        if 'department' in employees.columns:
+            options['departments'] = sorted(employees['department'].dropna().unique().tolist())
+        if 'position' in employees.columns:
+            options['positions'] = sorted(employees['position'].dropna().unique().tolist())
+        if 'join_date' in employees.columns:
+            join_dates = pd.to_datetime(employees['join_date'], errors='coerce').dropna()
+            if not join_dates.empty:
+                options['join_dates'] = (join_dates.min().date(), join_dates.max().date())
+        if 'year' in metrics.columns and 'month' in metrics.columns:
+            options['periods'] = sorted(int(key) for key in period_keys(metrics).dropna().unique())
+        if not options['periods'] and cube is not None:
+            options['periods'] = sorted(int(key) for key in cube.index.get_level_values('period').dropna().unique())
         
-        return query_groq_api(prompt)
+        st.session_state['filter_options'] = options
+    
+    return options
+
+# Function to get the skill and training indexes for the current dataset
+def get_skill_indexes(data_dict, dataset_fingerprint):
+    def build():
+        return {
+            'skills': build_skill_index(data_dict[SKILLS_TABLE]) if SKILLS_TABLE in data_dict else None,
+            'training': build_training_index(data_dict[TRAINING_TABLE]) if TRAINING_TABLE in data_dict else None
+        }, None
+    
+    if dataset_fingerprint is None:
+        indexes, _ = build()
+        return indexes['skills'], indexes['training']
+    
+    lease = st.session_state.get('skill_lease')
+    if lease is None or lease.key != ('skills', dataset_fingerprint):
+        new_lease, _ = acquire(('skills', dataset_fingerprint), build)
+        if lease is not None:
+            lease.release()
+        lease = st.session_state['skill_lease'] = new_lease
+    
+    return lease.value['skills'], lease.value['training']
+
+# Function to get the flagged performance drops for the current dataset and settings
+def get_anomalies(processed, metrics, window, z_threshold):
+    key = (processed['key'], metrics, window, z_threshold)
+    cached = st.session_state.get('anomalies')
+    
+    if processed['key'][0] is None or cached is None or cached['key'] != key:
+        anomalies = detect_anomalies(
+            processed['performance_data'],
+            {metric: ANOMALY_METRICS[metric] for metric in metrics},
+            window,
+            z_threshold
+        )
+        cached = {'key': key, 'anomalies': anomalies}
+        st.session_state['anomalies'] = cached
+    
+    return cached['anomalies']
+
+# Function to get the pre-rendered dashboard snapshot of the current dataset
+def get_dashboard_snapshot(processed, table_filters, enable_ai):
+    """
+    Lease the snapshot of the dataset version, read from disk once per process. When the
+    version has none yet, the job rendering it is started in the background and None is
+    returned, so the views are computed live until it is written.
+    """
+    # Demo datasets stay in memory, so they are never snapshotted to disk
+    if processed['key'][0] is None or processed['performance_data'] is None or is_demo_fingerprint(processed['key'][0]):
+        return None
+    
+    version = dashboard_version(processed['key'])
+    lease = st.session_state.get('dashboard_lease')
+    if lease is not None and lease.key == ('dashboard', version):
+        return lease.value
+    
+    def load():
+        snapshot = read_dashboard_snapshot(version)
+        return (snapshot, None) if snapshot is not None else (None, "No dashboard snapshot")
+    
+    new_lease, _ = acquire(('dashboard', version), load)
+    if lease is not None:
+        lease.release()
+    st.session_state['dashboard_lease'] = new_lease
+    
+    if new_lease is None:
+        start_snapshot_job(processed, generate_ai_insights if enable_ai else None)
+        return None
     
+    # Department charts are then served from the snapshot by get_figure
+    preload_figures(processed['key'][0], table_filters, new_lease.value['figures'])
+    return new_lease.value
+
+# Set while the tables of a large upload load in the background
+loading_tables = False
+
 # Sidebar for file upload and options
 with st.sidebar:
     st.image("https://img.icons8.com/fluency/96/000000/data-backup.png", width=80)
     st.markdown("## Upload Database")
-    uploaded_file = st.file_uploader("Choose a SQLite database file", type=['db', 'sqlite', 'sqlite3'])
-    
-    if uploaded_file is not None:
-        # Save the uploaded file to a temporary file
-        bytes_data = uploaded_file.getvalue()
-        db_path = os.path.join(os.getcwd(), uploaded_file.name)
-        with open(db_path, "wb") as f:
-            f.write(bytes_data)
+    uploaded_files = st.file_uploader(
+        "Choose SQLite database files",
+        type=['db', 'sqlite', 'sqlite3'],
+        accept_multiple_files=True
+    )
+    # Server paths are only offered when the operator allows a directory for them
+    db_paths_input = st.text_input(
+        "Or load databases from paths",
+        placeholder="units/*.db",
+        help=f"Comma-separated file paths or glob patterns under {DB_PATH_ROOT}. "
+             "Several databases are loaded in parallel and combined."
+    ) if DB_PATH_ROOT else ""
+    incremental_refresh = st.checkbox(
+        "Incremental refresh",
+        value=False,
+        help="When a newer export of the loaded database is uploaded, read only the rows added since the last load. "
+             "If rows loaded before were changed or deleted, the whole database is reloaded."
+    )
+    large_file_mode = st.checkbox(
+        "Large file mode",
+        value=False,
+        help="For multi-gigabyte databases: spool the upload to disk and aggregate the performance table in chunks "
+             "instead of loading it. Row-level views are unavailable."
+    )
+    progressive_loading = st.checkbox(
+        "Progressive loading",
+        value=True,
+        help="For large datasets, show estimates from a sample of employees per department while "
+             "the full dataset is aggregated, then replace them with exact values."
+    )
+    
+    try:
+        db_paths = resolve_db_paths(db_paths_input, root=DB_PATH_ROOT)
+    except ValueError as e:
+        st.error(str(e))
+        db_paths = []
+    
+    demo_employees = None
+    if not uploaded_files and not db_paths:
+        st.info("Please upload one or more SQLite database files (.db)")
         
-        # Load data from the database
-        data_dict, error = load_data(db_path)
+        # Demo data is generated in memory at the chosen scale, nothing is written to disk
+        picked_scale = st.select_slider(
+            "Demo employees:",
+            options=DEMO_SCALES,
+            value=st.session_state.get('demo_employees', DEFAULT_DEMO_EMPLOYEES),
+            format_func=lambda count: f"{count:,}",
+            help="Employees in the generated dataset, each with six months of performance metrics. "
+                 "The largest scales need several GB of memory."
+        )
+        if st.button("Load Demo Data"):
+            st.session_state['demo_employees'] = picked_scale
+        demo_employees = st.session_state.get('demo_employees')
+    
+    if uploaded_files or db_paths or demo_employees:
+        loaded_dataset = st.session_state.get('loaded_dataset')
+        dataset_refresh = None
+        upload_id = None
+        lease = None
+        
+        if demo_employees:
+            dataset_fingerprint = demo_fingerprint(demo_employees)
+            
+            if loaded_dataset is not None and loaded_dataset['fingerprint'] == dataset_fingerprint:
+                lease, error = loaded_dataset['lease'], None
+            else:
+                def load_tables():
+                    with st.spinner(f"Generating demo data for {demo_employees:,} employees..."):
+                        return {'data_dict': build_demo_data(demo_employees)}, None
+                
+                # Shared with every session that loads the same demo scale
+                lease, error = acquire(('tables', dataset_fingerprint), load_tables)
+        elif large_file_mode and len(uploaded_files) + len(db_paths) == 1:
+            # Identify the file without reading it, so reruns do not rehash gigabytes
+            if uploaded_files:
+                uploaded_file = uploaded_files[0]
+                upload_id = ('upload', uploaded_file.name, uploaded_file.size, getattr(uploaded_file, 'file_id', None))
+            else:
+                path_stat = os.stat(db_paths[0])
+                upload_id = ('path', db_paths[0], path_stat.st_size, path_stat.st_mtime_ns)
+            
+            if loaded_dataset is not None and loaded_dataset['upload_id'] == upload_id:
+                dataset_fingerprint = loaded_dataset['fingerprint']
+                lease, error = loaded_dataset['lease'], None
+            else:
+                if uploaded_files:
+                    # Copy the upload to disk chunk by chunk instead of through one bytes object
+                    with st.spinner("Writing upload to disk..."):
+                        db_path, dataset_fingerprint = spool_upload(uploaded_file)
+                else:
+                    db_path = db_paths[0]
+                    dataset_fingerprint = file_fingerprint(db_path)
+                
+                def load_tables():
+                    # Only the aggregates of the performance table are kept in memory
+                    with st.spinner("Aggregating performance data in chunks..."):
+                        # Spooled uploads are private copies; server files may still be written to
+                        return load_out_of_core(db_path, key=(dataset_fingerprint, 'employees', 'performance_metrics'),
+                                                engine=analytics_engine, immutable=bool(uploaded_files))
+                
+                try:
+                    lease, error = acquire(('out_of_core', dataset_fingerprint), load_tables)
+                finally:
+                    # The spooled copy is not needed once loaded, nor when the load failed or another
+                    # session had already loaded the same upload
+                    if uploaded_files:
+                        try:
+                            os.remove(db_path)
+                        except FileNotFoundError:
+                            pass
+        elif len(uploaded_files) == 1 and not db_paths:
+            uploaded_file = uploaded_files[0]
+            bytes_data = uploaded_file.getvalue()
+                
+            # Fingerprint the upload so cached data and figures are tied to this exact dataset
+            dataset_fingerprint = hashlib.sha256(bytes_data).hexdigest()
+                
+            if loaded_dataset is not None and loaded_dataset['fingerprint'] == dataset_fingerprint and loaded_dataset['upload_id'] is None:
+                # Same upload as the previous rerun, reuse the leased tables
+                lease, error = loaded_dataset['lease'], None
+            elif incremental_refresh:
+                refresh_info = {}
+                
+                def load_tables():
+                    # Save the uploaded file to a temporary file
+                    db_path = os.path.join(os.getcwd(), uploaded_file.name)
+                    with open(db_path, "wb") as f:
+                        f.write(bytes_data)
+                    
+                    previous = loaded_dataset['lease'].value if loaded_dataset is not None else None
+                    if previous is not None and previous.get('watermarks'):
+                        # A newer export of the loaded database: read only the rows added since the last load
+                        data_dict, watermarks, new_rows = refresh_data(db_path, previous['data_dict'], previous['watermarks'])
+                        if data_dict is not None:
+                            refresh_info.update({'from': loaded_dataset['fingerprint'], 'new_rows': new_rows})
+                            return {'data_dict': data_dict, 'watermarks': watermarks}, None
+                    
+                    data_dict, error = load_data_cached(db_path, dataset_fingerprint, immutable=True)
+                    if error:
+                        return None, error
+                    return {'data_dict': data_dict, 'watermarks': read_watermarks(db_path, data_dict)}, None
+                
+                lease, error = acquire(('tables', dataset_fingerprint), load_tables)
+                dataset_refresh = refresh_info or None
+            else:
+                def load_tables(db_path=None):
+                    # Uploads seen before are reloaded from their memory-mapped columnar snapshot
+                    try:
+                        data_dict = load_snapshot(dataset_fingerprint)
+                    except (OSError, ValueError):
+                        # A truncated or corrupt snapshot is rebuilt from the upload
+                        data_dict = None
+                    if data_dict is not None:
+                        return {'data_dict': data_dict}, None
+                    
+                    if db_path is None:
+                        # Save the uploaded file to a temporary file
+                        db_path = os.path.join(os.getcwd(), uploaded_file.name)
+                        with open(db_path, "wb") as f:
+                            f.write(bytes_data)
+                    
+                    # Load data from the database and snapshot it for later sessions
+                    data_dict, error = load_data_cached(db_path, dataset_fingerprint, immutable=True)
+                    if error:
+                        return None, error
+                    
+                    tables = {'data_dict': data_dict}
+                    if hasattr(analytics_engine, 'analyze_sqlite') and {'employees', 'performance_metrics'} <= set(data_dict):
+                        # DuckDB merges the default tables straight from the file while it is on disk
+                        try:
+                            tables['performance_data'] = analytics_engine.analyze_sqlite(
+                                db_path, tables=data_dict, immutable=True
+                            )
+                        except Exception:
+                            # The processed state merges the loaded tables instead
+                            pass
+                    return tables, None
+                
+                loading_job = st.session_state.get('loading_job')
+                if loading_job is not None and loading_job['key'] == ('tables', dataset_fingerprint):
+                    lease, error = load_tables_progressively(uploaded_file, dataset_fingerprint, load_tables)
+                else:
+                    # Loaded already (by any session), or quick to load from its snapshot
+                    lease, error = acquire(('tables', dataset_fingerprint))
+                    if lease is None and progressive_loading and not has_snapshot(dataset_fingerprint):
+                        # Estimates from a sample of the file are shown while the tables load
+                        lease, error = load_tables_progressively(uploaded_file, dataset_fingerprint, load_tables)
+                    elif lease is None:
+                        lease, error = acquire(('tables', dataset_fingerprint), load_tables)
+                loading_tables = lease is None and error is None
+        else:
+            # One database per business unit: fingerprint every file, then load them in parallel
+            upload_bytes = {uploaded_file.name: uploaded_file.getvalue() for uploaded_file in uploaded_files}
+            fingerprint_parts = [f"{name}:{hashlib.sha256(data).hexdigest()}" for name, data in upload_bytes.items()]
+            for path in db_paths:
+                path_stat = os.stat(path)
+                fingerprint_parts.append(f"{path}:{path_stat.st_size}:{path_stat.st_mtime_ns}")
+            dataset_fingerprint = hashlib.sha256("\n".join(sorted(fingerprint_parts)).encode()).hexdigest()
+            
+            if loaded_dataset is not None and loaded_dataset['fingerprint'] == dataset_fingerprint and loaded_dataset['upload_id'] is None:
+                lease, error = loaded_dataset['lease'], None
+            else:
+                def load_tables():
+                    db_files = []
+                    for name, data in upload_bytes.items():
+                        db_path = os.path.join(os.getcwd(), name)
+                        with open(db_path, "wb") as f:
+                            f.write(data)
+                        db_files.append(db_path)
+                    
+                    with st.spinner(f"Loading {len(db_files) + len(db_paths)} databases..."):
+                        data_dict, error = load_databases(db_files + db_paths, owned_files=db_files)
+                    return ({'data_dict': data_dict}, None) if not error else (None, error)
+                
+                lease, error = acquire(('tables', dataset_fingerprint), load_tables)
+        
+        if lease is not None and (loaded_dataset is None or loaded_dataset['lease'] is not lease):
+            # Tables are shared with every session on the same dataset; release the previous one
+            if loaded_dataset is not None:
+                loaded_dataset['lease'].release()
+            st.session_state['loaded_dataset'] = {'fingerprint': dataset_fingerprint, 'lease': lease, 'upload_id': upload_id}
+        
+        # Shallow copy: the shared frames stay untouched when tables are added below
+        data_dict = dict(lease.value['data_dict']) if lease is not None else {}
+        out_of_core_state = lease.value.get('processed') if lease is not None else None
+        merged_tables = lease.value.get('performance_data') if lease is not None else None
         
         if error:
             st.error(f"Error loading database: {error}")
+        elif loading_tables:
+            st.info("Loading the database; estimates from a sample are shown until it is ready.")
         else:
-            st.success("Database loaded successfully!")
+            if demo_employees:
+                st.success(f"Demo data loaded: {demo_employees:,} employees.")
+            else:
+                st.success("Database loaded successfully!")
+            
+            if dataset_refresh is not None:
+                new_row_count = sum(len(rows) for rows in dataset_refresh['new_rows'].values())
+                st.info(f"Incremental refresh: {new_row_count} new rows appended.")
+            
+            watermarks = lease.value.get('watermarks') or {}
+            latest = watermarks.get('performance_metrics', {}).get('period')
+            if latest:
+                st.caption(f"Data through {latest[1]} {latest[0]}")
+            
+            if out_of_core_state is not None:
+                st.caption(f"Large file mode: {out_of_core_state['scanned_rows']:,} performance rows aggregated in chunks")
+            
+            cache_stats = registry_stats()
+            st.caption(f"Shared dataset cache: {cache_stats['bytes'] / 2**20:.0f} MB of "
+                       f"{cache_stats['budget_bytes'] / 2**20:.0f} MB, {cache_stats['leases']} active leases")
+            
+            # Employee IDs are expected to be unique across business units
+            if 'employees' in data_dict and 'source' in data_dict['employees'].columns:
+                sources_per_id = data_dict['employees'].groupby('employee_id')['source'].nunique()
+                shared_ids = int((sources_per_id > 1).sum())
+                if shared_ids:
+                    st.warning(f"{shared_ids} employee IDs appear in more than one database; "
+                               "per-employee summaries combine them.")
             
             # Display table selection if multiple tables exist
             table_names = list(data_dict.keys())
@@ -333,120 +736,189 @@ with st.sidebar:
             
             # View options
             st.markdown("## View Options")
-            view_mode = st.radio(
-                "Select view mode:",
-                ["Overview", "Individual Performance", "Department Analysis", "AI Insights"]
-            )
+            if out_of_core_state is not None:
+                # Only the views served by aggregates are available without the row-level data
+                view_modes = ["Department Analysis", "Trends", "Cohorts", "Team", "Skills"]
+            else:
+                view_modes = ["Overview", "Individual Performance", "Department Analysis", "Trends", "Cohorts", "Team", "Skills", "Anomalies", "AI Insights"]
+            view_mode = st.radio("Select view mode:", view_modes)
             
             # Filtering options
-            if employee_table in data_dict and 'department' in data_dict[employee_table].columns:
-                departments = ['All'] + sorted(data_dict[employee_table]['department'].unique().tolist())
-                selected_department = st.selectbox("Filter by department:", departments)
+            filter_options = get_filter_options(
+                data_dict, employee_table, performance_table, dataset_fingerprint,
+                cube=out_of_core_state['cube'] if out_of_core_state is not None else None
+            )
+            if filter_options['departments']:
+                selected_department = st.selectbox("Filter by department:", ['All'] + filter_options['departments'])
             else:
                 selected_department = 'All'
             
-            # AI Insights toggle
-            enable_ai = st.checkbox("Enable AI Insights", value=True)
-    else:
-        st.info("Please upload a SQLite database file (.db)")
-        
-        # Add demo data button
-        if st.button("Load Demo Data"):
-            # Create a demo database
-            conn = sqlite3.connect("demo_db.db")
-            
-            # Create employees table
-            employees_df = pd.DataFrame({
-                'employee_id': range(1, 11),
-                'name': [f"Employee {i}" for i in range(1, 11)],
-                'department': ['Sales', 'Marketing', 'IT', 'HR', 'Sales', 'Marketing', 'IT', 'Sales', 'HR', 'IT'],
-                'position': ['Manager', 'Specialist', 'Developer', 'Recruiter', 'Sales Rep', 'Designer', 'Analyst', 'Sales Rep', 'HR Assistant', 'Developer'],
-                'join_date': pd.date_range(start='2020-01-01', periods=10, freq='M')
-            })
-            
-            # Create performance metrics table
-            import numpy as np
-            np.random.seed(42)
-            
-            performance_df = pd.DataFrame({
-                'employee_id': range(1, 11),
-                'tasks_assigned': np.random.randint(10, 50, 10),
-                'tasks_completed': [0] * 10,  # Will calculate below
-                'working_hours': np.random.randint(160, 200, 10),
-                'quality_score': np.random.uniform(3.0, 5.0, 10).round(2),
-                'review_score': np.random.uniform(2.5, 5.0, 10).round(2),
-                'month': ['March'] * 10,
-                'year': [2025] * 10
-            })
-            
-            # Ensure tasks_completed is always <= tasks_assigned
-            for i in range(10):
-                performance_df.loc[i, 'tasks_completed'] = np.random.randint(
-                    performance_df.loc[i, 'tasks_assigned'] // 2,
-                    performance_df.loc[i, 'tasks_assigned'] + 1
-                )
-            
-            # Save tables to the database
-            employees_df.to_sql('employees', conn, index=False)
-            performance_df.to_sql('performance_metrics', conn, index=False)
+            selected_positions = []
+            join_date_range = (None, None)
+            period_range = (None, None)
             
-            conn.close()
-            
-            # Load the demo data
-            data_dict, _ = load_data("demo_db.db")
+            with st.expander("More filters"):
+                if filter_options['positions']:
+                    selected_positions = st.multiselect("Position:", filter_options['positions'])
+                
+                if filter_options['join_dates']:
+                    first_date, last_date = filter_options['join_dates']
+                    picked_dates = st.date_input(
+                        "Join date range:",
+                        value=(first_date, last_date),
+                        min_value=first_date,
+                        max_value=last_date
+                    )
+                    if isinstance(picked_dates, (tuple, list)) and len(picked_dates) == 2 and tuple(picked_dates) != (first_date, last_date):
+                        join_date_range = (date_key(picked_dates[0]), date_key(picked_dates[1]))
+                
+                periods = filter_options['periods']
+                if len(periods) > 1:
+                    first_period, last_period = st.select_slider(
+                        "Period range:",
+                        options=periods,
+                        value=(periods[0], periods[-1]),
+                        format_func=period_label
+                    )
+                    if (first_period, last_period) != (periods[0], periods[-1]):
+                        period_range = (first_period, last_period)
             
-            # Set default selections
-            table_names = list(data_dict.keys())
-            employee_table = 'employees'
-            performance_table = 'performance_metrics'
-            view_mode = "Overview"
-            selected_department = 'All'
-            enable_ai = True
-            
-            st.success("Demo data loaded successfully!")
-            st.rerun()
+            # AI Insights toggle
+            enable_ai = st.checkbox("Enable AI Insights", value=True)
 
         # Main content area
+if loading_tables:
+    # Only the sample drawn from the file is available yet
+    sample = get_progressive_sample(None, 'employees', 'performance_metrics', dataset_fingerprint)
+    show_sample_estimates(sample, {}, {}, 'loading_job', "Loading the full dataset...")
+    st.stop()
+
 if 'data_dict' in locals() and data_dict:
     # Process and analyze the data
     if employee_table in data_dict and performance_table in data_dict:
-        employee_data = data_dict[employee_table]
-        metrics_data = data_dict[performance_table]
+        # Merged and aggregated data is reused across reruns until the dataset changes
+        if out_of_core_state is not None:
+            processed = out_of_core_state
+        else:
+            progressive = (
+                progressive_loading and dataset_fingerprint is not None
+                and len(data_dict[performance_table]) >= PROGRESSIVE_MIN_ROWS
+                and 'employee_id' in data_dict[employee_table].columns
+                and 'employee_id' in data_dict[performance_table].columns
+            )
+            processed = get_processed_state(
+                data_dict, employee_table, performance_table, dataset_fingerprint, dataset_refresh, progressive,
+                merged_tables if (employee_table, performance_table) == ('employees', 'performance_metrics') else None
+            )
+        
+        value_filters = {
+            'department': [selected_department] if selected_department != 'All' else [],
+            'position': selected_positions
+        }
+        range_filters = {'join_date': join_date_range, 'period': period_range}
         
-        # Analyze performance
-        performance_data = analyze_performance(employee_data, metrics_data)
+        if processed is None:
+            # The full aggregation is still running: estimate from a stratified sample in the meantime
+            sample = get_progressive_sample(data_dict, employee_table, performance_table, dataset_fingerprint)
+            show_sample_estimates(sample, value_filters, range_filters, 'processing_job', "Aggregating the full dataset...")
+            st.stop()
         
-        # Get department performance
-        dept_performance = get_department_performance(performance_data)
+        sample_lease = st.session_state.pop('sample_lease', None)
+        if sample_lease is not None:
+            sample_lease.release()
         
-        # Filter by department if selected
-        if selected_department != 'All' and 'department' in performance_data.columns:
-            filtered_data = performance_data[performance_data['department'] == selected_department]
+        employee_data = processed['employee_data']
+        metrics_data = processed['metrics_data']
+        performance_data = processed['performance_data']
+        dept_performance = processed['dept_performance']
+        
+        # Department charts are built from the unfiltered tables, so only the table selection keys them
+        table_filters = {'employee_table': employee_table, 'performance_table': performance_table}
+        dashboard = get_dashboard_snapshot(processed, table_filters, enable_ai)
+        
+        # Filter by department, position, join date and period through the row index
+        if processed['performance_data'] is not None:
+            filtered_data, filtered_positions = filter_rows(processed, value_filters, range_filters)
         else:
-            filtered_data = performance_data
+            # Large file mode keeps no rows to filter; the cube-based views apply the filters themselves
+            filtered_data, filtered_positions = None, None
+        
+        # Department and period selections (and nothing else) are covered by the pre-rendered snapshot
+        dashboard_slice = None
+        if dashboard is not None and not selected_positions and join_date_range == (None, None):
+            dashboard_slice = dashboard['slices'].get(slice_key(selected_department, period_range))
+        
+        # Chunked exports of the filtered data and the aggregates
+        with st.expander("Export data"):
+            export_tables = {}
+            if processed['performance_data'] is not None:
+                # Rows matching every sidebar filter
+                export_tables['Performance data'] = (processed['performance_data'], filtered_positions)
+            if dept_performance is not None:
+                department_rows = (dept_performance['department'] == selected_department).to_numpy().nonzero()[0]
+                export_tables['Department performance'] = (dept_performance, department_rows if selected_department != 'All' else None)
+            if processed['employee_index'] is not None:
+                summaries = processed['employee_index'].drop(columns='label')
+                summary_rows = (summaries['department'] == selected_department).to_numpy().nonzero()[0] if 'department' in summaries.columns else None
+                export_tables['Employee summaries'] = (summaries, summary_rows if selected_department != 'All' else None)
+            
+            col1, col2 = st.columns(2)
+            with col1:
+                export_name = st.selectbox("Table:", list(export_tables))
+            with col2:
+                export_format = st.radio("Format:", export_formats(), horizontal=True, format_func=str.upper)
+            
+            export_key = (processed['key'], export_name, export_format, selected_department,
+                          tuple(selected_positions), join_date_range, period_range)
+            if export_name is not None and st.button("Prepare export"):
+                export_frame, export_positions = export_tables[export_name]
+                with st.spinner("Writing export..."):
+                    export_path = export_table(export_frame, export_key, export_format, export_positions)
+                st.session_state['export'] = {'key': export_key, 'path': export_path}
+            
+            prepared_export = st.session_state.get('export')
+            if prepared_export is not None and prepared_export['key'] == export_key:
+                export_size = os.path.getsize(prepared_export['path'])
+                if export_size > EXPORT_DOWNLOAD_MAX_MB * 2**20:
+                    # The download is sent as one bytes object; keep large exports on disk
+                    st.warning(f"This export is {export_size / 2**20:,.0f} MB, above the {EXPORT_DOWNLOAD_MAX_MB} MB "
+                               f"download limit. Narrow the filters, or collect it on the server at {prepared_export['path']}.")
+                else:
+                    # The file is only read (whole) when the download is requested
+                    def read_export(path=prepared_export['path']):
+                        with open(path, "rb") as f:
+                            return f.read()
+                    
+                    st.download_button(
+                        "Download",
+                        data=read_export,
+                        file_name=f"{export_name.lower().replace(' ', '_')}.{export_format}",
+                        mime=EXPORT_MIME_TYPES[export_format]
+                    )
         
         # Display based on selected view mode
         if view_mode == "Overview":
             # Key metrics
             st.markdown("<h2 class='sub-header'>Key Performance Metrics</h2>", unsafe_allow_html=True)
             
+            kpis = dashboard_slice['kpis'] if dashboard_slice is not None else overview_kpis(filtered_data)
+            
             col1, col2, col3, col4 = st.columns(4)
             
             with col1:
                 st.markdown("<div class='metric-container'>", unsafe_allow_html=True)
                 st.metric(
                     "Total Employees", 
-                    len(filtered_data)
+                    kpis['employees']
                 )
                 st.markdown("</div>", unsafe_allow_html=True)
                 
             with col2:
                 st.markdown("<div class='metric-container'>", unsafe_allow_html=True)
-                if 'tasks_completed' in filtered_data.columns and 'tasks_assigned' in filtered_data.columns:
-                    completion_rate = (filtered_data['tasks_completed'].sum() / filtered_data['tasks_assigned'].sum()) * 100
+                if kpis['completion_rate'] is not None:
                     st.metric(
                         "Task Completion Rate", 
-                        f"{completion_rate:.1f}%"
+                        f"{kpis['completion_rate']:.1f}%"
                     )
                 else:
                     st.metric("Task Completion Rate", "N/A")
@@ -454,11 +926,10 @@ if 'data_dict' in locals() and data_dict:
                 
             with col3:
                 st.markdown("<div class='metric-container'>", unsafe_allow_html=True)
-                if 'quality_score' in filtered_data.columns:
-                    avg_quality = filtered_data['quality_score'].mean()
+                if kpis['quality_score'] is not None:
                     st.metric(
                         "Avg. Quality Score", 
-                        f"{avg_quality:.2f}/5.0"
+                        f"{kpis['quality_score']:.2f}/5.0"
                     )
                 else:
                     st.metric("Avg. Quality Score", "N/A")
@@ -466,22 +937,26 @@ if 'data_dict' in locals() and data_dict:
                 
             with col4:
                 st.markdown("<div class='metric-container'>", unsafe_allow_html=True)
-                if 'review_score' in filtered_data.columns:
-                    avg_review = filtered_data['review_score'].mean()
+                if kpis['review_score'] is not None:
                     st.metric(
                         "Avg. Review Score", 
-                        f"{avg_review:.2f}/5.0"
+                        f"{kpis['review_score']:.2f}/5.0"
                     )
                 else:
                     st.metric("Avg. Review Score", "N/A")
                 st.markdown("</div>", unsafe_allow_html=True)
+            
+            if dashboard_slice is not None:
+                st.caption("Served from the pre-rendered dashboard snapshot of this dataset.")
                 
             # AI Insights
             if enable_ai:
                 st.markdown("<h2 class='sub-header'>AI Performance Insights</h2>", unsafe_allow_html=True)
-                with st.spinner("Generating AI insights..."):
-                    ai_insights = generate_ai_insights(employee_data, filtered_data)
-                    st.markdown(f"<div class='ai-insights'>{ai_insights}</div>", unsafe_allow_html=True)
+                ai_insights = dashboard_slice['overview_insight'] if dashboard_slice is not None else None
+                if ai_insights is None:
+                    with st.spinner("Generating AI insights..."):
+                        ai_insights = generate_ai_insights(employee_data, filtered_data)
+                st.markdown(f"<div class='ai-insights'>{ai_insights}</div>", unsafe_allow_html=True)
             
             # Department comparison
             if dept_performance is not None:
@@ -491,54 +966,57 @@ if 'data_dict' in locals() and data_dict:
                 
                 with col1:
                     st.markdown("<div class='card'>", unsafe_allow_html=True)
-                    fig = px.bar(
-                        dept_performance,
-                        x='department',
-                        y='dept_completion_rate',
-                        title='Task Completion Rate by Department',
-                        labels={'dept_completion_rate': 'Completion Rate', 'department': 'Department'},
-                        color='department',
-                        color_discrete_sequence=px.colors.qualitative.Plotly,
-                        text_auto='.1%'
-                    )
-                    fig.update_traces(texttemplate='%{text}', textposition='outside')
-                    fig.update_layout(height=400)
+                    fig = get_figure('department_completion', dept_performance, dataset_fingerprint, table_filters)
                     st.plotly_chart(fig, use_container_width=True)
                     st.markdown("</div>", unsafe_allow_html=True)
                 
                 with col2:
                     st.markdown("<div class='card'>", unsafe_allow_html=True)
-                    fig = px.pie(
-                        dept_performance,
-                        names='department',
-                        values='tasks_completed',
-                        title='Tasks Completed by Department',
-                        color='department',
-                        color_discrete_sequence=px.colors.qualitative.Plotly,
-                        hole=0.4
-                    )
-                    fig.update_layout(height=400)
+                    fig = get_figure('department_tasks', dept_performance, dataset_fingerprint, table_filters)
                     st.plotly_chart(fig, use_container_width=True)
                     st.markdown("</div>", unsafe_allow_html=True)
             
             # Top performers
             st.markdown("<h2 class='sub-header'>Top Performers</h2>", unsafe_allow_html=True)
             
-            if 'productivity' in filtered_data.columns:
-                top_employees = filtered_data.sort_values('productivity', ascending=False).head(5)
-                
-                if 'name' in top_employees.columns:
-                    fig = px.bar(
-                        top_employees,
-                        x='name',
-                        y='productivity',
-                        title='Top 5 Employees by Productivity',
-                        labels={'productivity': 'Productivity (Tasks/Hour)', 'name': 'Employee'},
-                        color='productivity',
-                        color_continuous_scale='Blues',
+            col1, col2 = st.columns(2)
+            with col1:
+                top_metric = st.selectbox(
+                    "Rank by:",
+                    [metric for metric in RANK_METRICS if metric in filtered_data.columns],
+                    format_func=lambda metric: metric.replace('_', ' ').title(),
+                    key='top_performers_metric'
+                )
+            with col2:
+                top_n = st.slider("Number of employees:", 3, 50, DEFAULT_TOP_N, key='top_performers_n')
+            
+            snapshot_top = dashboard_slice['top_performers'] if dashboard_slice is not None else None
+            if snapshot_top is not None and snapshot_top['metric'] == top_metric and top_n == DEFAULT_TOP_N:
+                # Default leaderboard of the pre-rendered snapshot
+                top_employees = pd.read_json(StringIO(snapshot_top['table']), orient='split')
+                st.plotly_chart(pio.from_json(snapshot_top['figure']), use_container_width=True)
+                st.dataframe(top_employees, use_container_width=True)
+            elif top_metric:
+                # Employees are ranked on their aggregated rows, each appearing once. Department and
+                # single-period selections read the cached rankings; other filters rank the filtered rows.
+                single_period = period_range[0] if period_range[0] is not None and period_range[0] == period_range[1] else None
+                if not selected_positions and join_date_range == (None, None) and (single_period is not None or period_range == (None, None)):
+                    top_employees = leaderboard(
+                        processed,
+                        top_metric,
+                        top_n,
+                        department=selected_department if selected_department != 'All' else None,
+                        period=single_period
                     )
-                    fig.update_layout(height=400)
+                else:
+                    top_employees = leaderboard_for_rows(filtered_data, top_metric, top_n)
+                
+                if top_employees is not None and not top_employees.empty:
+                    fig = top_performers_figure(top_employees, top_metric)
                     st.plotly_chart(fig, use_container_width=True)
+                    
+                    if 'rank' in top_employees.columns:
+                        st.dataframe(top_employees, use_container_width=True)
             
             # Full employee table
             st.markdown("<h2 class='sub-header'>Employee Performance Data</h2>", unsafe_allow_html=True)
@@ -547,14 +1025,35 @@ if 'data_dict' in locals() and data_dict:
         elif view_mode == "Individual Performance":
             st.markdown("<h2 class='sub-header'>Individual Performance Analysis</h2>", unsafe_allow_html=True)
             
-            # Employee selector
-            if 'name' in filtered_data.columns:
-                employees = filtered_data['name'].tolist()
-                selected_employee = st.selectbox("Select Employee:", employees)
+            # Employee selector over the per-employee lookup table (one entry per employee)
+            employee_index = processed['employee_index']
+            if employee_index is not None:
+                if filtered_positions is None:
+                    candidates = employee_index
+                else:
+                    candidates = employee_index[employee_index.index.isin(filtered_data['employee_id'].unique())]
+                
+                search = st.text_input("Search employees:", placeholder="Name or employee ID")
+                if search:
+                    candidates = candidates[candidates['label'].str.contains(search, case=False, regex=False)]
                 
-                # Filter data for selected employee
-                if selected_employee:
-                    employee_row = filtered_data[filtered_data['name'] == selected_employee].iloc[0]
+                if len(candidates) > MAX_EMPLOYEE_OPTIONS:
+                    st.caption(f"Showing the first {MAX_EMPLOYEE_OPTIONS} of {len(candidates)} employees. Refine the search to narrow the list.")
+                employee_labels = candidates['label'].iloc[:MAX_EMPLOYEE_OPTIONS].to_dict()
+                
+                selected_employee_id = st.selectbox(
+                    "Select Employee:",
+                    list(employee_labels),
+                    format_func=employee_labels.get
+                )
+                
+                # Details and totals for the selected employee
+                if selected_employee_id is not None:
+                    employee_row = employee_index.loc[selected_employee_id]
+                    selected_employee = employee_row['name']
+                    employee_history, _ = filter_rows(
+                        processed, dict(value_filters, employee_id=[selected_employee_id]), range_filters
+                    )
                     
                     col1, col2 = st.columns(2)
                     
@@ -563,7 +1062,8 @@ if 'data_dict' in locals() and data_dict:
                         st.markdown("<div class='card'>", unsafe_allow_html=True)
                         st.markdown(f"### {employee_row['name']}")
                         
-                        detail_cols = ['employee_id', 'department', 'position', 'join_date']
+                        st.write(f"**Employee Id:** {selected_employee_id}")
+                        detail_cols = ['department', 'position', 'join_date', 'latest_period']
                         for col in detail_cols:
                             if col in employee_row:
                                 st.write(f"**{col.replace('_', ' ').title()}:** {employee_row[col]}")
@@ -571,14 +1071,17 @@ if 'data_dict' in locals() and data_dict:
                         st.markdown("</div>", unsafe_allow_html=True)
                     
                     with col2:
-                        # Performance metrics
+                        # Performance metrics: lifetime totals with the latest period alongside
                         st.markdown("<div class='card'>", unsafe_allow_html=True)
                         st.markdown("### Performance Metrics")
                         
                         metric_cols = ['tasks_completed', 'tasks_assigned', 'working_hours', 'quality_score', 'review_score']
                         for col in metric_cols:
                             if col in employee_row:
-                                st.write(f"**{col.replace('_', ' ').title()}:** {employee_row[col]}")
+                                value = employee_row[col]
+                                value = f"{value:.2f}" if col in ('quality_score', 'review_score') else f"{value:,.0f}"
+                                latest = f" (latest: {employee_row[f'latest_{col}']})" if f'latest_{col}' in employee_row else ""
+                                st.write(f"**{col.replace('_', ' ').title()}:** {value}{latest}")
                         
                         if 'completion_rate' in employee_row:
                             st.write(f"**Completion Rate:** {employee_row['completion_rate']*100:.1f}%")
@@ -654,8 +1157,6 @@ if 'data_dict' in locals() and data_dict:
                     
                     # Additional performance analysis if month/year data available
                     if 'month' in filtered_data.columns and 'year' in filtered_data.columns:
-                        employee_history = filtered_data[filtered_data['name'] == selected_employee]
-                        
                         if len(employee_history) > 1:
                             st.markdown("<h3 class='sub-header'>Performance Trends</h3>", unsafe_allow_html=True)
                             
@@ -670,26 +1171,30 @@ if 'data_dict' in locals() and data_dict:
                             employee_history['month_idx'] = employee_history['month'].apply(lambda x: month_order.index(x) if x in month_order else -1)
                             employee_history = employee_history.sort_values(by=['year', 'month_idx'])
                             
-                            # Create trend chart
+                            # Create trend chart (downsampled to a fixed point budget)
+                            task_history = downsample_series(employee_history, 'period', ['tasks_assigned', 'tasks_completed'])
                             fig = px.line(
-                                employee_history,
+                                task_history,
                                 x='period',
                                 y=['tasks_assigned', 'tasks_completed'],
                                 title='Task Assignment and Completion Trend',
                                 labels={'value': 'Count', 'period': 'Period', 'variable': 'Metric'},
                                 markers=True,
+                                render_mode=render_mode(len(task_history)),
                             )
                             st.plotly_chart(fig, use_container_width=True)
                             
                             # Quality and review score trends
                             if 'quality_score' in employee_history.columns and 'review_score' in employee_history.columns:
+                                score_history = downsample_series(employee_history, 'period', ['quality_score', 'review_score'])
                                 fig = px.line(
-                                    employee_history,
+                                    score_history,
                                     x='period',
                                     y=['quality_score', 'review_score'],
                                     title='Quality and Review Score Trend',
                                     labels={'value': 'Score', 'period': 'Period', 'variable': 'Metric'},
                                     markers=True,
+                                    render_mode=render_mode(len(score_history)),
                                 )
                                 fig.update_layout(yaxis_range=[0, 5])
                                 st.plotly_chart(fig, use_container_width=True)
@@ -740,60 +1245,30 @@ if 'data_dict' in locals() and data_dict:
                 with col1:
                     st.markdown("<div class='card'>", unsafe_allow_html=True)
                     if 'dept_completion_rate' in dept_performance:
-                        fig = px.bar(
-                            dept_performance,
-                            x='department',
-                            y='dept_completion_rate',
-                            title='Task Completion Rate by Department',
-                            labels={'dept_completion_rate': 'Completion Rate', 'department': 'Department'},
-                            color='department',
-                            text_auto='.1%'
-                        )
-                        fig.update_traces(texttemplate='%{text}', textposition='outside')
-                        fig.update_layout(height=400)
+                        fig = get_figure('department_completion', dept_performance, dataset_fingerprint, table_filters)
                         st.plotly_chart(fig, use_container_width=True)
                     st.markdown("</div>", unsafe_allow_html=True)
                 
                 with col2:
                     st.markdown("<div class='card'>", unsafe_allow_html=True)
                     if 'working_hours' in dept_performance and 'tasks_completed' in dept_performance:
-                        # Calculate department productivity
-                        dept_performance['dept_productivity'] = dept_performance['tasks_completed'] / dept_performance['working_hours']
-                        
-                        fig = px.bar(
-                            dept_performance,
-                            x='department',
-                            y='dept_productivity',
-                            title='Productivity by Department (Tasks per Hour)',
-                            labels={'dept_productivity': 'Productivity', 'department': 'Department'},
-                            color='department',
-                            text_auto='.2f'
-                        )
-                        fig.update_traces(texttemplate='%{text}', textposition='outside')
-                        fig.update_layout(height=400)
+                        fig = get_figure('department_productivity', dept_performance, dataset_fingerprint, table_filters)
                         st.plotly_chart(fig, use_container_width=True)
                     st.markdown("</div>", unsafe_allow_html=True)
                 
                 # AI Insights for selected department
-                if enable_ai and selected_department != 'All':
+                if enable_ai and selected_department != 'All' and filtered_data is not None:
                     st.markdown("<h3 class='sub-header'>AI Department Analysis</h3>", unsafe_allow_html=True)
-                    with st.spinner("Generating AI insights..."):
-                        ai_insights = generate_ai_insights(employee_data, filtered_data, department=selected_department)
-                        st.markdown(f"<div class='ai-insights'>{ai_insights}</div>", unsafe_allow_html=True)
+                    ai_insights = dashboard_slice['department_insight'] if dashboard_slice is not None else None
+                    if ai_insights is None:
+                        with st.spinner("Generating AI insights..."):
+                            ai_insights = generate_ai_insights(employee_data, filtered_data, department=selected_department)
+                    st.markdown(f"<div class='ai-insights'>{ai_insights}</div>", unsafe_allow_html=True)
                 
                 # Department staffing
                 if 'department' in employee_data.columns:
                     st.markdown("<div class='card'>", unsafe_allow_html=True)
-                    dept_counts = employee_data['department'].value_counts().reset_index()
-                    dept_counts.columns = ['department', 'count']
-                    
-                    fig = px.pie(
-                        dept_counts,
-                        names='department',
-                        values='count',
-                        title='Employee Distribution by Department',
-                        color='department',
-                    )
+                    fig = get_figure('department_distribution', employee_data, dataset_fingerprint, table_filters)
                     st.plotly_chart(fig, use_container_width=True)
                     st.markdown("</div>", unsafe_allow_html=True)
                 
@@ -801,6 +1276,356 @@ if 'data_dict' in locals() and data_dict:
                 st.markdown("<h3 class='sub-header'>Department Performance Data</h3>", unsafe_allow_html=True)
                 st.dataframe(dept_performance, use_container_width=True)
         
+        elif view_mode == "Team":
+            st.markdown("<h2 class='sub-header'>Team Performance</h2>", unsafe_allow_html=True)
+            
+            hierarchy = processed['hierarchy']
+            employee_index = processed['employee_index']
+            
+            if hierarchy is None or employee_index is None:
+                st.info("Team view requires a 'manager_id' column in the employee table.")
+            else:
+                if hierarchy['cycles']:
+                    cycle_text = "; ".join(" → ".join(str(emp_id) for emp_id in cycle) for cycle in hierarchy['cycles'])
+                    st.warning(f"Reporting cycles found and broken at the lowest employee ID: {cycle_text}")
+                
+                # Manager selector, ordered by name
+                managers = employee_index[employee_index.index.isin(manager_ids(hierarchy))]
+                manager_labels = managers['label'].to_dict()
+                selected_manager = st.selectbox("Select Manager:", list(manager_labels), format_func=manager_labels.get)
+                
+                if selected_manager is not None:
+                    # Org-wide rollup of the manager and everyone below them
+                    org = org_rollup(hierarchy, selected_manager)
+                    reports = direct_reports(hierarchy, selected_manager)
+                    
+                    col1, col2, col3, col4 = st.columns(4)
+                    
+                    with col1:
+                        st.markdown("<div class='metric-container'>", unsafe_allow_html=True)
+                        st.metric("Org Headcount", org['headcount'], help=f"{len(reports)} direct reports")
+                        st.markdown("</div>", unsafe_allow_html=True)
+                    
+                    with col2:
+                        st.markdown("<div class='metric-container'>", unsafe_allow_html=True)
+                        st.metric("Org Completion Rate", f"{org['completion_rate']*100:.1f}%" if 'completion_rate' in org else "N/A")
+                        st.markdown("</div>", unsafe_allow_html=True)
+                    
+                    with col3:
+                        st.markdown("<div class='metric-container'>", unsafe_allow_html=True)
+                        st.metric("Org Productivity", f"{org['productivity']:.2f}" if 'productivity' in org else "N/A")
+                        st.markdown("</div>", unsafe_allow_html=True)
+                    
+                    with col4:
+                        st.markdown("<div class='metric-container'>", unsafe_allow_html=True)
+                        st.metric("Avg Quality Score", f"{org['quality_score']:.2f}" if 'quality_score' in org else "N/A")
+                        st.markdown("</div>", unsafe_allow_html=True)
+                    
+                    st.caption("Org metrics cover every period and ignore the sidebar filters.")
+                    
+                    # Direct reports with the rollup of their own orgs
+                    if len(reports) > 0:
+                        report_rows = pd.DataFrame([
+                            dict(org_rollup(hierarchy, emp_id), employee_id=emp_id) for emp_id in reports
+                        ]).set_index('employee_id')
+                        report_rows = employee_index.reindex(reports)[['name', 'position']].join(report_rows)
+                        
+                        if 'completion_rate' in report_rows.columns:
+                            st.markdown("<div class='card'>", unsafe_allow_html=True)
+                            fig = px.bar(
+                                report_rows,
+                                x='name',
+                                y='completion_rate',
+                                color='headcount',
+                                title='Org Completion Rate of Direct Reports',
+                                labels={'completion_rate': 'Completion Rate', 'name': 'Direct Report', 'headcount': 'Org Size'},
+                                text_auto='.1%'
+                            )
+                            fig.update_layout(height=400)
+                            st.plotly_chart(fig, use_container_width=True)
+                            st.markdown("</div>", unsafe_allow_html=True)
+                        
+                        st.markdown("<h3 class='sub-header'>Direct Reports</h3>", unsafe_allow_html=True)
+                        st.dataframe(report_rows, use_container_width=True)
+                    
+                    # Everyone in the org with their lifetime summary
+                    st.markdown("<h3 class='sub-header'>Whole Organisation</h3>", unsafe_allow_html=True)
+                    member_cols = [col for col in ['name', 'department', 'position', 'tasks_assigned', 'tasks_completed',
+                                                   'completion_rate', 'productivity', 'quality_score', 'review_score']
+                                   if col in employee_index.columns]
+                    st.dataframe(employee_index.reindex(org_members(hierarchy, selected_manager))[member_cols], use_container_width=True)
+        
+        elif view_mode == "Skills":
+            st.markdown("<h2 class='sub-header'>Skills & Training</h2>", unsafe_allow_html=True)
+            
+            skill_index, training_index = get_skill_indexes(data_dict, dataset_fingerprint)
+            employee_index = processed['employee_index']
+            
+            if (not skill_index and not training_index) or employee_index is None:
+                st.info(f"Skills view requires an '{SKILLS_TABLE}' or '{TRAINING_TABLE}' table and per-employee performance data.")
+            else:
+                col1, col2 = st.columns(2)
+                
+                with col1:
+                    selected_skills = st.multiselect("Required skills:", sorted(skill_index or {}))
+                    skill_filters = {
+                        skill: st.slider(f"Minimum {skill} rating:", 1, 5, 4, key=f"skill_min_{skill}")
+                        for skill in selected_skills
+                    }
+                
+                with col2:
+                    selected_trainings = st.multiselect("Completed trainings:", sorted(training_index or {}))
+                    min_training_score = st.slider("Minimum training score:", 0, 100, 0)
+                    completed_since = st.date_input("Completed since:", value=None,
+                                                    help="Only count trainings last completed on or after this date")
+                    training_filters = {
+                        training: min_training_score if min_training_score > 0 else None
+                        for training in selected_trainings
+                    }
+                
+                col1, col2 = st.columns(2)
+                with col1:
+                    rank_by = st.selectbox(
+                        "Rank by:",
+                        [col for col in RANK_COLUMNS if col in employee_index.columns],
+                        format_func=lambda col: col.replace('_', ' ').title()
+                    )
+                with col2:
+                    top_n = st.number_input("Show top:", min_value=1, max_value=1000, value=25)
+                
+                # Restrict to the employees left by the sidebar filters
+                candidate_ids = filtered_data['employee_id'].unique() if filtered_positions is not None else None
+                matches = match_employees(
+                    skill_index, training_index, skill_filters, training_filters, candidate_ids,
+                    completed_since=date_key(completed_since) if completed_since is not None else None
+                )
+                
+                if matches is None:
+                    # Without a query, show how widely each skill is held
+                    if skill_index:
+                        skill_counts = pd.DataFrame({
+                            'skill': list(skill_index),
+                            'employees': [len(postings[0]) for postings in skill_index.values()]
+                        }).sort_values('employees', ascending=False)
+                        fig = px.bar(
+                            skill_counts,
+                            x='skill',
+                            y='employees',
+                            title='Employees per Skill',
+                            labels={'skill': 'Skill', 'employees': 'Employees'}
+                        )
+                        st.plotly_chart(fig, use_container_width=True)
+                    st.info("Select skills or trainings to find matching employees.")
+                else:
+                    ranked = rank_matches(matches, employee_index, by=rank_by, top_n=int(top_n))
+                    st.markdown(f"**{len(matches)} matching employees**, showing the top {len(ranked)} by {rank_by.replace('_', ' ')}")
+                    
+                    if not ranked.empty:
+                        display_cols = [col for col in ['name', 'department', 'position', rank_by] if col in ranked.columns]
+                        st.dataframe(ranked[display_cols + list(matches.columns)], use_container_width=True)
+        
+        elif view_mode == "Anomalies":
+            st.markdown("<h2 class='sub-header'>Performance Drops</h2>", unsafe_allow_html=True)
+            
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                anomaly_metrics = st.multiselect(
+                    "Metrics:",
+                    [metric for metric in ANOMALY_METRICS if metric in performance_data.columns],
+                    default=[metric for metric in ANOMALY_METRICS if metric in performance_data.columns],
+                    format_func=lambda metric: metric.replace('_', ' ').title()
+                )
+            with col2:
+                window = st.slider("Trailing window (months):", 1, 12, DEFAULT_WINDOW)
+            with col3:
+                z_threshold = st.slider("Z-score threshold:", 1.0, 5.0, DEFAULT_Z_THRESHOLD, 0.5)
+            
+            anomalies = get_anomalies(processed, tuple(anomaly_metrics), window, z_threshold)
+            
+            if anomalies is None:
+                st.info("Anomaly detection requires employee_id, month and year columns in the performance data.")
+            else:
+                # Detection always uses each employee's full history; the sidebar filters pick which flags are shown
+                if filtered_positions is not None:
+                    anomalies = anomalies[anomalies['employee_id'].isin(filtered_data['employee_id'].unique())]
+                    low, high = period_range
+                    if low is not None:
+                        anomalies = anomalies[anomalies['period_key'].between(low, high)]
+                flagged_employees = rank_flagged_employees(anomalies)
+                
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    st.markdown("<div class='metric-container'>", unsafe_allow_html=True)
+                    st.metric("Flagged Employees", len(flagged_employees))
+                    st.markdown("</div>", unsafe_allow_html=True)
+                with col2:
+                    st.markdown("<div class='metric-container'>", unsafe_allow_html=True)
+                    st.metric("Flagged Months", len(anomalies))
+                    st.markdown("</div>", unsafe_allow_html=True)
+                with col3:
+                    st.markdown("<div class='metric-container'>", unsafe_allow_html=True)
+                    st.metric("Worst Z-Score", f"{anomalies['z_score'].min():.1f}" if not anomalies.empty else "N/A")
+                    st.markdown("</div>", unsafe_allow_html=True)
+                
+                if anomalies.empty:
+                    st.success("No sharp drops found with these settings.")
+                else:
+                    # Flags per period show whether drops cluster in particular months
+                    period_counts = anomalies.groupby(['period_key', 'period', 'metric']).size().reset_index(name='flags')
+                    fig = px.bar(
+                        period_counts.sort_values('period_key'),
+                        x='period',
+                        y='flags',
+                        color='metric',
+                        title='Flagged Drops by Period',
+                        labels={'period': 'Period', 'flags': 'Flags', 'metric': 'Metric'}
+                    )
+                    st.plotly_chart(fig, use_container_width=True)
+                    
+                    st.markdown("<h3 class='sub-header'>Employees Ranked by Worst Drop</h3>", unsafe_allow_html=True)
+                    st.dataframe(flagged_employees.drop(columns=['period_key']).head(MAX_EMPLOYEE_OPTIONS), use_container_width=True)
+                    
+                    with st.expander("All flagged months"):
+                        st.dataframe(anomalies.drop(columns=['period_key']).head(MAX_EMPLOYEE_OPTIONS), use_container_width=True)
+        
+        elif view_mode == "Trends":
+            st.markdown("<h2 class='sub-header'>Performance Trends</h2>", unsafe_allow_html=True)
+            
+            cube = processed['cube']
+            
+            if cube is None:
+                st.info("Trends require month and year columns in the performance data.")
+            else:
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    breakdowns = {'Company': None}
+                    breakdowns.update({dimension.title(): dimension for dimension in ['department', 'position'] if dimension in cube.index.names})
+                    breakdown = breakdowns[st.selectbox("Break down by:", list(breakdowns))]
+                with col2:
+                    # Drill down into one department (on top of the sidebar filters)
+                    drill_options = ['All'] + (sorted(cube.index.get_level_values('department').dropna().unique().tolist())
+                                               if 'department' in cube.index.names else [])
+                    drill_department = st.selectbox("Drill into department:", drill_options)
+                with col3:
+                    trend_metrics = {
+                        'completion_rate': 'Completion Rate', 'productivity': 'Productivity',
+                        'avg_quality_score': 'Avg Quality Score', 'avg_review_score': 'Avg Review Score',
+                        'tasks_completed': 'Tasks Completed', 'working_hours': 'Working Hours',
+                        'avg_revenue_generated': 'Avg Revenue', 'avg_customer_feedback': 'Avg Customer Feedback',
+                        'avg_bugs_fixed': 'Avg Bugs Fixed'
+                    }
+                    available = cube_metrics(cube.iloc[:0]).columns
+                    trend_metric = st.selectbox(
+                        "Metric:",
+                        [metric for metric in trend_metrics if metric in available],
+                        format_func=trend_metrics.get
+                    )
+                
+                # Slice the cube with the sidebar filters and the drill-down
+                cube_filters = {
+                    'department': [drill_department] if drill_department != 'All' else value_filters['department'],
+                    'position': value_filters['position']
+                }
+                by = ['period'] + ([breakdown] if breakdown else [])
+                trend = rollup(cube, by, cube_filters, period_range).reset_index().sort_values('period')
+                st.caption("Built from the precomputed department × position × period cube; the join date filter does not apply here.")
+                
+                if trend.empty:
+                    st.info("No data for the selected filters.")
+                else:
+                    fig = px.line(
+                        trend,
+                        x='period_label',
+                        y=trend_metric,
+                        color=breakdown,
+                        title=f"{trend_metrics[trend_metric]} by Period",
+                        labels={'period_label': 'Period', trend_metric: trend_metrics[trend_metric],
+                                'department': 'Department', 'position': 'Position'},
+                        markers=True
+                    )
+                    fig.update_xaxes(categoryorder='array', categoryarray=trend.drop_duplicates('period')['period_label'].tolist())
+                    st.plotly_chart(fig, use_container_width=True)
+                    
+                    # Roll-up over the whole selected period range
+                    st.markdown("<h3 class='sub-header'>Totals for the Selected Periods</h3>", unsafe_allow_html=True)
+                    totals = rollup(cube, [breakdown] if breakdown else [], cube_filters, period_range)
+                    total_cols = [col for col in ['records', 'tasks_assigned', 'tasks_completed', 'working_hours', 'completion_rate',
+                                                  'productivity', 'avg_quality_score', 'avg_review_score'] if col in totals.columns]
+                    st.dataframe(totals[total_cols], use_container_width=True)
+        
+        elif view_mode == "Cohorts":
+            st.markdown("<h2 class='sub-header'>Hiring Cohorts and Tenure</h2>", unsafe_allow_html=True)
+            
+            cohort_cube = processed['cohorts']
+            
+            if cohort_cube is None:
+                st.info("Cohort analysis requires join dates in the employee table and month and year columns in the performance data.")
+            else:
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    cohort_rows = st.selectbox(
+                        "Compare:",
+                        ['cohort', 'tenure_band'],
+                        format_func={'cohort': 'Hiring cohorts', 'tenure_band': 'Tenure bands'}.get
+                    )
+                with col2:
+                    granularity = st.radio("Cohorts by:", COHORT_GRANULARITIES, horizontal=True, disabled=cohort_rows != 'cohort')
+                with col3:
+                    # Metric label and its number format in the matrix
+                    cohort_metrics = {
+                        'completion_rate': ('Completion Rate', '.1%'), 'productivity': ('Productivity', '.3f'),
+                        'avg_quality_score': ('Avg Quality Score', '.2f'), 'avg_review_score': ('Avg Review Score', '.2f'),
+                        'records': ('Active Employees', ',.0f'), 'tasks_completed': ('Tasks Completed', ',.0f')
+                    }
+                    available = cube_metrics(cohort_cube.iloc[:0]).columns
+                    cohort_metric = st.selectbox(
+                        "Metric:",
+                        [metric for metric in cohort_metrics if metric in available],
+                        format_func=lambda metric: cohort_metrics[metric][0]
+                    )
+                metric_label, metric_format = cohort_metrics[cohort_metric]
+                row_label = 'Hiring Cohort' if cohort_rows == 'cohort' else 'Tenure'
+                
+                # Slice the cohort cube with the sidebar filters
+                cube_filters = {'department': value_filters['department'], 'position': value_filters['position']}
+                matrix = cohort_matrix(cohort_cube, cohort_metric, cohort_rows, cube_filters, period_range, granularity)
+                st.caption("Built from the precomputed cohort × tenure band × period cube; tenure is counted at each period. "
+                           "The join date filter does not apply here.")
+                
+                if matrix.empty:
+                    st.info("No data for the selected filters.")
+                else:
+                    fig = px.imshow(
+                        matrix,
+                        aspect='auto',
+                        color_continuous_scale='Blues',
+                        text_auto=metric_format,
+                        labels={'x': 'Period', 'y': row_label, 'color': metric_label},
+                        title=f"{metric_label} by {row_label} and Period"
+                    )
+                    fig.update_layout(height=max(400, 40 * len(matrix)))
+                    st.plotly_chart(fig, use_container_width=True)
+                    
+                    # Each cohort or band over the whole selected period range
+                    st.markdown("<h3 class='sub-header'>Totals for the Selected Periods</h3>", unsafe_allow_html=True)
+                    totals = cohort_rollup(cohort_cube, [cohort_rows], cube_filters, period_range, granularity)
+                    label_col = 'cohort_label' if cohort_rows == 'cohort' else 'tenure_label'
+                    if cohort_metric != 'records':
+                        fig = px.bar(
+                            totals,
+                            x=label_col,
+                            y=cohort_metric,
+                            title=f"{metric_label} by {row_label}",
+                            labels={label_col: row_label, cohort_metric: metric_label},
+                            text_auto=metric_format
+                        )
+                        st.plotly_chart(fig, use_container_width=True)
+                    
+                    total_cols = [col for col in [label_col, 'records', 'tasks_assigned', 'tasks_completed', 'working_hours',
+                                                  'completion_rate', 'productivity', 'avg_quality_score', 'avg_review_score']
+                                  if col in totals.columns]
+                    st.dataframe(totals[total_cols].set_index(label_col), use_container_width=True)
+        
         elif view_mode == "AI Insights":
             st.markdown("<h2 class='sub-header'>AI Performance Insights</h2>", unsafe_allow_html=True)
             
@@ -819,33 +1644,13 @@ if 'data_dict' in locals() and data_dict:
                 with col1:
                     # Completion rate by department
                     if dept_performance is not None and 'dept_completion_rate' in dept_performance:
-                        fig = px.bar(
-                            dept_performance,
-                            x='department',
-                            y='dept_completion_rate',
-                            title='Task Completion Rate by Department',
-                            labels={'dept_completion_rate': 'Completion Rate', 'department': 'Department'},
-                            color='department',
-                            text_auto='.1%'
-                        )
-                        fig.update_traces(texttemplate='%{text}', textposition='outside')
-                        fig.update_layout(height=400)
+                        fig = get_figure('department_completion', dept_performance, dataset_fingerprint, table_filters)
                         st.plotly_chart(fig, use_container_width=True)
                 
                 with col2:
                     # Employee distribution
                     if 'department' in employee_data.columns:
-                        dept_counts = employee_data['department'].value_counts().reset_index()
-                        dept_counts.columns = ['department', 'count']
-                        
-                        fig = px.pie(
-                            dept_counts,
-                            names='department',
-                            values='count',
-                            title='Employee Distribution by Department',
-                            color='department',
-                            hole=0.4
-                        )
+                        fig = get_figure('department_distribution', employee_data, dataset_fingerprint, table_filters, hole=0.4)
                         st.plotly_chart(fig, use_container_width=True)
             
             with tabs[1]:
@@ -856,7 +1661,7 @@ if 'data_dict' in locals() and data_dict:
                     
                     if selected_dept:
                         with st.spinner(f"Analyzing {selected_dept} department..."):
-                            dept_filtered_data = performance_data[performance_data['department'] == selected_dept]
+                            dept_filtered_data = filter_by_department(processed, selected_dept)
                             dept_ai_insights = generate_ai_insights(employee_data, dept_filtered_data, department=selected_dept)
                             st.markdown(f"<div class='ai-insights'>{dept_ai_insights}</div>", unsafe_allow_html=True)
                         
@@ -870,9 +1675,8 @@ if 'data_dict' in locals() and data_dict:
                         
                         with col1:
                             # Top performers in department
-                            if 'productivity' in dept_filtered_data.columns and 'name' in dept_filtered_data.columns:
-                                top_dept_employees = dept_filtered_data.sort_values('productivity', ascending=False).head(5)
-                                
+                            top_dept_employees = leaderboard(processed, 'productivity', 5, department=selected_dept)
+                            if top_dept_employees is not None and not top_dept_employees.empty:
                                 fig = px.bar(
                                     top_dept_employees,
                                     x='name',
@@ -886,13 +1690,10 @@ if 'data_dict' in locals() and data_dict:
                         with col2:
                             # Quality score distribution
                             if 'quality_score' in dept_filtered_data.columns:
-                                fig = px.histogram(
-                                    dept_filtered_data,
-                                    x='quality_score',
+                                fig = histogram_figure(
+                                    bin_histogram(dept_filtered_data['quality_score'], nbins=10),
                                     title=f'Quality Score Distribution in {selected_dept}',
-                                    labels={'quality_score': 'Quality Score'},
-                                    color_discrete_sequence=['royalblue'],
-                                    nbins=10
+                                    x_label='Quality Score'
                                 )
                                 st.plotly_chart(fig, use_container_width=True)
                 else:
@@ -0,0 +1,198 @@
+"""
+Parity checks and benchmark of the analytics engines (pandas, DuckDB, Polars).
+
+Every available engine runs the same operations on generated data with the
+db.py schema and distributions (demo.build_demo_data) at several scales. Each
+result is compared with the pandas reference first (frames, row positions and
+prompt digests, floats to a relative tolerance), then timed. The DuckDB merge
+straight from SQLite is checked (against pandas on the tables as ingest.load_data
+reads them back) and timed on a copy of the tables written to a temporary
+database. test_engines.py runs the same parity checks under pytest.
+
+Usage:
+    python bench_engines.py --scales 1000,10000,100000 --repeat 3
+    python bench_engines.py --scales 100,1000 --parity-only   # exits with 1 on any mismatch
+"""
+import argparse
+import math
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from demo import build_demo_data
+from engines import ENGINES, available_engines, get_engine
+from ingest import load_data
+from performance import DEPARTMENT_MEAN_COLS, DEPARTMENT_SUM_COLS, EMPLOYEE_MEAN_COLS, EMPLOYEE_SUM_COLS
+from row_index import build_row_index, date_key, select_rows
+
+# Relative tolerance of float comparisons (sums may be added up in a different order)
+RELATIVE_TOLERANCE = 1e-9
+
+
+# Function to build the operations compared across engines for one dataset
+def build_operations(tables):
+    """
+    Return {operation name: function(engine, merged rows)}; the merged rows are the pandas
+    reference merge, so every operation after the merge runs on the same input.
+    """
+    employees, metrics = tables['employees'], tables['performance_metrics']
+    some_department = employees['department'].iloc[0]
+    some_name = employees['name'].iloc[len(employees) // 2]
+    some_ids = employees['employee_id'].iloc[:3].tolist()
+
+    filters = [
+        ({'department': [some_department]}, {}),
+        ({'position': ['Manager', 'Analyst']}, {'period': (202411, 202501)}),
+        ({'employee_id': some_ids}, {}),
+        ({}, {'join_date': (date_key('2020-01-01'), None)}),
+    ]
+
+    return {
+        'merge': lambda engine, rows: engine.analyze_performance(employees, metrics),
+        'department totals': lambda engine, rows: engine.group_totals(
+            rows, 'department', DEPARTMENT_SUM_COLS, DEPARTMENT_MEAN_COLS),
+        'employee totals': lambda engine, rows: engine.group_totals(
+            rows, 'employee_id', EMPLOYEE_SUM_COLS, EMPLOYEE_MEAN_COLS),
+        'department performance': lambda engine, rows: engine.department_performance(rows),
+        'filters': lambda engine, rows: [engine.filter_rows(rows, values, ranges) for values, ranges in filters],
+        'prompt digests': lambda engine, rows: [
+            engine.prompt_digest(rows),
+            engine.prompt_digest(rows, 'department', some_department),
+            engine.prompt_digest(rows, 'name', some_name),
+        ],
+    }, filters
+
+
+def _same_value(expected, actual):
+    if isinstance(expected, (float, np.floating)) or isinstance(actual, (float, np.floating)):
+        if expected is None or actual is None:
+            return False
+        if math.isnan(expected) or math.isnan(actual):
+            return math.isnan(expected) and math.isnan(actual)
+        return math.isclose(expected, actual, rel_tol=RELATIVE_TOLERANCE)
+    return expected == actual
+
+
+# Function to describe how a result differs from the reference (None when they match)
+def compare(expected, actual):
+    if isinstance(expected, pd.DataFrame):
+        try:
+            pd.testing.assert_frame_equal(expected, actual, check_exact=False, rtol=RELATIVE_TOLERANCE)
+        except AssertionError as e:
+            return str(e).splitlines()[0]
+        return None
+
+    if isinstance(expected, np.ndarray) or expected is None:
+        same = (actual is None) if expected is None else (actual is not None and np.array_equal(expected, actual))
+        return None if same else f"row positions differ ({len(expected) if expected is not None else None} "\
+                                  f"vs {len(actual) if actual is not None else None})"
+
+    if isinstance(expected, dict):
+        differences = [f"{key}: {expected[key]!r} vs {actual.get(key)!r}" for key in expected
+                       if not _same_value(expected[key], actual.get(key))]
+        return "; ".join(differences) or None
+
+    for i, (one, other) in enumerate(zip(expected, actual)):
+        difference = compare(one, other)
+        if difference:
+            return f"[{i}] {difference}"
+    return None
+
+
+# Function to write the tables of a dataset to a SQLite file
+def write_sqlite(tables, path):
+    conn = sqlite3.connect(path)
+    try:
+        for table_name, df in tables.items():
+            df.to_sql(table_name, conn, index=False, if_exists='replace')
+    finally:
+        conn.close()
+
+
+def time_call(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return min(timings), statistics.median(timings)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Check parity and benchmark the PerformX analytics engines")
+    parser.add_argument("--scales", default="1000,10000,100000", help="Comma-separated numbers of employees")
+    parser.add_argument("--engines", default=",".join(ENGINES), help="Comma-separated engines to compare")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per operation, engine and scale")
+    parser.add_argument("--parity-only", action="store_true", help="Only check that every engine matches pandas")
+    parser.add_argument("--no-sqlite", action="store_true", help="Skip the DuckDB merge straight from SQLite")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    requested = [name.strip() for name in args.engines.split(",") if name.strip()]
+    engines = {name: get_engine(name) for name in requested if name in available_engines()}
+    missing = [name for name in requested if name not in engines]
+    if missing:
+        print(f"Skipping engines that are not installed: {', '.join(missing)}")
+    reference = get_engine('pandas')
+
+    mismatches = []
+    print(f"CPUs: {os.cpu_count()}" + ("" if args.parity_only else f", best / median of {args.repeat} runs in seconds"))
+    if not args.parity_only:
+        print(f"{'employees':>10} {'rows':>10} {'operation':<24} " + " ".join(f"{name:>17}" for name in engines))
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for scale in [int(value) for value in args.scales.split(",")]:
+            tables = build_demo_data(scale)
+            rows = reference.analyze_performance(tables['employees'], tables['performance_metrics'])
+            operations, filters = build_operations(tables)
+
+            # The row index answers the filters in the app; scans must select the same rows
+            row_index = build_row_index(rows)
+            indexed = [select_rows(row_index, values, ranges) for values, ranges in filters]
+            difference = compare(indexed, operations['filters'](reference, rows))
+            if difference:
+                mismatches.append((scale, 'pandas', 'filters vs row index', difference))
+
+            if not args.no_sqlite and 'duckdb' in engines:
+                db_file = os.path.join(tmp_dir, f"engines_{scale}.db")
+                write_sqlite({name: tables[name] for name in ['employees', 'performance_metrics']}, db_file)
+                operations['merge from SQLite'] = lambda engine, rows, db_file=db_file: engine.analyze_sqlite(db_file)
+                stored, _ = load_data(db_file)
+                sqlite_rows = reference.analyze_performance(stored['employees'], stored['performance_metrics'])
+
+            for operation, function in operations.items():
+                expected = function(reference, rows) if operation != 'merge from SQLite' else sqlite_rows
+                timings = {}
+                for name, engine in engines.items():
+                    if operation == 'merge from SQLite' and not hasattr(engine, 'analyze_sqlite'):
+                        continue
+                    difference = compare(expected, function(engine, rows))
+                    if difference:
+                        mismatches.append((scale, name, operation, difference))
+                    if not args.parity_only:
+                        timings[name] = time_call(lambda: function(engine, rows), args.repeat)
+
+                if not args.parity_only:
+                    cells = [f"{timings[name][0]:>8.3f} /{timings[name][1]:>7.3f}" if name in timings else f"{'-':>17}"
+                             for name in engines]
+                    print(f"{scale:>10} {len(rows):>10} {operation:<24} " + " ".join(cells))
+
+            if args.parity_only:
+                print(f"{scale:>10} employees, {len(rows)} rows: "
+                      f"{'parity' if not any(m[0] == scale for m in mismatches) else 'MISMATCH'}")
+
+    for scale, name, operation, difference in mismatches:
+        print(f"Mismatch at {scale} employees, {name}, {operation}: {difference}", file=sys.stderr)
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
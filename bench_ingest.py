@@ -0,0 +1,92 @@
+"""
+Benchmark of the SQLite loaders on the db.py schema at several scales.
+
+Compares the original sequential loader (`load_data`, default connection) with the
+read-only, pragma-tuned loader that reads tables concurrently (`load_data_parallel`).
+The test database from db.py is tiled with shifted employee IDs to reach each scale.
+
+Usage:
+    python db.py                      # creates performx_test_data.db
+    python bench_ingest.py --scales 1,100,1000 --repeat 3
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+from functools import partial
+
+import pandas as pd
+
+from ingest import load_data, load_data_parallel
+
+SOURCE_DB = "performx_test_data.db"
+
+
+# Function to build a copy of the db.py database scaled up `scale` times
+def build_scaled_db(source_db, scale, path):
+    tables, _ = load_data(source_db)
+    id_span = int(tables['employees']['employee_id'].max()) + 1
+
+    conn = sqlite3.connect(path)
+    try:
+        for table_name, df in tables.items():
+            copies = []
+            for i in range(scale):
+                copy = df.copy()
+                if 'employee_id' in copy.columns:
+                    copy['employee_id'] = copy['employee_id'] + i * id_span
+                if 'manager_id' in copy.columns:
+                    copy['manager_id'] = copy['manager_id'] + i * id_span
+                copies.append(copy)
+            pd.concat(copies, ignore_index=True).to_sql(table_name, conn, index=False, if_exists='replace')
+    finally:
+        conn.close()
+
+    return {table_name: len(df) * scale for table_name, df in tables.items()}
+
+
+def time_loader(loader, db_file, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        data_dict, error = loader(db_file)
+        timings.append(time.perf_counter() - started)
+        if error:
+            raise RuntimeError(error)
+    return min(timings), statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PerformX SQLite loaders")
+    parser.add_argument("--source", default=SOURCE_DB, help="Database created by db.py")
+    parser.add_argument("--scales", default="1,100,1000", help="Comma-separated scale factors")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per loader and scale")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.source):
+        parser.error(f"{args.source} not found; run `python db.py` first")
+
+    loaders = {
+        'load_data': load_data,
+        'parallel (threads)': load_data_parallel,
+        'parallel (processes)': partial(load_data_parallel, use_processes=True),
+    }
+
+    print(f"CPUs: {os.cpu_count()}, best / median of {args.repeat} runs in seconds")
+    print(f"{'scale':>6} {'rows':>10} {'size MB':>8} " + " ".join(f"{name:>22}" for name in loaders))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for scale in [int(value) for value in args.scales.split(",")]:
+            db_file = os.path.join(tmp_dir, f"scaled_{scale}.db")
+            row_counts = build_scaled_db(args.source, scale, db_file)
+            size_mb = os.path.getsize(db_file) / (1024 * 1024)
+
+            results = {name: time_loader(loader, db_file, args.repeat) for name, loader in loaders.items()}
+
+            print(f"{scale:>6} {sum(row_counts.values()):>10} {size_mb:>8.1f} "
+                  + " ".join(f"{best:>10.3f} / {median:<9.3f}" for best, median in results.values()))
+
+
+if __name__ == "__main__":
+    main()
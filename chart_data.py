@@ -0,0 +1,181 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+# Plotly serializes every row it is given into the figure JSON that is sent to
+# the browser. The helpers in this module reduce chart inputs to a bounded
+# number of points first, so figure payloads stay the same size no matter how
+# many employees or periods are loaded.
+
+# Maximum number of points kept per time series after downsampling
+MAX_SERIES_POINTS = 500
+
+# Default number of histogram bins
+DEFAULT_BINS = 10
+
+# Maximum number of slices in a pie chart before small ones are folded into "Other"
+MAX_PIE_SLICES = 12
+
+# Above this many points scatter-like traces are rendered with WebGL
+WEBGL_THRESHOLD = 1000
+
+
+# Function to pre-bin a numeric column for a histogram
+def bin_histogram(values, nbins=DEFAULT_BINS, value_range=None, weights=None):
+    """
+    Bin values with NumPy and return one row per bin (start, end, center, count).
+    The result has at most `nbins` rows regardless of the input size. With `weights`
+    (one per value) the counts are weighted, e.g. to scale a sample up to its population.
+    """
+    values = pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype=float)
+    valid = ~np.isnan(values)
+    values = values[valid]
+    if weights is not None:
+        weights = np.asarray(weights, dtype=float)[valid]
+
+    if values.size == 0:
+        counts, edges = np.zeros(0, dtype=int), np.zeros(1)
+    else:
+        counts, edges = np.histogram(values, bins=nbins, range=value_range, weights=weights)
+
+    return pd.DataFrame({
+        'bin_start': edges[:-1],
+        'bin_end': edges[1:],
+        'bin_center': (edges[:-1] + edges[1:]) / 2,
+        'count': counts
+    })
+
+
+# Function to pre-aggregate a bar chart
+def aggregate_bars(data, x, y, agg='mean', top_n=None, ascending=False):
+    """
+    Group `data` by `x` and aggregate `y`, optionally keeping only the `top_n` bars.
+    """
+    bars = data.groupby(x, observed=True)[y].agg(agg).reset_index()
+
+    if top_n is not None:
+        bars = bars.sort_values(y, ascending=ascending).head(top_n)
+
+    return bars
+
+
+# Function to pre-aggregate a pie chart
+def aggregate_pie(data, names, values=None, max_slices=MAX_PIE_SLICES, other_label='Other'):
+    """
+    Sum `values` (or count rows when `values` is None) per `names` category.
+    Categories beyond the largest `max_slices - 1` are folded into a single `other_label` slice.
+    """
+    if values is None:
+        slices = data[names].value_counts().reset_index()
+        slices.columns = [names, 'count']
+        values = 'count'
+    else:
+        slices = data.groupby(names, observed=True)[values].sum().reset_index()
+
+    slices = slices.sort_values(values, ascending=False)
+
+    if len(slices) > max_slices:
+        head = slices.head(max_slices - 1)
+        other = pd.DataFrame({names: [other_label], values: [slices[values].iloc[max_slices - 1:].sum()]})
+        slices = pd.concat([head, other], ignore_index=True)
+
+    return slices.reset_index(drop=True)
+
+
+# Function to downsample a series with Largest-Triangle-Three-Buckets
+def lttb(x, y, threshold):
+    """
+    Return the positions of the points kept by the LTTB algorithm.
+    The first and last points are always kept; `threshold` points are returned in total.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # threshold - 2 buckets between the fixed first and last points
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    selected = np.empty(threshold, dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+
+        # Area of the triangle formed with the previous point and the next bucket average
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a]) -
+            (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+
+    return selected
+
+
+# Function to downsample a frame for a line chart
+def downsample_series(data, x, y_cols, max_points=MAX_SERIES_POINTS):
+    """
+    Reduce `data` to roughly `max_points` rows while preserving the shape of each `y_cols` series.
+    `data` must already be sorted by `x`. Non-numeric x values (e.g. period labels) are treated as positions.
+    """
+    if len(data) <= max_points:
+        return data
+
+    if isinstance(y_cols, str):
+        y_cols = [y_cols]
+
+    if pd.api.types.is_numeric_dtype(data[x]):
+        x_values = data[x].to_numpy(dtype=float)
+    elif pd.api.types.is_datetime64_any_dtype(data[x]):
+        x_values = data[x].to_numpy().astype('int64').astype(float)
+    else:
+        x_values = np.arange(len(data), dtype=float)
+
+    # Split the point budget between the series and keep the union of their points
+    budget = max(3, max_points // len(y_cols))
+    keep = set()
+    for col in y_cols:
+        y_values = data[col].to_numpy(dtype=float)
+        y_values = np.where(np.isnan(y_values), np.nanmean(y_values), y_values)
+        keep.update(lttb(x_values, y_values, budget).tolist())
+
+    return data.iloc[sorted(keep)]
+
+
+# Function to choose the Plotly Express render mode for scatter-like charts
+def render_mode(n_points):
+    return 'webgl' if n_points > WEBGL_THRESHOLD else 'svg'
+
+
+# Function to create a scatter trace, switching to WebGL for large inputs
+def scatter_trace(x, y, **kwargs):
+    trace_type = go.Scattergl if len(x) > WEBGL_THRESHOLD else go.Scatter
+    return trace_type(x=x, y=y, **kwargs)
+
+
+# Function to build a histogram figure from pre-binned data
+def histogram_figure(binned, title, x_label, color='royalblue'):
+    fig = go.Figure(go.Bar(
+        x=binned['bin_center'],
+        y=binned['count'],
+        width=(binned['bin_end'] - binned['bin_start']),
+        customdata=np.stack([binned['bin_start'], binned['bin_end']], axis=-1),
+        hovertemplate='%{customdata[0]:.2f} - %{customdata[1]:.2f}<br>Count: %{y}<extra></extra>',
+        marker_color=color
+    ))
+
+    fig.update_layout(
+        title=title,
+        xaxis_title=x_label,
+        yaxis_title='Count',
+        bargap=0.05
+    )
+
+    return fig
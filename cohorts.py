@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+
+from cube import rollup, sum_cells
+from row_index import period_keys
+
+# Hiring cohort and tenure analytics. join_date is parsed once per distinct
+# value, then every performance row gets its hiring cohort (join quarter) and
+# its tenure band at that row's period by integer arithmetic on month numbers
+# and a binary search over the band edges. The rows are summed into a
+# department x position x cohort x tenure band x period cube of additive
+# totals (the same cells as cube.py), so cohort x period matrices, tenure
+# curves and roll-ups are group-bys over the small cube, not the rows.
+
+COHORT_DIMENSIONS = ['department', 'position', 'cohort', 'tenure_band', 'period']
+
+# Tenure band edges in months since joining, and their labels
+TENURE_EDGES = [0, 6, 12, 24, 36, 60]
+TENURE_LABELS = ['< 6 months', '6-12 months', '1-2 years', '2-3 years', '3-5 years', '5+ years']
+
+# Granularities of the hiring cohorts (cohort keys are year * 10 + quarter)
+COHORT_GRANULARITIES = ['Quarter', 'Year']
+
+
+# Function to convert join dates to month numbers (year * 12 + month - 1)
+def join_months(join_dates):
+    """
+    Parse every distinct join date once and map the result back to the rows. Unparseable or
+    missing dates give NaN.
+    """
+    codes, uniques = pd.factorize(join_dates)
+    parsed = pd.to_datetime(pd.Series(uniques, dtype=object), errors='coerce')
+    months = (parsed.dt.year * 12 + parsed.dt.month - 1).to_numpy(dtype=float)
+    # Code -1 (missing) picks the NaN appended at the end
+    return np.append(months, np.nan)[codes]
+
+
+# Function to assign every tenure (in months) to its band code (NaN before joining or when unknown)
+def tenure_band_codes(tenure_months):
+    tenure_months = np.asarray(tenure_months, dtype=float)
+    codes = np.searchsorted(TENURE_EDGES, tenure_months, side='right') - 1.0
+    codes[np.isnan(tenure_months) | (tenure_months < 0)] = np.nan
+    return codes
+
+
+# Function to build the cohort cube of a merged performance frame
+def build_cohort_cube(performance_data):
+    """
+    Return the cube indexed by department and position (when available), cohort, tenure_band
+    and period, with a 'records' count, sums of CUBE_SUM_COLS and sums plus '<col>_count' of
+    CUBE_MEAN_COLS; None without join_date, year and month columns.
+    """
+    if not {'join_date', 'year', 'month'}.issubset(performance_data.columns):
+        return None
+
+    joined = join_months(performance_data['join_date'])
+    periods = period_keys(performance_data).to_numpy(dtype=float)
+    # Unknown months have month number 0 in the period key
+    period_months = np.where(periods % 100 > 0, (periods // 100) * 12 + periods % 100 - 1, np.nan)
+
+    keys = [performance_data[col] for col in COHORT_DIMENSIONS[:2] if col in performance_data.columns]
+    keys.append(pd.Series((joined // 12) * 10 + (joined % 12) // 3 + 1, index=performance_data.index, name='cohort'))
+    keys.append(pd.Series(tenure_band_codes(period_months - joined), index=performance_data.index, name='tenure_band'))
+    keys.append(pd.Series(periods, index=performance_data.index, name='period'))
+    return sum_cells(performance_data, keys)
+
+
+# Function to label a cohort key
+def cohort_label(key, granularity='Quarter'):
+    if key != key:
+        return 'Unknown'
+    key = int(key)
+    return str(key) if granularity == 'Year' else f"{key // 10} Q{key % 10}"
+
+
+# Function to label a tenure band code
+def tenure_label(code):
+    return TENURE_LABELS[int(code)] if code == code else 'Unknown'
+
+
+# Function to slice the cohort cube and roll it up to the requested dimensions
+def cohort_rollup(cube, by, filters=None, period_range=(None, None), granularity='Quarter'):
+    """
+    cube.rollup over the cohort cube: `filters` maps dimensions to accepted values and `by`
+    lists the dimensions kept. Yearly cohorts merge the quarters of each year. Returns the
+    totals with their rates and averages, plus cohort_label / tenure_label columns for the
+    kept dimensions.
+    """
+    if granularity == 'Year' and 'cohort' in cube.index.names:
+        cube = cube.rename(index=lambda key: key // 10, level='cohort')
+
+    metrics = rollup(cube, by, filters, period_range)
+
+    if 'cohort' in metrics.index.names:
+        metrics['cohort_label'] = [cohort_label(key, granularity) for key in metrics.index.get_level_values('cohort')]
+    if 'tenure_band' in metrics.index.names:
+        metrics['tenure_label'] = [tenure_label(code) for code in metrics.index.get_level_values('tenure_band')]
+    return metrics
+
+
+# Function to build a cohort x period (or tenure band x period) matrix of one metric
+def cohort_matrix(cube, metric, rows='cohort', filters=None, period_range=(None, None), granularity='Quarter'):
+    """
+    Return a frame with one row per cohort (or tenure band) and one column per period label,
+    ordered chronologically; cells without rows are NaN.
+    """
+    totals = cohort_rollup(cube, [rows, 'period'], filters, period_range, granularity).reset_index()
+    if totals.empty:
+        return pd.DataFrame()
+
+    row_labels = 'cohort_label' if rows == 'cohort' else 'tenure_label'
+    totals = totals.sort_values([rows, 'period'], na_position='last')
+    matrix = totals.pivot(index=row_labels, columns='period_label', values=metric)
+    matrix = matrix.reindex(index=totals[row_labels].unique(), columns=totals.sort_values('period')['period_label'].unique())
+    matrix.index.name = 'Cohort' if rows == 'cohort' else 'Tenure'
+    matrix.columns.name = 'Period'
+    return matrix
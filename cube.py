@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+
+from row_index import period_keys, period_label
+
+# Department x position x period cube of additive totals, built once per
+# dataset from the merged performance frame. Every cell holds sums and
+# non-null counts, so any slice, roll-up or drill-down is a group-by over the
+# (small) cube instead of the raw rows, and appended rows are folded in by
+# adding the cube of the new rows.
+
+CUBE_DIMENSIONS = ['department', 'position', 'period']
+CUBE_SUM_COLS = ['tasks_assigned', 'tasks_completed', 'working_hours']
+CUBE_MEAN_COLS = ['quality_score', 'review_score', 'revenue_generated', 'customer_feedback', 'bugs_fixed']
+
+
+# Function to build the cube of a merged performance frame
+def build_cube(performance_data):
+    """
+    Return the cube indexed by the available dimensions (period is required), with a
+    'records' count, sums of CUBE_SUM_COLS and sums plus '<col>_count' of CUBE_MEAN_COLS.
+    """
+    if 'year' not in performance_data.columns or 'month' not in performance_data.columns:
+        return None
+
+    keys = [performance_data[col] for col in CUBE_DIMENSIONS[:-1] if col in performance_data.columns]
+    keys.append(period_keys(performance_data).rename('period'))
+    return sum_cells(performance_data, keys)
+
+
+# Function to sum the rows of a performance frame into cube cells
+def sum_cells(performance_data, keys):
+    """
+    Group the rows by `keys` (Series aligned with the rows) into cells with a 'records'
+    count, sums of CUBE_SUM_COLS and sums plus '<col>_count' of CUBE_MEAN_COLS.
+    """
+    sum_cols = [col for col in CUBE_SUM_COLS if col in performance_data.columns]
+    mean_cols = [col for col in CUBE_MEAN_COLS if col in performance_data.columns]
+
+    # Some metrics are stored as text in SQLite (e.g. customer_feedback); sum them as numbers
+    values = performance_data[sum_cols + mean_cols].apply(pd.to_numeric, errors='coerce')
+    grouped = values.groupby(keys, dropna=False)
+    cube = grouped.sum()
+    cube = cube.join(grouped[mean_cols].count().add_suffix('_count'))
+    cube.insert(0, 'records', grouped.size())
+    return cube
+
+
+# Function to add the cube of newly appended rows to an existing cube
+def combine_cubes(cube, new_cube):
+    return pd.concat([cube, new_cube]).groupby(level=list(range(cube.index.nlevels)), dropna=False).sum()
+
+
+# Function to slice the cube and roll it up to the requested dimensions
+def rollup(cube, by=None, filters=None, period_range=(None, None)):
+    """
+    `filters` maps a dimension to the accepted values (empty means all) and
+    `period_range` bounds the period key. `by` lists the dimensions kept (period is
+    usually one of them); the rest are summed away. Returns the totals with the
+    derived rates and averages (see cube_metrics).
+    """
+    cells = cube
+    for dimension, values in (filters or {}).items():
+        if values and dimension in cells.index.names:
+            cells = cells[cells.index.get_level_values(dimension).isin(values)]
+
+    low, high = period_range
+    if low is not None or high is not None:
+        periods = cells.index.get_level_values('period')
+        cells = cells[(periods >= (low if low is not None else -np.inf)) & (periods <= (high if high is not None else np.inf))]
+
+    by = [dimension for dimension in (by or []) if dimension in cells.index.names]
+    if by:
+        totals = cells.groupby(level=by, dropna=False).sum()
+    else:
+        totals = cells.sum().to_frame().T
+
+    return cube_metrics(totals)
+
+
+# Function to derive rates and averages from summed cube cells
+def cube_metrics(totals):
+    metrics = totals.copy()
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if 'tasks_assigned' in metrics.columns:
+            metrics['completion_rate'] = metrics['tasks_completed'] / metrics['tasks_assigned'].replace(0, np.nan)
+        if 'working_hours' in metrics.columns:
+            metrics['productivity'] = metrics['tasks_completed'] / metrics['working_hours'].replace(0, np.nan)
+        for col in CUBE_MEAN_COLS:
+            if f'{col}_count' in metrics.columns:
+                metrics[f'avg_{col}'] = metrics[col] / metrics[f'{col}_count'].replace(0, np.nan)
+
+    if 'period' in metrics.index.names:
+        periods = metrics.index.get_level_values('period')
+        metrics['period_label'] = [period_label(key) if key == key else 'Unknown' for key in periods]
+
+    return metrics
@@ -0,0 +1,247 @@
+"""
+Pre-rendered dashboard snapshots for PerformX.
+
+The Overview and Department Analysis views are rendered once per dataset version
+for every department filter, for all periods and for the latest period: KPI
+values, the department figures and top performers as Plotly JSON, and the AI
+insight texts. The app serves those views from the snapshot and computes live
+only what the snapshot does not cover (other filters and widget settings).
+
+Usage:
+    python dashboards.py performx_test_data.db
+    python dashboards.py performx_test_data.db --no-ai
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import insights
+from figures import CHART_BUILDERS, top_performers_figure
+from ingest import file_fingerprint, load_data_cached
+from performance import build_processed_state, filter_rows
+from ranking import RANK_METRICS, leaderboard
+
+# Directory where dashboard snapshots are kept
+DASHBOARD_DIR = os.environ.get("PERFORMX_DASHBOARD_DIR", os.path.join(os.getcwd(), ".performx_dashboards"))
+
+# Department figures rendered into every snapshot
+SNAPSHOT_CHARTS = ['department_completion', 'department_productivity', 'department_tasks', 'department_distribution']
+
+# Default Top Performers settings of the Overview
+DEFAULT_TOP_N = 5
+
+# Maximum number of concurrent AI insight requests of a snapshot job
+SNAPSHOT_WORKERS = 4
+
+_running_jobs = set()
+_jobs_lock = threading.Lock()
+
+
+# Function to get the snapshot version of a processed dataset
+def dashboard_version(processed_key):
+    return hashlib.sha256(repr(processed_key).encode()).hexdigest()
+
+
+# Function to name a department and period range slice of a snapshot
+def slice_key(department, period_range):
+    return json.dumps([department, *period_range])
+
+
+# Function to compute the Overview KPIs of a slice of performance data
+def overview_kpis(performance_data):
+    kpis = {'employees': len(performance_data), 'completion_rate': None, 'quality_score': None, 'review_score': None}
+
+    if 'tasks_completed' in performance_data.columns and 'tasks_assigned' in performance_data.columns:
+        kpis['completion_rate'] = float(performance_data['tasks_completed'].sum() / performance_data['tasks_assigned'].sum() * 100)
+    for col in ['quality_score', 'review_score']:
+        if col in performance_data.columns:
+            kpis[col] = float(performance_data[col].mean())
+
+    return kpis
+
+
+# Function to render every snapshotted view of a processed dataset
+def build_dashboard_snapshot(processed, insight_fn=None, workers=SNAPSHOT_WORKERS):
+    """
+    Return the snapshot as a JSON-serializable dict: 'figures' (chart name to figure JSON,
+    independent of the filters) and 'slices' keyed by slice_key(department, period_range).
+    `insight_fn(employee_data, performance_data, department=None)` generates the AI texts;
+    without it (or when a request fails) the slice holds no insight.
+    """
+    performance_data = processed['performance_data']
+    dept_performance = processed['dept_performance']
+    employee_data = processed['employee_data']
+
+    figures = {}
+    if dept_performance is not None:
+        for chart in SNAPSHOT_CHARTS:
+            data = employee_data if chart == 'department_distribution' else dept_performance
+            if 'department' in data.columns:
+                figures[chart] = CHART_BUILDERS[chart](data).to_json()
+
+    departments = dept_performance['department'].dropna().tolist() if dept_performance is not None else []
+    period_ranges = [(None, None)]
+    if processed['cube'] is not None:
+        periods = processed['cube'].index.get_level_values('period').dropna()
+        if len(periods):
+            latest = int(periods.max())
+            period_ranges.append((latest, latest))
+
+    top_metric = next((metric for metric in RANK_METRICS if metric in performance_data.columns), None)
+
+    slices = {}
+    prompts = []
+    for department in ['All'] + departments:
+        for period_range in period_ranges:
+            value_filters = {'department': [department] if department != 'All' else []}
+            rows, _ = filter_rows(processed, value_filters, {'period': period_range})
+
+            top_performers = None
+            if top_metric is not None:
+                top_employees = leaderboard(
+                    processed,
+                    top_metric,
+                    DEFAULT_TOP_N,
+                    department=department if department != 'All' else None,
+                    period=period_range[0]
+                )
+                if top_employees is not None and not top_employees.empty:
+                    top_performers = {
+                        'metric': top_metric,
+                        'figure': top_performers_figure(top_employees, top_metric).to_json(),
+                        'table': top_employees.to_json(orient='split')
+                    }
+
+            key = slice_key(department, period_range)
+            slices[key] = {
+                'kpis': overview_kpis(rows),
+                'top_performers': top_performers,
+                'overview_insight': None,
+                'department_insight': None
+            }
+            if insight_fn is not None and not rows.empty:
+                prompts.append((key, 'overview_insight', rows, None))
+                if department != 'All':
+                    prompts.append((key, 'department_insight', rows, department))
+
+    # Insights are the slow part, so they are requested concurrently
+    if prompts:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            futures = [
+                (key, field, executor.submit(insight_fn, employee_data, rows, department=department))
+                for key, field, rows, department in prompts
+            ]
+            for key, field, future in futures:
+                text = future.result()
+                # Failed requests are left out so the app retries them live
+                if not text.startswith("Error querying AI"):
+                    slices[key][field] = text
+
+    return {'figures': figures, 'slices': slices}
+
+
+def _snapshot_path(version, directory=None):
+    return os.path.join(directory or DASHBOARD_DIR, f"{version}.json")
+
+
+# Function to write a dashboard snapshot
+def write_dashboard_snapshot(snapshot, version, directory=None):
+    directory = directory or DASHBOARD_DIR
+    os.makedirs(directory, exist_ok=True)
+
+    # Publish the snapshot atomically so readers never see a partial one
+    fd, staging_path = tempfile.mkstemp(dir=directory, prefix=".staging-")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(snapshot, f)
+        os.replace(staging_path, _snapshot_path(version, directory))
+    finally:
+        if os.path.exists(staging_path):
+            os.remove(staging_path)
+
+
+# Function to read a dashboard snapshot, or None when the version has none
+def read_dashboard_snapshot(version, directory=None):
+    try:
+        with open(_snapshot_path(version, directory)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+# Function to render and store the snapshot of a dataset version in a background thread
+def start_snapshot_job(processed, insight_fn=None):
+    """
+    Start the snapshot job unless the version already has a snapshot or a job running.
+    Returns True when a job was started.
+    """
+    if processed['performance_data'] is None or processed['key'] is None or processed['key'][0] is None:
+        return False
+
+    version = dashboard_version(processed['key'])
+    with _jobs_lock:
+        if version in _running_jobs or os.path.exists(_snapshot_path(version)):
+            return False
+        _running_jobs.add(version)
+
+    def run():
+        try:
+            write_dashboard_snapshot(build_dashboard_snapshot(processed, insight_fn), version)
+        finally:
+            with _jobs_lock:
+                _running_jobs.discard(version)
+
+    threading.Thread(target=run, name=f"dashboard-snapshot-{version[:8]}", daemon=True).start()
+    return True
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-render the PerformX dashboard snapshot of a database.")
+    parser.add_argument("database", help="SQLite database file, as uploaded to the app")
+    parser.add_argument("--no-ai", action="store_true", help="Skip AI insights")
+    parser.add_argument("--workers", type=int, default=SNAPSHOT_WORKERS,
+                        help="Maximum number of concurrent AI insight requests")
+    parser.add_argument("--api-key", default=os.environ.get("GROQ_API_KEY", ""),
+                        help="Groq API key (defaults to the GROQ_API_KEY environment variable)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    fingerprint = file_fingerprint(args.database)
+    data_dict, error = load_data_cached(args.database, fingerprint)
+    if error:
+        print(f"Error loading database: {error}", file=sys.stderr)
+        return 1
+
+    if 'employees' not in data_dict or 'performance_metrics' not in data_dict:
+        print("The database must contain 'employees' and 'performance_metrics' tables.", file=sys.stderr)
+        return 1
+
+    # Same version key as an upload of this file to the app
+    processed = build_processed_state(
+        data_dict['employees'],
+        data_dict['performance_metrics'],
+        key=(fingerprint, 'employees', 'performance_metrics')
+    )
+
+    insight_fn = None
+    if not args.no_ai:
+        insights.set_api_key(args.api_key)
+        insight_fn = insights.generate_ai_insights
+
+    version = dashboard_version(processed['key'])
+    snapshot = build_dashboard_snapshot(processed, insight_fn, workers=args.workers)
+    write_dashboard_snapshot(snapshot, version)
+    print(f"Wrote dashboard snapshot {version[:12]} ({len(snapshot['slices'])} slices) to {DASHBOARD_DIR}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
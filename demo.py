@@ -0,0 +1,257 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+# In-memory demo dataset with the distributions of db.py: the same departments,
+# positions, salaries, traits and monthly performance model, generated
+# column-wise with numpy so a million employees take seconds rather than the
+# minutes a per-row loop would. Nothing is written to disk; the tables are
+# returned in the same shape load_data gives for a database written by db.py.
+
+# Employee counts offered by the demo scale slider
+DEMO_SCALES = [10, 50, 100, 1_000, 10_000, 100_000, 1_000_000]
+DEFAULT_DEMO_EMPLOYEES = 50
+
+# Seed of the demo generator (the same scale always gives the same dataset)
+DEMO_SEED = 42
+
+DEPARTMENTS = ["Engineering", "Sales", "Marketing", "HR", "Finance", "Customer Support", "Product", "Operations"]
+POSITIONS = {
+    "Engineering": ["Software Engineer", "Senior Engineer", "Tech Lead", "QA Engineer", "DevOps Engineer"],
+    "Sales": ["Sales Representative", "Account Executive", "Sales Manager", "Business Development", "Sales Analyst"],
+    "Marketing": ["Marketing Specialist", "Content Writer", "SEO Specialist", "Social Media Manager", "Brand Manager"],
+    "HR": ["HR Coordinator", "Recruiter", "HR Manager", "Benefits Specialist", "Training Coordinator"],
+    "Finance": ["Accountant", "Financial Analyst", "Finance Manager", "Bookkeeper", "Payroll Specialist"],
+    "Customer Support": ["Support Agent", "Support Manager", "Customer Success", "Technical Support", "Support Lead"],
+    "Product": ["Product Manager", "Product Owner", "UX Designer", "Product Analyst", "Technical Writer"],
+    "Operations": ["Operations Analyst", "Operations Manager", "Project Coordinator", "Business Analyst", "Admin Assistant"]
+}
+BASE_SALARY = {
+    "Engineering": 85000, "Sales": 65000, "Marketing": 60000, "HR": 55000,
+    "Finance": 70000, "Customer Support": 50000, "Product": 80000, "Operations": 60000
+}
+FIRST_NAMES = ["James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael", "Linda", "William", "Elizabeth",
+               "David", "Susan", "Richard", "Jessica", "Joseph", "Sarah", "Thomas", "Karen", "Charles", "Nancy",
+               "Daniel", "Lisa", "Matthew", "Margaret", "Anthony", "Betty", "Mark", "Sandra", "Donald", "Ashley",
+               "Steven", "Dorothy", "Paul", "Kimberly", "Andrew", "Emily", "Joshua", "Donna", "Kenneth", "Michelle",
+               "Kevin", "Carol", "Brian", "Amanda", "George", "Melissa", "Edward", "Deborah", "Ronald", "Stephanie"]
+LAST_NAMES = ["Smith", "Johnson", "Williams", "Jones", "Brown", "Davis", "Miller", "Wilson", "Moore", "Taylor",
+              "Anderson", "Thomas", "Jackson", "White", "Harris", "Martin", "Thompson", "Garcia", "Martinez", "Robinson",
+              "Clark", "Rodriguez", "Lewis", "Lee", "Walker", "Hall", "Allen", "Young", "Hernandez", "King",
+              "Wright", "Lopez", "Hill", "Scott", "Green", "Adams", "Baker", "Gonzalez", "Nelson", "Carter",
+              "Mitchell", "Perez", "Roberts", "Turner", "Phillips", "Campbell", "Parker", "Evans", "Edwards", "Collins"]
+MONTHS = [("October", 2024), ("November", 2024), ("December", 2024), ("January", 2025), ("February", 2025), ("March", 2025)]
+
+SKILLS = ["Python", "JavaScript", "React", "SQL", "Project Management", "Data Analysis",
+          "Public Speaking", "Customer Service", "Sales", "Marketing", "Content Writing",
+          "Leadership", "Budgeting", "UX Design", "DevOps", "Cloud Services",
+          "Machine Learning", "Communication", "Problem Solving", "Team Collaboration"]
+RELEVANT_SKILLS = {
+    "Engineering": ["Python", "JavaScript", "SQL", "Problem Solving", "DevOps", "Cloud Services"],
+    "Sales": ["Sales", "Communication", "Public Speaking", "Customer Service"],
+    "Marketing": ["Marketing", "Content Writing", "Communication", "Data Analysis"],
+    "HR": ["Communication", "Leadership", "Team Collaboration"],
+    "Finance": ["Budgeting", "Data Analysis", "SQL"],
+    "Customer Support": ["Customer Service", "Communication", "Problem Solving"],
+    "Product": ["UX Design", "Project Management", "Team Collaboration"],
+    "Operations": ["Project Management", "Data Analysis", "Leadership"]
+}
+TRAININGS = ["New Employee Orientation", "Leadership Development", "Technical Skills Workshop", "Communication Skills",
+             "Project Management Basics", "Advanced SQL", "Python for Data Analysis", "Cloud Services Training",
+             "Sales Techniques", "Customer Service Excellence", "Marketing Analytics", "Financial Planning",
+             "HR Compliance", "DevOps Practices", "Product Management"]
+DEPARTMENT_TRAININGS = {
+    "Engineering": ["Technical Skills Workshop", "Python for Data Analysis", "DevOps Practices"],
+    "Sales": ["Sales Techniques", "Communication Skills"],
+    "Marketing": ["Marketing Analytics", "Communication Skills"],
+    "HR": ["HR Compliance", "Communication Skills"],
+    "Finance": ["Financial Planning", "Advanced SQL"],
+    "Customer Support": ["Customer Service Excellence", "Communication Skills"],
+    "Product": ["Product Management", "Project Management Basics"],
+    "Operations": ["Project Management Basics", "Leadership Development"]
+}
+
+
+# Function to get the dataset fingerprint of a demo scale
+def demo_fingerprint(num_employees, seed=DEMO_SEED):
+    return f"demo:{num_employees}:{seed}"
+
+
+# Function to check whether a dataset fingerprint belongs to a generated demo dataset
+def is_demo_fingerprint(fingerprint):
+    return isinstance(fingerprint, str) and fingerprint.startswith("demo:")
+
+
+def _dates_before(today, days_ago):
+    # Format each distinct day once; a few thousand strings instead of one per row
+    unique_days, inverse = np.unique(days_ago, return_inverse=True)
+    labels = pd.to_datetime(today - pd.to_timedelta(unique_days, unit='D')).strftime('%Y-%m-%d').to_numpy(dtype=object)
+    return labels[inverse]
+
+
+def _pick_per_row(rng, preferred, counts, first_counts):
+    # For every row choose `counts` columns without replacement: `first_counts` of them among the
+    # row's preferred columns, the rest among the others. Random sort keys put a row's preferred
+    # columns first (in random order), then the others, so both picks are prefixes of one argsort.
+    keys = rng.random(preferred.shape, dtype=np.float32) + (~preferred)
+    order = np.argsort(keys, axis=1)
+    rank = np.arange(preferred.shape[1])
+    num_preferred = preferred.sum(axis=1)[:, None]
+    chosen = (rank < first_counts[:, None]) | (
+        (rank >= num_preferred) & (rank < num_preferred + (counts - first_counts)[:, None])
+    )
+    rows, slots = np.nonzero(chosen)
+    return rows, order[rows, slots]
+
+
+# Function to generate the employees, performance_metrics, employee_skills and training_records tables
+def build_demo_data(num_employees, seed=DEMO_SEED, today=None):
+    """
+    Return a data_dict like load_data's for a database written by db.py with `num_employees`
+    employees and six months of performance metrics. The same arguments give the same tables.
+    """
+    rng = np.random.default_rng(seed)
+    today = pd.Timestamp(today or date.today())
+    n = int(num_employees)
+    employee_ids = np.arange(1001, 1001 + n)
+
+    # Employees
+    department_idx = rng.integers(0, len(DEPARTMENTS), n)
+    position_idx = rng.integers(0, 5, n)
+    departments = np.array(DEPARTMENTS, dtype=object)[department_idx]
+    position_table = np.array([POSITIONS[department] for department in DEPARTMENTS], dtype=object)
+    positions = position_table[department_idx, position_idx]
+
+    first_idx = np.arange(n) % len(FIRST_NAMES)
+    last_idx = (np.arange(n) // len(FIRST_NAMES)) % len(LAST_NAMES)
+    full_names = np.array([f"{first} {last}" for last in LAST_NAMES for first in FIRST_NAMES], dtype=object)
+    emails = np.array([f"{first.lower()}.{last.lower()}@company.com" for last in LAST_NAMES for first in FIRST_NAMES],
+                      dtype=object)
+    name_idx = last_idx * len(FIRST_NAMES) + first_idx
+
+    days_ago = rng.integers(365, 365 * 5 + 1, n)
+    seniority_factor = 1 + ((5 * 365 - days_ago) / (5 * 365)) * 0.5
+    is_senior = np.array([[any(word in position for word in ("Senior", "Lead", "Manager")) for position in POSITIONS[d]]
+                          for d in DEPARTMENTS])[department_idx, position_idx]
+    is_specialist = np.array([[("Specialist" in position or "Analyst" in position) for position in POSITIONS[d]]
+                              for d in DEPARTMENTS])[department_idx, position_idx]
+    position_bonus = np.where(is_senior, 1.4, np.where(is_specialist, 1.2, 1.0))
+    base_salary = np.array([BASE_SALARY[department] for department in DEPARTMENTS])[department_idx]
+    salary = (base_salary * seniority_factor * position_bonus).astype(np.int64)
+    salary = (salary * rng.uniform(0.9, 1.1, n)).astype(np.int64)
+    salary = (np.round(salary / 1000) * 1000).astype(np.int64)
+
+    # 80% have a manager, drawn among the other employees
+    manager_id = np.full(n, np.nan)
+    if n > 1:
+        manager_idx = rng.integers(0, n - 1, n)
+        manager_idx += manager_idx >= np.arange(n)
+        has_manager = rng.random(n) > 0.2
+        manager_id[has_manager] = employee_ids[manager_idx[has_manager]]
+
+    employees = pd.DataFrame({
+        'employee_id': employee_ids,
+        'name': full_names[name_idx],
+        'department': departments,
+        'position': positions,
+        'join_date': _dates_before(today, days_ago),
+        'salary': salary,
+        'email': emails[name_idx],
+        'manager_id': manager_id
+    })
+
+    # Performance metrics: one row per employee and month, month by month as db.py writes them
+    efficiency = rng.uniform(0.6, 1.0, n)
+    dedication = rng.uniform(0.7, 1.0, n)
+    quality = rng.uniform(0.7, 1.0, n)
+    improvement = rng.uniform(-0.1, 0.1, n)
+
+    is_department = {department: department_idx == i for i, department in enumerate(DEPARTMENTS)}
+    task_low = np.where(is_department["Engineering"] | is_department["Product"], 15, 20)
+    task_high = np.where(is_department["Engineering"] | is_department["Product"], 25,
+                         np.where(is_department["Sales"] | is_department["Marketing"], 35, 30))
+    revenue_base = np.where(is_department["Sales"], 15000, np.where(is_department["Marketing"], 8000, 0))
+
+    months = []
+    for month_idx, (month, year) in enumerate(MONTHS):
+        base_tasks = rng.integers(task_low, task_high + 1)
+        tasks_assigned = (base_tasks * (0.8 + dedication * 0.4) * rng.uniform(0.9, 1.1, n)).astype(np.int64)
+
+        completion_pct = np.minimum(0.98, efficiency + improvement * month_idx)
+        tasks_completed = (tasks_assigned * completion_pct * rng.uniform(0.95, 1.0, n)).astype(np.int64)
+        bad_month = rng.random(n) < 0.05
+        tasks_completed = np.where(bad_month, (tasks_completed * rng.uniform(0.7, 0.85, n)).astype(np.int64), tasks_completed)
+
+        working_hours = np.round(rng.uniform(160, 180, n) * (0.9 + dedication * 0.2)).astype(np.int64)
+        quality_score = np.round(np.minimum(5.0, 3.0 + quality * 2.0 + improvement * month_idx * 1.5), 1)
+        review_score = np.round(np.minimum(5.0, (3.0 + quality * 1.8) * rng.uniform(0.9, 1.1, n)), 1)
+
+        # Revenue for Sales and Marketing, with a year-end boost and a February dip
+        revenue = np.floor(revenue_base * (0.7 + efficiency * 0.6) * (0.8 + dedication * 0.4) * rng.uniform(0.8, 1.3, n))
+        if month in ("December", "January"):
+            revenue = np.floor(revenue * rng.uniform(1.1, 1.3, n))
+        elif month == "February":
+            revenue = np.floor(revenue * rng.uniform(0.8, 0.9, n))
+        revenue = np.where(revenue_base > 0, revenue, np.nan)
+
+        customer_feedback = np.where(
+            is_department["Customer Support"],
+            np.round(np.minimum(5.0, (3.5 + quality * 1.5) * rng.uniform(0.9, 1.05, n)), 1),
+            np.nan
+        )
+        bugs_fixed = np.where(
+            is_department["Engineering"],
+            np.floor(tasks_completed * rng.uniform(0.2, 0.5, n) * efficiency),
+            np.nan
+        )
+
+        months.append(pd.DataFrame({
+            'employee_id': employee_ids,
+            'month': month,
+            'year': year,
+            'tasks_assigned': tasks_assigned,
+            'tasks_completed': tasks_completed,
+            'working_hours': working_hours,
+            'quality_score': quality_score,
+            'review_score': review_score,
+            'revenue_generated': revenue,
+            'customer_feedback': customer_feedback,
+            'bugs_fixed': bugs_fixed
+        }))
+    performance_metrics = pd.concat(months, ignore_index=True)
+
+    # Skills: 2-6 per employee (1-3 more for senior positions), mostly from their department's relevant skills
+    relevant = np.array([[skill in RELEVANT_SKILLS[department] for skill in SKILLS] for department in DEPARTMENTS])[department_idx]
+    skill_counts = rng.integers(2, 7, n) + np.where(is_senior, rng.integers(1, 4, n), 0)
+    relevant_counts = np.minimum(relevant.sum(axis=1), skill_counts - 1)
+    rows, skill_idx = _pick_per_row(rng, relevant, skill_counts, relevant_counts)
+    employee_skills = pd.DataFrame({
+        'employee_id': employee_ids[rows],
+        'skill': np.array(SKILLS, dtype=object)[skill_idx],
+        'rating': rng.integers(3, 6, len(rows))
+    })
+
+    # Trainings: 0-4 per employee, at least one from their department's trainings when any
+    in_department = np.array([[training in DEPARTMENT_TRAININGS[department] for training in TRAININGS]
+                              for department in DEPARTMENTS])[department_idx]
+    training_counts = rng.integers(0, 5, n)
+    department_counts = np.where(
+        training_counts > 0,
+        np.minimum(in_department.sum(axis=1), rng.integers(1, np.maximum(training_counts, 1) + 1)),
+        0
+    )
+    rows, training_idx = _pick_per_row(rng, in_department, training_counts, department_counts)
+    training_records = pd.DataFrame({
+        'employee_id': employee_ids[rows],
+        'training_name': np.array(TRAININGS, dtype=object)[training_idx],
+        'completion_date': _dates_before(today, rng.integers(30, 366, len(rows))),
+        'score': rng.integers(65, 101, len(rows))
+    })
+
+    return {
+        'employees': employees,
+        'performance_metrics': performance_metrics,
+        'employee_skills': employee_skills,
+        'training_records': training_records
+    }
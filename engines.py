@@ -0,0 +1,537 @@
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from ingest import MONTH_ORDER, connect_readonly
+from performance import (
+    DEPARTMENT_MEAN_COLS, DEPARTMENT_SUM_COLS, analyze_performance, department_performance_from_totals, get_group_totals
+)
+from row_index import period_keys
+
+try:
+    import duckdb
+except ImportError:  # The DuckDB engine is unavailable when duckdb is not installed
+    duckdb = None
+
+try:
+    import polars as pl
+except ImportError:  # The Polars engine is unavailable when polars is not installed
+    pl = None
+
+# Interchangeable analytics engines. Every engine implements the same few
+# operations the app and the batch reports are built on (the merge of the
+# employee and metrics tables, additive group totals and department
+# performance, filter scans and the aggregates behind the AI prompts) and
+# returns the same pandas objects, so callers never see which engine ran.
+# pandas is the reference and the default; it answers filters from the row
+# index (row_index.py), which DuckDB and Polars replace with scans on all
+# cores. They fall back to pandas for inputs they do not handle the same way
+# (e.g. clashing column names). See test_engines.py for the parity tests and
+# bench_engines.py for the timings.
+
+# Engine used when none is named
+ENGINE = os.environ.get("PERFORMX_ENGINE", "pandas")
+
+# Metrics summed and averaged in the AI prompt digests
+DIGEST_SUM_COLS = ['tasks_assigned', 'tasks_completed']
+DIGEST_MEAN_COLS = ['working_hours', 'quality_score', 'review_score']
+
+
+def _merge_keys(employee_data, metrics_data):
+    # Rows combined from several databases are only matched within their own source (as in analyze_performance)
+    if 'source' in employee_data.columns and 'source' in metrics_data.columns:
+        return ['employee_id', 'source']
+    return ['employee_id']
+
+
+def _can_merge(employee_data, metrics_data):
+    # Shapes analyze_performance handles without suffixing clashing columns or leaving the data unmerged
+    if 'employee_id' not in employee_data.columns or 'employee_id' not in metrics_data.columns:
+        return False
+    keys = _merge_keys(employee_data, metrics_data)
+    right_cols = [col for col in metrics_data.columns if col not in keys]
+    computed = {'completion_rate', 'productivity'}
+    return not (set(employee_data.columns) | computed) & set(right_cols) and not computed & set(employee_data.columns)
+
+
+def _restore_dtypes(frame, *sources):
+    # Give columns the dtype they have in the source frames, as a pandas merge or group-by would
+    dtypes = {}
+    for source in sources:
+        for col, dtype in source.dtypes.items():
+            dtypes.setdefault(col, dtype)
+
+    for col in frame.columns:
+        dtype = dtypes.get(col)
+        if dtype is None or frame[col].dtype == dtype:
+            continue
+        if pd.api.types.is_integer_dtype(dtype) and frame[col].isna().any():
+            # Integers with missing values become floats in pandas too
+            frame[col] = frame[col].astype('float64')
+        elif dtype == object:
+            # Missing values of object columns (e.g. as pandas.read_sql gives them) are None
+            frame[col] = frame[col].astype(object).where(frame[col].notna(), None)
+        else:
+            frame[col] = frame[col].astype(dtype)
+    return frame
+
+
+def _active_filters(data, value_filters, range_filters):
+    # The filters that apply to `data`, with the same meaning as in row_index.select_rows
+    values = [(col, list(accepted)) for col, accepted in (value_filters or {}).items() if accepted and col in data.columns]
+    required = {'period': ['year', 'month'], 'join_date': ['join_date']}
+    ranges = [
+        (col, low, high) for col, (low, high) in (range_filters or {}).items()
+        if (low is not None or high is not None) and col in required and set(required[col]).issubset(data.columns)
+    ]
+    return values, ranges
+
+
+def _finish_digest(digest):
+    # Missing values as pandas gives them: 0 for sums, NaN for averages, 'N/A' without a first row
+    digest.update({col: digest[col] if digest[col] is not None else 0 for col in DIGEST_SUM_COLS})
+    digest.update({col: digest[col] if digest[col] is not None else np.nan for col in DIGEST_MEAN_COLS})
+    if digest['records'] == 0:
+        digest.update(employees=0, departments=0, department='N/A', position='N/A')
+    return digest
+
+
+def _python_values(values):
+    # NumPy scalars (e.g. employee IDs picked from a frame) as plain Python values
+    return [value.item() if isinstance(value, np.generic) else value for value in values]
+
+
+class Engine:
+    """
+    Analytics operations shared by every engine; subclasses override them. The pandas
+    implementations here are the reference the others must match.
+    """
+
+    name = 'pandas'
+
+    # Whether the processed state keeps a row index to answer filters (see performance.filter_rows)
+    row_index = True
+
+    # Function to check whether the engine's library is installed
+    @classmethod
+    def available(cls):
+        return True
+
+    # Function to merge the employee and metrics tables and add the derived metrics
+    def analyze_performance(self, employee_data, metrics_data):
+        return analyze_performance(employee_data, metrics_data)
+
+    # Function to compute additive totals (sums and non-null counts) per group
+    def group_totals(self, performance_data, by, sum_cols, mean_cols):
+        return get_group_totals(performance_data, by, sum_cols, mean_cols)
+
+    # Function to get department performance
+    def department_performance(self, performance_data):
+        if 'department' not in performance_data.columns:
+            return None
+        totals = self.group_totals(performance_data, 'department', DEPARTMENT_SUM_COLS, DEPARTMENT_MEAN_COLS)
+        return department_performance_from_totals(totals)
+
+    # Function to find the rows matching the filters by scanning every row
+    def filter_rows(self, performance_data, value_filters=None, range_filters=None):
+        """
+        Same filters and result as row_index.select_rows (sorted positions, or None when
+        nothing is filtered), without a prebuilt index.
+        """
+        values, ranges = _active_filters(performance_data, value_filters, range_filters)
+        if not values and not ranges:
+            return None
+
+        mask = np.ones(len(performance_data), dtype=bool)
+        for col, accepted in values:
+            mask &= performance_data[col].isin(accepted).to_numpy()
+        for col, low, high in ranges:
+            if col == 'period':
+                keys = period_keys(performance_data).to_numpy(dtype=float)
+            else:
+                dates = pd.to_datetime(performance_data['join_date'], errors='coerce')
+                keys = np.where(dates.isna(), np.nan, dates.to_numpy(dtype='datetime64[ns]').astype('int64').astype(float))
+            with np.errstate(invalid='ignore'):
+                mask &= (keys >= (low if low is not None else -np.inf)) & (keys <= (high if high is not None else np.inf))
+        return np.flatnonzero(mask)
+
+    # Function to compute the figures quoted in an AI insight prompt
+    def prompt_digest(self, performance_data, column=None, value=None):
+        """
+        Return a dict with the number of 'records', distinct 'employees' and 'departments', the
+        'department' and 'position' of the first row, sums of DIGEST_SUM_COLS and averages of
+        DIGEST_MEAN_COLS over the rows whose `column` equals `value` (all rows without `column`).
+        """
+        rows = performance_data if column is None else performance_data[performance_data[column] == value]
+        first = rows.iloc[0] if not rows.empty else pd.Series(dtype=object)
+
+        digest = {
+            'records': len(rows),
+            'employees': len(rows['name'].unique()) if 'name' in rows.columns else 0,
+            'departments': len(rows['department'].unique()) if 'department' in rows.columns else 0,
+            'department': first.get('department', 'N/A'),
+            'position': first.get('position', 'N/A')
+        }
+        digest.update({col: rows[col].sum() for col in DIGEST_SUM_COLS})
+        digest.update({col: rows[col].mean() for col in DIGEST_MEAN_COLS})
+        return digest
+
+
+class PandasEngine(Engine):
+    """The single-threaded pandas implementation the app was built on."""
+
+
+class PolarsEngine(Engine):
+    """
+    Polars implementation: frames are converted column by column (only the columns an
+    operation needs), processed on all cores and converted back to pandas.
+    """
+
+    name = 'polars'
+    row_index = False
+
+    @classmethod
+    def available(cls):
+        return pl is not None
+
+    def analyze_performance(self, employee_data, metrics_data):
+        if not _can_merge(employee_data, metrics_data):
+            return super().analyze_performance(employee_data, metrics_data)
+
+        merged = pl.from_pandas(employee_data).join(
+            pl.from_pandas(metrics_data), on=_merge_keys(employee_data, metrics_data), how='inner',
+            maintain_order='left_right'
+        )
+        if 'tasks_completed' in merged.columns and 'tasks_assigned' in merged.columns:
+            merged = merged.with_columns(
+                (pl.col('tasks_completed') / pl.col('tasks_assigned')).fill_nan(0).fill_null(0).alias('completion_rate')
+            )
+        if 'working_hours' in merged.columns and 'tasks_completed' in merged.columns:
+            merged = merged.with_columns(
+                (pl.col('tasks_completed') / pl.col('working_hours')).fill_nan(0).fill_null(0).alias('productivity')
+            )
+        return _restore_dtypes(merged.to_pandas(), employee_data, metrics_data)
+
+    def group_totals(self, performance_data, by, sum_cols, mean_cols):
+        by_cols = [by] if isinstance(by, str) else list(by)
+        sum_cols = [col for col in sum_cols if col in performance_data.columns]
+        mean_cols = [col for col in mean_cols if col in performance_data.columns]
+
+        frame = pl.from_pandas(performance_data[by_cols + sum_cols + mean_cols]).drop_nulls(by_cols)
+        totals = frame.group_by(by_cols).agg(
+            [pl.col(col).sum() for col in sum_cols + mean_cols]
+            + [pl.col(col).count().cast(pl.Int64).alias(f'{col}_count') for col in mean_cols]
+        ).sort(by_cols).to_pandas()
+
+        totals = _restore_dtypes(totals, performance_data[by_cols + sum_cols + mean_cols])
+        return totals.set_index(by)
+
+    def filter_rows(self, performance_data, value_filters=None, range_filters=None):
+        values, ranges = _active_filters(performance_data, value_filters, range_filters)
+        if not values and not ranges:
+            return None
+
+        columns = [col for col, _ in values]
+        conditions = [pl.col(col).is_in(_python_values(accepted)) for col, accepted in values]
+        for col, low, high in ranges:
+            if col == 'period':
+                columns += ['year', 'month']
+                keys = (pl.col('year').cast(pl.Float64, strict=False) * 100
+                        + pl.col('month').replace_strict(MONTH_ORDER, range(1, 13), default=0, return_dtype=pl.Float64)
+                        .fill_null(0))
+            else:
+                columns.append('join_date')
+                dates = pl.col('join_date')
+                if performance_data['join_date'].dtype == object or pd.api.types.is_string_dtype(performance_data['join_date']):
+                    dates = dates.str.to_datetime(strict=False, time_unit='ns')
+                keys = dates.cast(pl.Datetime('ns')).dt.epoch('ns').cast(pl.Float64)
+            if low is not None:
+                conditions.append(keys >= low)
+            if high is not None:
+                conditions.append(keys <= high)
+
+        frame = pl.from_pandas(performance_data[list(dict.fromkeys(columns))]).with_row_index('_position')
+        matched = frame.filter(pl.all_horizontal(conditions).fill_null(False))['_position']
+        return matched.to_numpy().astype(np.int64)
+
+    def prompt_digest(self, performance_data, column=None, value=None):
+        columns = [col for col in ['name', 'department', 'position'] + DIGEST_SUM_COLS + DIGEST_MEAN_COLS + [column]
+                   if col is not None and col in performance_data.columns]
+        frame = pl.from_pandas(performance_data[list(dict.fromkeys(columns))])
+        if column is not None:
+            frame = frame.filter(pl.col(column) == _python_values([value])[0])
+
+        aggregates = [pl.len().alias('records')]
+        aggregates += [pl.col(col).n_unique().alias(key) for col, key in [('name', 'employees'), ('department', 'departments')]
+                       if col in frame.columns]
+        aggregates += [pl.col(col).first().alias(col) for col in ['department', 'position'] if col in frame.columns]
+        aggregates += [pl.col(col).sum() for col in DIGEST_SUM_COLS]
+        aggregates += [pl.col(col).mean() for col in DIGEST_MEAN_COLS]
+
+        digest = {'employees': 0, 'departments': 0, 'department': 'N/A', 'position': 'N/A'}
+        digest.update(frame.select(aggregates).row(0, named=True))
+        return _finish_digest(digest)
+
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _ratio_sql(numerator, denominator):
+    # numerator / denominator as a double, with NaN and NULL replaced by 0 like the pandas fillna(0)
+    ratio = f"CAST({_quote(numerator)} AS DOUBLE) / {_quote(denominator)}"
+    return f"CASE WHEN isnan({ratio}) THEN 0.0 ELSE coalesce({ratio}, 0.0) END"
+
+
+def _period_sql():
+    months = ", ".join(f"'{month}'" for month in MONTH_ORDER)
+    return f"(TRY_CAST(\"year\" AS DOUBLE) * 100 + coalesce(list_position([{months}], \"month\"), 0))"
+
+
+def _sqlite_dtypes(connection, table):
+    # Empty frame with the dtypes pandas.read_sql gives the columns of an attached SQLite table:
+    # int64 (float64 with missing values), float64, str, and object for columns without values
+    types = connection.execute(f"SELECT * FROM source.{_quote(table)} LIMIT 0").description
+    counts = connection.execute(
+        f"SELECT {', '.join(['count(*)'] + [f'count({_quote(name)})' for name, *_ in types])} FROM source.{_quote(table)}"
+    ).fetchone()
+
+    dtypes = {}
+    for (name, type_code, *_), count in zip(types, counts[1:]):
+        type_name = str(type_code).upper()
+        if count == 0:
+            dtypes[name] = object
+        elif type_name in ('TINYINT', 'SMALLINT', 'INTEGER', 'BIGINT', 'HUGEINT', 'UTINYINT', 'USMALLINT', 'UINTEGER', 'UBIGINT'):
+            dtypes[name] = 'int64' if count == counts[0] else 'float64'
+        elif type_name in ('FLOAT', 'DOUBLE') or type_name.startswith('DECIMAL'):
+            dtypes[name] = 'float64'
+        elif type_name == 'VARCHAR':
+            dtypes[name] = pd.Series(['']).dtype
+    return pd.DataFrame({name: pd.Series(dtype=dtype) for name, dtype in dtypes.items()})
+
+
+class DuckDBEngine(Engine):
+    """
+    DuckDB implementation: pandas frames are scanned in place by an in-memory database on
+    all cores, and analyze_sqlite joins the tables of a SQLite file without loading them
+    into pandas first. Row order matches pandas through explicit row positions.
+    """
+
+    name = 'duckdb'
+    row_index = False
+
+    @classmethod
+    def available(cls):
+        return duckdb is not None
+
+    # Function to open an in-memory database with the given frames registered as tables
+    def connect(self, **frames):
+        connection = duckdb.connect()
+        for name, frame in frames.items():
+            connection.register(name, frame)
+        return connection
+
+    def _merge_sql(self, left, right, left_cols, right_cols, keys):
+        # Inner join of two relations carrying row positions _l and _r, in pandas merge order
+        on = " AND ".join(f"e.{_quote(key)} = m.{_quote(key)}" for key in keys)
+        selected = [f"e.{_quote(col)}" for col in left_cols] + [f"m.{_quote(col)}" for col in right_cols if col not in keys]
+        merged = f"SELECT {', '.join(selected)}, e._l, m._r FROM ({left}) e JOIN ({right}) m ON {on}"
+
+        columns = set(left_cols) | set(right_cols)
+        derived = []
+        if {'tasks_completed', 'tasks_assigned'}.issubset(columns):
+            derived.append(f"{_ratio_sql('tasks_completed', 'tasks_assigned')} AS completion_rate")
+        if {'working_hours', 'tasks_completed'}.issubset(columns):
+            derived.append(f"{_ratio_sql('tasks_completed', 'working_hours')} AS productivity")
+
+        return f"SELECT * EXCLUDE (_l, _r){''.join(', ' + column for column in derived)} FROM ({merged}) ORDER BY _l, _r"
+
+    def analyze_performance(self, employee_data, metrics_data):
+        if not _can_merge(employee_data, metrics_data):
+            return super().analyze_performance(employee_data, metrics_data)
+
+        connection = self.connect(
+            employees=employee_data, metrics=metrics_data,
+            left_positions=pd.DataFrame({'_l': np.arange(len(employee_data))}),
+            right_positions=pd.DataFrame({'_r': np.arange(len(metrics_data))})
+        )
+        try:
+            sql = self._merge_sql(
+                "SELECT * FROM employees POSITIONAL JOIN left_positions",
+                "SELECT * FROM metrics POSITIONAL JOIN right_positions",
+                list(employee_data.columns), list(metrics_data.columns), _merge_keys(employee_data, metrics_data)
+            )
+            merged = connection.execute(sql).df()
+        finally:
+            connection.close()
+        return _restore_dtypes(merged, employee_data, metrics_data)
+
+    # Function to merge the employee and metrics tables straight from a SQLite file
+    def analyze_sqlite(self, db_file, employee_table='employees', performance_table='performance_metrics', tables=None,
+                       immutable=False):
+        """
+        Same result (columns, rows and dtypes) as analyze_performance on the two tables as loaded
+        by ingest.load_data. Uses DuckDB's sqlite extension; without it (e.g. offline, before the
+        extension is installed) the two tables are merged from frames instead: those in `tables`
+        (a dict of the tables already loaded from the file) or else read with pandas. See
+        ingest.connect_readonly for `immutable`.
+        """
+        connection = duckdb.connect()
+        try:
+            try:
+                connection.execute("LOAD sqlite")
+                connection.execute(f"ATTACH '{db_file.replace(chr(39), chr(39) * 2)}' AS source (TYPE sqlite, READ_ONLY)")
+            except duckdb.Error:
+                return self._analyze_tables(db_file, employee_table, performance_table, tables, immutable)
+
+            left = f"SELECT *, rowid AS _l FROM source.{_quote(employee_table)}"
+            right = f"SELECT *, rowid AS _r FROM source.{_quote(performance_table)}"
+            left_cols = [column[0] for column in connection.execute(f"SELECT * FROM ({left}) LIMIT 0").description][:-1]
+            right_cols = [column[0] for column in connection.execute(f"SELECT * FROM ({right}) LIMIT 0").description][:-1]
+            left_columns, right_columns = pd.DataFrame(columns=left_cols), pd.DataFrame(columns=right_cols)
+            if not _can_merge(left_columns, right_columns):
+                return self._analyze_tables(db_file, employee_table, performance_table, tables, immutable)
+
+            keys = _merge_keys(left_columns, right_columns)
+            merged = connection.execute(self._merge_sql(left, right, left_cols, right_cols, keys)).df()
+            return _restore_dtypes(merged, _sqlite_dtypes(connection, employee_table),
+                                   _sqlite_dtypes(connection, performance_table))
+        finally:
+            connection.close()
+
+    def _analyze_tables(self, db_file, employee_table, performance_table, tables=None, immutable=False):
+        if tables is not None and employee_table in tables and performance_table in tables:
+            return self.analyze_performance(tables[employee_table], tables[performance_table])
+
+        conn = connect_readonly(db_file, immutable)
+        try:
+            employee_data = pd.read_sql(f"SELECT * FROM {_quote(employee_table)}", conn)
+            metrics_data = pd.read_sql(f"SELECT * FROM {_quote(performance_table)}", conn)
+        finally:
+            conn.close()
+        return self.analyze_performance(employee_data, metrics_data)
+
+    def group_totals(self, performance_data, by, sum_cols, mean_cols):
+        by_cols = [by] if isinstance(by, str) else list(by)
+        sum_cols = [col for col in sum_cols if col in performance_data.columns]
+        mean_cols = [col for col in mean_cols if col in performance_data.columns]
+
+        groups = ", ".join(_quote(col) for col in by_cols)
+        aggregates = [f"sum({_quote(col)}) AS {_quote(col)}" for col in sum_cols + mean_cols]
+        aggregates += [f"count({_quote(col)}) AS {_quote(col + '_count')}" for col in mean_cols]
+        not_null = " AND ".join(f"{_quote(col)} IS NOT NULL" for col in by_cols)
+
+        connection = self.connect(data=performance_data[by_cols + sum_cols + mean_cols])
+        try:
+            totals = connection.execute(
+                f"SELECT {groups}, {', '.join(aggregates)} FROM data WHERE {not_null} GROUP BY {groups} ORDER BY {groups}"
+            ).df()
+        finally:
+            connection.close()
+
+        # Sums over groups without values are 0 in pandas, NULL in SQL
+        totals = totals.fillna({col: 0 for col in sum_cols + mean_cols})
+        totals = _restore_dtypes(totals, performance_data[by_cols + sum_cols + mean_cols])
+        for col in mean_cols:
+            totals[f'{col}_count'] = totals[f'{col}_count'].astype('int64')
+        return totals.set_index(by)
+
+    def filter_rows(self, performance_data, value_filters=None, range_filters=None):
+        values, ranges = _active_filters(performance_data, value_filters, range_filters)
+        if not values and not ranges:
+            return None
+
+        columns = [col for col, _ in values]
+        conditions, parameters = [], []
+        for col, accepted in values:
+            conditions.append(f"list_contains(?, {_quote(col)})")
+            parameters.append(_python_values(accepted))
+        for col, low, high in ranges:
+            if col == 'period':
+                columns += ['year', 'month']
+                keys = _period_sql()
+            else:
+                columns.append('join_date')
+                keys = "CAST(epoch_ns(TRY_CAST(\"join_date\" AS TIMESTAMP)) AS DOUBLE)"
+            if low is not None:
+                conditions.append(f"{keys} >= ?")
+                parameters.append(float(low))
+            if high is not None:
+                conditions.append(f"{keys} <= ?")
+                parameters.append(float(high))
+
+        connection = self.connect(
+            data=performance_data[list(dict.fromkeys(columns))],
+            positions=pd.DataFrame({'_position': np.arange(len(performance_data))})
+        )
+        try:
+            matched = connection.execute(
+                f"SELECT _position FROM (SELECT * FROM data POSITIONAL JOIN positions) "
+                f"WHERE {' AND '.join(conditions)} ORDER BY _position", parameters
+            ).fetchnumpy()['_position']
+        finally:
+            connection.close()
+        return np.asarray(matched, dtype=np.int64)
+
+    def prompt_digest(self, performance_data, column=None, value=None):
+        columns = [col for col in ['name', 'department', 'position'] + DIGEST_SUM_COLS + DIGEST_MEAN_COLS + [column]
+                   if col is not None and col in performance_data.columns]
+
+        # count(DISTINCT) skips NULL while pandas unique() keeps NaN as a value
+        aggregates = ["count(*) AS records"]
+        aggregates += [f"count(DISTINCT {_quote(col)}) + CAST(count(*) > count({_quote(col)}) AS INTEGER) AS {key}"
+                       for col, key in [('name', 'employees'), ('department', 'departments')] if col in columns]
+        aggregates += [f"first({_quote(col)} ORDER BY _position) AS {_quote(col)}" for col in ['department', 'position']
+                       if col in columns]
+        aggregates += [f"sum({_quote(col)}) AS {_quote(col)}" for col in DIGEST_SUM_COLS]
+        aggregates += [f"avg({_quote(col)}) AS {_quote(col)}" for col in DIGEST_MEAN_COLS]
+
+        connection = self.connect(
+            data=performance_data[list(dict.fromkeys(columns))],
+            positions=pd.DataFrame({'_position': np.arange(len(performance_data))})
+        )
+        try:
+            where = f" WHERE {_quote(column)} = ?" if column is not None else ""
+            cursor = connection.execute(
+                f"SELECT {', '.join(aggregates)} FROM (SELECT * FROM data POSITIONAL JOIN positions){where}",
+                _python_values([value]) if column is not None else []
+            )
+            names = [description[0] for description in cursor.description]
+            row = cursor.fetchone()
+        finally:
+            connection.close()
+
+        digest = {'employees': 0, 'departments': 0, 'department': 'N/A', 'position': 'N/A'}
+        digest.update(zip(names, row))
+        return _finish_digest(digest)
+
+
+ENGINES = {'pandas': PandasEngine, 'duckdb': DuckDBEngine, 'polars': PolarsEngine}
+
+
+# Function to list the engines whose libraries are installed
+def available_engines():
+    return [name for name, engine in ENGINES.items() if engine.available()]
+
+
+# Function to get an analytics engine by name
+def get_engine(name=None):
+    """
+    Without a name, return the engine configured in PERFORMX_ENGINE, falling back to pandas
+    (with a warning) when it is unknown or not installed. A named engine that is unknown or
+    not installed raises ValueError.
+    """
+    if name is None:
+        try:
+            return get_engine(ENGINE)
+        except ValueError as e:
+            warnings.warn(f"{e}; using pandas")
+            return PandasEngine()
+
+    if name not in ENGINES:
+        raise ValueError(f"Unknown analytics engine '{name}' (choose from {', '.join(ENGINES)})")
+    if not ENGINES[name].available():
+        raise ValueError(f"The {name} analytics engine needs the '{name}' package (pip install {name})")
+    return ENGINES[name]()
@@ -0,0 +1,110 @@
+import hashlib
+import os
+import tempfile
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet exports are unavailable when pyarrow is not installed
+    pa = None
+    pq = None
+
+# Chunked exports of dashboard tables. Rows are converted and written a chunk
+# at a time (CSV text per chunk, one Parquet row group per chunk), so writing
+# millions of rows never builds the whole file in memory; the browser download
+# does read the file at once, hence EXPORT_DOWNLOAD_MAX_MB. A subset of rows is
+# given as positions into the frame and sliced chunk by chunk rather than
+# copied up front.
+
+# Directory where exports are written before they are downloaded
+EXPORT_DIR = os.environ.get("PERFORMX_EXPORT_DIR", os.path.join(tempfile.gettempdir(), "performx-exports"))
+
+# Rows converted and written per chunk (and per Parquet row group)
+EXPORT_CHUNK_ROWS = 100_000
+
+# Largest export offered for download in the browser (in MB). The download is
+# served as one bytes object, so larger exports stay on disk in EXPORT_DIR.
+EXPORT_DOWNLOAD_MAX_MB = int(os.environ.get("PERFORMX_EXPORT_DOWNLOAD_MAX_MB", "200"))
+
+# MIME type of every export format
+EXPORT_MIME_TYPES = {'csv': 'text/csv', 'parquet': 'application/vnd.apache.parquet'}
+
+
+# Function to list the export formats available in this environment
+def export_formats():
+    return ['csv'] + (['parquet'] if pq is not None else [])
+
+
+# Function to iterate over a frame (or the rows at `positions`) in chunks
+def iter_chunks(frame, positions=None, chunk_rows=EXPORT_CHUNK_ROWS):
+    # Named indexes (e.g. employee_id) are exported as columns
+    if any(name is not None for name in frame.index.names):
+        frame = frame.reset_index()
+
+    total = len(frame) if positions is None else len(positions)
+    if total == 0:
+        yield frame.iloc[:0]
+        return
+
+    for start in range(0, total, chunk_rows):
+        if positions is None:
+            yield frame.iloc[start:start + chunk_rows]
+        else:
+            yield frame.iloc[positions[start:start + chunk_rows]]
+
+
+# Function to generate CSV output chunk by chunk
+def iter_csv(frame, positions=None, chunk_rows=EXPORT_CHUNK_ROWS):
+    for number, chunk in enumerate(iter_chunks(frame, positions, chunk_rows)):
+        yield chunk.to_csv(index=False, header=number == 0).encode("utf-8")
+
+
+# Function to write a frame as CSV in chunks
+def write_csv(frame, path, positions=None, chunk_rows=EXPORT_CHUNK_ROWS):
+    with open(path, "wb") as f:
+        for data in iter_csv(frame, positions, chunk_rows):
+            f.write(data)
+
+
+# Function to write a frame as Parquet, one row group per chunk
+def write_parquet(frame, path, positions=None, chunk_rows=EXPORT_CHUNK_ROWS):
+    if pq is None:
+        raise RuntimeError("Parquet export requires pyarrow")
+
+    writer = None
+    try:
+        for chunk in iter_chunks(frame, positions, chunk_rows):
+            # Every row group follows the schema of the first chunk
+            table = pa.Table.from_pandas(chunk, schema=writer.schema if writer else None, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+WRITERS = {'csv': write_csv, 'parquet': write_parquet}
+
+
+# Function to export a frame to a file named after what it holds
+def export_table(frame, key, fmt, positions=None, directory=None):
+    """
+    Write the frame (or the rows at `positions`) in format `fmt` and return the path.
+    `key` describes the content (dataset, table, filters); exporting the same key again
+    replaces the earlier file. The file is published atomically once complete.
+    """
+    directory = directory or EXPORT_DIR
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, hashlib.sha256(repr(key).encode()).hexdigest()[:16] + f".{fmt}")
+
+    fd, staging_path = tempfile.mkstemp(dir=directory, prefix=".export-")
+    os.close(fd)
+    try:
+        WRITERS[fmt](frame, staging_path, positions)
+        os.replace(staging_path, path)
+    finally:
+        if os.path.exists(staging_path):
+            os.remove(staging_path)
+
+    return path
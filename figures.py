@@ -0,0 +1,185 @@
+import json
+import threading
+from collections import OrderedDict
+
+import plotly.express as px
+import plotly.io as pio
+
+from chart_data import aggregate_pie
+
+# Figures that appear in several views are built here once and cached as
+# serialized JSON. The cache key is the dataset fingerprint, the filter state
+# the figure's data depends on, and the chart spec (chart name + options), so
+# switching views or toggling AI insights reuses figures instead of rebuilding them.
+
+# Maximum number of serialized figures kept in the cache
+MAX_CACHED_FIGURES = 256
+
+_figure_cache = OrderedDict()
+_figure_cache_lock = threading.Lock()
+
+
+# Function to build the department completion rate bar chart
+def department_completion_figure(dept_performance):
+    fig = px.bar(
+        dept_performance,
+        x='department',
+        y='dept_completion_rate',
+        title='Task Completion Rate by Department',
+        labels={'dept_completion_rate': 'Completion Rate', 'department': 'Department'},
+        color='department',
+        color_discrete_sequence=px.colors.qualitative.Plotly,
+        text_auto='.1%'
+    )
+    fig.update_traces(texttemplate='%{text}', textposition='outside')
+    fig.update_layout(height=400)
+    return fig
+
+
+# Function to build the department productivity bar chart
+def department_productivity_figure(dept_performance):
+    fig = px.bar(
+        dept_performance,
+        x='department',
+        y='dept_productivity',
+        title='Productivity by Department (Tasks per Hour)',
+        labels={'dept_productivity': 'Productivity', 'department': 'Department'},
+        color='department',
+        text_auto='.2f'
+    )
+    fig.update_traces(texttemplate='%{text}', textposition='outside')
+    fig.update_layout(height=400)
+    return fig
+
+
+# Function to build a department bar chart of estimates with their confidence intervals
+def approximate_department_figure(estimates, column, title, label, text_format):
+    fig = px.bar(
+        estimates,
+        x='department',
+        y=column,
+        error_y=f'{column}_ci',
+        title=title,
+        labels={column: label, 'department': 'Department'},
+        color='department',
+        color_discrete_sequence=px.colors.qualitative.Plotly,
+        text_auto=text_format,
+        opacity=0.7
+    )
+    fig.update_traces(texttemplate='~%{text}', textposition='inside')
+    fig.update_layout(height=400)
+    return fig
+
+
+# Function to build the tasks completed by department pie chart
+def department_tasks_pie(dept_performance):
+    fig = px.pie(
+        aggregate_pie(dept_performance, 'department', 'tasks_completed'),
+        names='department',
+        values='tasks_completed',
+        title='Tasks Completed by Department',
+        color='department',
+        color_discrete_sequence=px.colors.qualitative.Plotly,
+        hole=0.4
+    )
+    fig.update_layout(height=400)
+    return fig
+
+
+# Function to build the employee distribution by department pie chart
+def department_distribution_pie(employee_data, hole=None):
+    fig = px.pie(
+        aggregate_pie(employee_data, 'department'),
+        names='department',
+        values='count',
+        title='Employee Distribution by Department',
+        color='department',
+        hole=hole
+    )
+    return fig
+
+
+# Function to build the Top Performers bar chart of a leaderboard
+def top_performers_figure(top_employees, metric):
+    metric_label = metric.replace('_', ' ').title()
+    fig = px.bar(
+        top_employees,
+        x='name',
+        y=metric,
+        title=f'Top {len(top_employees)} Employees by {metric_label}',
+        labels={metric: metric_label, 'name': 'Employee'},
+        color=metric,
+        color_continuous_scale='Blues',
+    )
+    fig.update_layout(height=400)
+    return fig
+
+
+CHART_BUILDERS = {
+    'department_completion': department_completion_figure,
+    'department_productivity': department_productivity_figure,
+    'department_tasks': department_tasks_pie,
+    'department_distribution': department_distribution_pie,
+}
+
+
+def _cache_key(fingerprint, filters, chart, options):
+    return (
+        fingerprint,
+        json.dumps(filters or {}, sort_keys=True, default=str),
+        chart,
+        json.dumps(options, sort_keys=True, default=str)
+    )
+
+
+# Function to get a figure from the cache, building it on a miss
+def get_figure(chart, data, fingerprint, filters=None, **options):
+    """
+    Return the `chart` figure for `data`, reusing a cached copy when the same
+    dataset fingerprint, filter state and options were seen before.
+    `filters` must describe every selection that `data` depends on.
+    """
+    if fingerprint is None:
+        return CHART_BUILDERS[chart](data, **options)
+
+    key = _cache_key(fingerprint, filters, chart, options)
+
+    with _figure_cache_lock:
+        cached = _figure_cache.get(key)
+        if cached is not None:
+            _figure_cache.move_to_end(key)
+
+    if cached is not None:
+        return pio.from_json(cached)
+
+    fig = CHART_BUILDERS[chart](data, **options)
+
+    with _figure_cache_lock:
+        _figure_cache[key] = fig.to_json()
+        while len(_figure_cache) > MAX_CACHED_FIGURES:
+            _figure_cache.popitem(last=False)
+
+    return fig
+
+
+# Function to add serialized figures (e.g. from a dashboard snapshot) to the cache
+def preload_figures(fingerprint, filters, figures):
+    """
+    `figures` maps chart names to figure JSON built with default options; later
+    get_figure calls for the same dataset and filter state are served from them.
+    """
+    with _figure_cache_lock:
+        for chart, figure_json in figures.items():
+            _figure_cache[_cache_key(fingerprint, filters, chart, {})] = figure_json
+        while len(_figure_cache) > MAX_CACHED_FIGURES:
+            _figure_cache.popitem(last=False)
+
+
+# Function to drop cached figures for one dataset (or all of them)
+def clear_figure_cache(fingerprint=None):
+    with _figure_cache_lock:
+        if fingerprint is None:
+            _figure_cache.clear()
+        else:
+            for key in [k for k in _figure_cache if k[0] == fingerprint]:
+                del _figure_cache[key]
@@ -0,0 +1,170 @@
+import numpy as np
+import pandas as pd
+
+# Reporting hierarchy built from employees.manager_id once per dataset.
+# Employees are laid out in Euler-tour (preorder) order, so every manager's
+# organisation is the contiguous range [tin, tout) of that order. Prefix sums
+# of the per-employee totals over the same order turn any org-wide aggregate
+# into two array reads. Reporting cycles are broken at their lowest employee
+# ID, which becomes a root, and are reported so the data can be fixed.
+
+# Per-employee totals rolled up over the hierarchy (see performance.EMPLOYEE_*_COLS)
+ROLLUP_SUM_COLS = ['tasks_assigned', 'tasks_completed', 'working_hours']
+ROLLUP_MEAN_COLS = ['quality_score', 'review_score']
+
+
+def _break_cycles(parent, ids):
+    state = np.zeros(len(parent), dtype=np.int8)  # 0 unvisited, 1 on the current path, 2 done
+    cycles = []
+
+    for start in range(len(parent)):
+        if state[start]:
+            continue
+
+        path = []
+        node = start
+        while node != -1 and state[node] == 0:
+            state[node] = 1
+            path.append(node)
+            node = parent[node]
+
+        if node != -1 and state[node] == 1:
+            cycle = path[path.index(node):]
+            cycles.append(cycle)
+            parent[cycle[int(np.argmin(ids[cycle]))]] = -1
+
+        state[path] = 2
+
+    return cycles
+
+
+def _euler_tour(parent):
+    n = len(parent)
+
+    # Children of every node, grouped by parent (roots sort first with parent -1)
+    by_parent = np.argsort(parent, kind='stable')
+    n_roots = int((parent == -1).sum())
+    child_start = n_roots + np.concatenate([[0], np.cumsum(np.bincount(parent[parent >= 0], minlength=n))])
+
+    order = np.empty(n, dtype=np.int64)
+    depth = np.zeros(n, dtype=np.int64)
+    stack = list(by_parent[:n_roots][::-1])
+    visited = 0
+    while stack:
+        node = stack.pop()
+        order[visited] = node
+        visited += 1
+        children = by_parent[child_start[node]:child_start[node + 1]]
+        depth[children] = depth[node] + 1
+        stack.extend(children[::-1])
+
+    tin = np.empty(n, dtype=np.int64)
+    tin[order] = np.arange(n)
+
+    # Subtree sizes, accumulated from the deepest nodes up
+    size = np.ones(n, dtype=np.int64)
+    for node in order[::-1]:
+        if parent[node] != -1:
+            size[parent[node]] += size[node]
+
+    return order, tin, tin + size, depth, by_parent, child_start
+
+
+# Function to build the reporting hierarchy and its subtree prefix sums
+def build_hierarchy(employee_data, employee_totals=None):
+    """
+    Return the hierarchy of the employees in `employee_data` (one row per employee_id,
+    with manager_id), or None when the table has no manager_id column.
+    `employee_totals` are the per-employee sums and counts from performance.get_group_totals.
+    """
+    if 'employee_id' not in employee_data.columns or 'manager_id' not in employee_data.columns:
+        return None
+
+    employees = employee_data.drop_duplicates('employee_id')
+    ids = employees['employee_id'].to_numpy()
+    position = pd.Series(np.arange(len(ids)), index=ids)
+
+    # Managers outside the table (or missing) make the employee a root
+    parent = position.reindex(employees['manager_id'].to_numpy()).fillna(-1).to_numpy(dtype=np.int64, copy=True)
+    parent[parent == np.arange(len(ids))] = -1
+    cycles = _break_cycles(parent, ids)
+
+    order, tin, tout, depth, children, child_start = _euler_tour(parent)
+
+    hierarchy = {
+        'ids': ids,
+        'position': position,
+        'parent': parent,
+        'order': order,
+        'tin': tin,
+        'tout': tout,
+        'depth': depth,
+        'children': children,
+        'child_start': child_start,
+        'cycles': [ids[cycle].tolist() for cycle in cycles],
+        'prefix': {}
+    }
+    if employee_totals is not None:
+        set_hierarchy_totals(hierarchy, employee_totals)
+
+    return hierarchy
+
+
+# Function to (re)compute the subtree prefix sums from per-employee totals
+def set_hierarchy_totals(hierarchy, employee_totals):
+    totals = employee_totals.reindex(hierarchy['ids']).fillna(0)
+    columns = [col for col in ROLLUP_SUM_COLS if col in totals.columns]
+    columns += [name for col in ROLLUP_MEAN_COLS if col in totals.columns for name in (col, f'{col}_count')]
+
+    hierarchy['prefix'] = {
+        col: np.concatenate([[0.0], np.cumsum(totals[col].to_numpy(dtype=float)[hierarchy['order']])])
+        for col in columns
+    }
+    return hierarchy
+
+
+# Function to get the org-wide totals and rates of the employee's whole organisation
+def org_rollup(hierarchy, employee_id):
+    """
+    Aggregate the employee and everyone reporting to them, directly or indirectly.
+    Returns headcount, summed totals, completion_rate, productivity and average scores.
+    """
+    node = hierarchy['position'][employee_id]
+    start, end = hierarchy['tin'][node], hierarchy['tout'][node]
+    prefix = hierarchy['prefix']
+
+    rollup = {'headcount': int(end - start)}
+    for col in ROLLUP_SUM_COLS:
+        if col in prefix:
+            rollup[col] = prefix[col][end] - prefix[col][start]
+
+    if 'tasks_assigned' in rollup:
+        rollup['completion_rate'] = rollup['tasks_completed'] / rollup['tasks_assigned'] if rollup['tasks_assigned'] else 0.0
+    if 'working_hours' in rollup:
+        rollup['productivity'] = rollup['tasks_completed'] / rollup['working_hours'] if rollup['working_hours'] else 0.0
+
+    for col in ROLLUP_MEAN_COLS:
+        if col in prefix:
+            count = prefix[f'{col}_count'][end] - prefix[f'{col}_count'][start]
+            rollup[col] = (prefix[col][end] - prefix[col][start]) / count if count else float('nan')
+
+    return rollup
+
+
+# Function to get the employee IDs of the employee's whole organisation (the employee first)
+def org_members(hierarchy, employee_id):
+    node = hierarchy['position'][employee_id]
+    return hierarchy['ids'][hierarchy['order'][hierarchy['tin'][node]:hierarchy['tout'][node]]]
+
+
+# Function to get the employee IDs reporting directly to the employee
+def direct_reports(hierarchy, employee_id):
+    node = hierarchy['position'][employee_id]
+    start, end = hierarchy['child_start'][node], hierarchy['child_start'][node + 1]
+    return hierarchy['ids'][hierarchy['children'][start:end]]
+
+
+# Function to get the employee IDs of everyone with at least one report
+def manager_ids(hierarchy):
+    has_reports = hierarchy['tout'] - hierarchy['tin'] > 1
+    return hierarchy['ids'][has_reports]
@@ -0,0 +1,527 @@
+import glob
+import hashlib
+import json
+import math
+import os
+import shutil
+import sqlite3
+import tempfile
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from urllib.parse import quote
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+except ImportError:  # Snapshots are skipped when pyarrow is not installed
+    pa = None
+    ipc = None
+
+# Directory where columnar snapshots of uploaded databases are kept
+SNAPSHOT_DIR = os.environ.get("PERFORMX_SNAPSHOT_DIR", os.path.join(os.getcwd(), ".performx_snapshots"))
+
+# Read size used when hashing files
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Directory where large uploads are spooled to disk, and the size of each write
+SPOOL_DIR = os.environ.get("PERFORMX_SPOOL_DIR", tempfile.gettempdir())
+SPOOL_CHUNK_SIZE = 8 * 1024 * 1024
+
+# Directory the app's path input may load databases from (PERFORMX_DB_ROOT). Unset, the
+# input is hidden and sessions can only upload files, since paths are read by the server.
+DB_PATH_ROOT = os.environ.get("PERFORMX_DB_ROOT", "")
+
+# Rows per chunk when scanning a table out of core
+SCAN_CHUNK_ROWS = 100_000
+
+# Upper bound on concurrent loads when reading several databases
+MAX_LOAD_WORKERS = 16
+
+# Pragmas applied to read-only connections: memory-map up to 1 GB of the file,
+# keep a 64 MB page cache and build temporary indexes/sorts in memory
+READ_PRAGMAS = {
+    'mmap_size': 1024 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+# Calendar order of the month names stored in performance tables
+MONTH_ORDER = ['January', 'February', 'March', 'April', 'May', 'June',
+               'July', 'August', 'September', 'October', 'November', 'December']
+
+
+# Function to extract data from SQLite database
+def load_data(db_file):
+    try:
+        conn = sqlite3.connect(db_file)
+
+        # Get list of all tables
+        cursor = conn.cursor()
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
+        tables = cursor.fetchall()
+
+        # Create a dictionary to store dataframes
+        data_dict = {}
+
+        # Load each table into a dataframe
+        for table in tables:
+            table_name = table[0]
+            data_dict[table_name] = pd.read_sql_query(f"SELECT * FROM {table_name}", conn)
+
+        conn.close()
+        return data_dict, None
+    except Exception as e:
+        return None, str(e)
+
+
+# Function to open a read-only, read-optimized connection
+def connect_readonly(db_file, immutable=False):
+    """
+    Open `db_file` read-only through a URI. `immutable=True` additionally tells SQLite the file
+    cannot change, so it skips locking and the WAL; only pass it for copies the app owns (spooled
+    or saved uploads), never for server files that may still be written to.
+    """
+    uri = f"file:{quote(os.path.abspath(db_file))}?mode=ro"
+    if immutable:
+        uri += "&immutable=1"
+
+    conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+    for pragma, value in READ_PRAGMAS.items():
+        conn.execute(f"PRAGMA {pragma} = {value}")
+    return conn
+
+
+# Function to estimate the number of rows of a table without scanning it
+def estimate_row_count(db_file, table_name, immutable=False):
+    """Return the largest rowid (the row count unless rows were deleted), or 0 when unavailable."""
+    try:
+        conn = connect_readonly(db_file, immutable)
+        try:
+            (count,) = conn.execute(f'SELECT max(rowid) FROM "{table_name}"').fetchone()
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return 0
+    return count or 0
+
+
+def _read_table(db_file, table_name, immutable=False):
+    conn = connect_readonly(db_file, immutable)
+    try:
+        return pd.read_sql_query(f'SELECT * FROM "{table_name}"', conn)
+    finally:
+        conn.close()
+
+
+# Function to extract data from SQLite database, reading tables concurrently
+def load_data_parallel(db_file, max_workers=None, use_processes=False, immutable=False):
+    """
+    Same result as load_data, but every table is read over its own read-only connection
+    in a thread pool (or a process pool, when row conversion is CPU-bound), so independent
+    tables load concurrently. See connect_readonly for `immutable`.
+    """
+    try:
+        conn = connect_readonly(db_file, immutable)
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
+            tables = [table[0] for table in cursor.fetchall()]
+        finally:
+            conn.close()
+
+        if not tables:
+            return {}, None
+
+        workers = max_workers or min(len(tables), MAX_LOAD_WORKERS)
+        executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+        with executor_class(max_workers=workers) as executor:
+            frames = list(executor.map(partial(_read_table, db_file, immutable=immutable), tables))
+
+        return dict(zip(tables, frames)), None
+    except Exception as e:
+        return None, str(e)
+
+
+# Function to find the latest (year, month) period in a table
+def latest_period(df):
+    if 'year' not in df.columns or 'month' not in df.columns or df.empty:
+        return None
+
+    years = pd.to_numeric(df['year'], errors='coerce')
+    month_idx = df['month'].map({month: i for i, month in enumerate(MONTH_ORDER, start=1)}).fillna(0)
+    period_keys = (years * 100 + month_idx).dropna()
+
+    if period_keys.empty:
+        return None
+
+    latest = period_keys.idxmax()
+    return [int(years[latest]), df['month'][latest]]
+
+
+def _later_period(a, b):
+    if a is None or b is None:
+        return a or b
+
+    def period_key(period):
+        year, month = period
+        return (year, MONTH_ORDER.index(month) + 1 if month in MONTH_ORDER else 0)
+
+    return max(a, b, key=period_key)
+
+
+def _checksum_sql(columns):
+    # Rowid-weighted sums of every column (numbers by value, text and blobs by length plus their
+    # first character), so an update to a loaded row or rows swapped between positions changes it
+    weight = "((rowid % 997) + 1)"
+    terms = ["total(rowid)"]
+    for col in columns:
+        quoted = '"' + str(col).replace('"', '""') + '"'
+        value = (f"CASE WHEN typeof({quoted}) IN ('integer', 'real') THEN {quoted} "
+                 f"ELSE length({quoted}) + coalesce(unicode({quoted}), 0) END")
+        terms.append(f"total(({value}) * {weight})")
+    return ", ".join(terms)
+
+
+# Function to compute the checksum of a table's rows in a rowid range (low exclusive, high inclusive)
+def table_checksum(conn, table_name, columns, low=None, high=None):
+    """
+    Checksums are additive over rowid ranges, so the checksum of an appended table is the old
+    one plus that of the new rows. Use same_checksum to compare them.
+    """
+    conditions = [condition for condition, bound in [("rowid > ?", low), ("rowid <= ?", high)] if bound is not None]
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    params = tuple(bound for bound in (low, high) if bound is not None)
+    return list(conn.execute(f'SELECT {_checksum_sql(columns)} FROM "{table_name}"{where}', params).fetchone())
+
+
+# Function to compare two checksums (sums of floats may differ in their last bits)
+def same_checksum(a, b):
+    return a is not None and b is not None and len(a) == len(b) and all(
+        math.isclose(x, y, rel_tol=1e-12, abs_tol=1e-9) for x, y in zip(a, b)
+    )
+
+
+# Function to record the rowid and period high-water marks of every table
+def read_watermarks(db_file, data_dict):
+    """
+    Return {table: {'rowid', 'rows', 'checksum', 'period'}} for the tables of `data_dict` found
+    in `db_file`. Tables without a rowid (or created by the app) get a rowid mark of None.
+    """
+    conn = connect_readonly(db_file, immutable=False)
+    watermarks = {}
+
+    try:
+        for table_name, df in data_dict.items():
+            try:
+                max_rowid = conn.execute(f'SELECT MAX(rowid) FROM "{table_name}"').fetchone()[0]
+                checksum = table_checksum(conn, table_name, df.columns, high=max_rowid)
+            except sqlite3.Error:
+                max_rowid = checksum = None
+
+            watermarks[table_name] = {'rowid': max_rowid, 'rows': len(df), 'checksum': checksum,
+                                      'period': latest_period(df)}
+    finally:
+        conn.close()
+
+    return watermarks
+
+
+# Function to read only the rows added to a database since the last load
+def refresh_data(db_file, data_dict, watermarks):
+    """
+    Append the rows of `db_file` above each table's rowid high-water mark to the loaded frames.
+    The rows up to the mark must still match the loaded ones (same count and checksum, see
+    table_checksum). Returns (data_dict, watermarks, new_rows), or (None, None, None) when rows
+    were updated or deleted, or the database otherwise needs a full load.
+    """
+    try:
+        conn = connect_readonly(db_file, immutable=False)
+    except sqlite3.Error:
+        return None, None, None
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
+        tables = [table[0] for table in cursor.fetchall()]
+
+        refreshed = dict(data_dict)
+        new_watermarks = dict(watermarks)
+        new_rows = {}
+
+        for table_name in tables:
+            mark = watermarks.get(table_name)
+            if table_name not in data_dict or mark is None or mark['rowid'] is None:
+                return None, None, None
+
+            # Rows up to the high-water mark must be the ones already loaded, unchanged
+            kept_rows = conn.execute(
+                f'SELECT COUNT(*) FROM "{table_name}" WHERE rowid <= ?', (mark['rowid'],)
+            ).fetchone()[0]
+            if kept_rows != mark['rows']:
+                return None, None, None
+            kept_checksum = table_checksum(conn, table_name, data_dict[table_name].columns, high=mark['rowid'])
+            if not same_checksum(kept_checksum, mark.get('checksum')):
+                return None, None, None
+
+            added = pd.read_sql_query(
+                f'SELECT * FROM "{table_name}" WHERE rowid > ? ORDER BY rowid', conn, params=(mark['rowid'],)
+            )
+            if added.empty:
+                continue
+
+            max_rowid = conn.execute(f'SELECT MAX(rowid) FROM "{table_name}"').fetchone()[0]
+            added_checksum = table_checksum(conn, table_name, data_dict[table_name].columns,
+                                            low=mark['rowid'], high=max_rowid)
+            refreshed[table_name] = pd.concat([data_dict[table_name], added], ignore_index=True)
+            new_rows[table_name] = added
+            new_watermarks[table_name] = {
+                'rowid': max_rowid,
+                'rows': len(refreshed[table_name]),
+                'checksum': [old + new for old, new in zip(kept_checksum, added_checksum)],
+                'period': _later_period(mark['period'], latest_period(added))
+            }
+
+        return refreshed, new_watermarks, new_rows
+    except (sqlite3.Error, pd.errors.DatabaseError):
+        return None, None, None
+    finally:
+        conn.close()
+
+
+# Function to fingerprint a file by content
+def file_fingerprint(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Function to copy an upload to disk in fixed-size chunks
+def spool_upload(uploaded_file, directory=None, chunk_size=SPOOL_CHUNK_SIZE):
+    """
+    Stream a file-like upload into `directory` (SPOOL_DIR by default) one chunk at a time,
+    hashing it on the way, so no full-size bytes object is ever built. Returns
+    (path, fingerprint); the fingerprint is the same SHA-256 as hashing the whole upload.
+    """
+    directory = directory or SPOOL_DIR
+    os.makedirs(directory, exist_ok=True)
+    digest = hashlib.sha256()
+
+    uploaded_file.seek(0)
+    fd, staging_path = tempfile.mkstemp(dir=directory, prefix=".spool-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in iter(lambda: uploaded_file.read(chunk_size), b""):
+                digest.update(chunk)
+                f.write(chunk)
+
+        fingerprint = digest.hexdigest()
+        path = os.path.join(directory, f"performx-{fingerprint}.db")
+        os.replace(staging_path, path)
+        return path, fingerprint
+    except OSError:
+        if os.path.exists(staging_path):
+            os.remove(staging_path)
+        raise
+
+
+# Function to read a table in bounded chunks of rows
+def read_table_chunks(db_file, table_name, chunk_size=SCAN_CHUNK_ROWS, immutable=False):
+    conn = connect_readonly(db_file, immutable)
+    try:
+        yield from pd.read_sql_query(f'SELECT * FROM "{table_name}"', conn, chunksize=chunk_size)
+    finally:
+        conn.close()
+
+
+# Function to load the small tables of a database and only the columns of the large ones
+def load_tables_out_of_core(db_file, large_tables, immutable=False):
+    """
+    Read every table except `large_tables` fully; those come back as empty frames with their
+    columns, to be scanned with read_table_chunks. Returns (data_dict, error).
+    """
+    try:
+        conn = connect_readonly(db_file, immutable)
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
+            data_dict = {}
+            for (table_name,) in cursor.fetchall():
+                query = f'SELECT * FROM "{table_name}"' + (" LIMIT 0" if table_name in large_tables else "")
+                data_dict[table_name] = pd.read_sql_query(query, conn)
+        finally:
+            conn.close()
+        return data_dict, None
+    except Exception as e:
+        return None, str(e)
+
+
+def _snapshot_dir(fingerprint):
+    return os.path.join(SNAPSHOT_DIR, fingerprint)
+
+
+# Function to check whether a snapshot exists for a dataset
+def has_snapshot(fingerprint):
+    return os.path.exists(os.path.join(_snapshot_dir(fingerprint), "manifest.json"))
+
+
+# Function to write the tables of a dataset as an Arrow IPC snapshot
+def write_snapshot(data_dict, fingerprint):
+    """
+    Convert every table to Arrow and write one IPC file per table, keyed by the dataset fingerprint.
+    Returns False when pyarrow is missing or a table cannot be converted; the snapshot is then skipped.
+    """
+    if pa is None or has_snapshot(fingerprint):
+        return pa is not None
+
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    staging_dir = tempfile.mkdtemp(dir=SNAPSHOT_DIR, prefix=".staging-")
+
+    try:
+        manifest = {}
+        for table_name, df in data_dict.items():
+            file_name = quote(table_name, safe="") + ".arrow"
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            with pa.OSFile(os.path.join(staging_dir, file_name), "wb") as sink:
+                with ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+            manifest[table_name] = file_name
+
+        with open(os.path.join(staging_dir, "manifest.json"), "w") as f:
+            json.dump(manifest, f)
+
+        # Publish the snapshot atomically so readers never see a partial one
+        os.rename(staging_dir, _snapshot_dir(fingerprint))
+        return True
+    except (pa.ArrowException, OSError):
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        return has_snapshot(fingerprint)
+
+
+# Function to open the snapshot tables of a dataset without reading them into memory
+def read_snapshot(fingerprint):
+    """
+    Memory-map each table of a snapshot and return a dict of Arrow tables.
+    Column buffers point into the mapped files, so column access is zero-copy.
+    """
+    if pa is None or not has_snapshot(fingerprint):
+        return None
+
+    snapshot_dir = _snapshot_dir(fingerprint)
+    with open(os.path.join(snapshot_dir, "manifest.json")) as f:
+        manifest = json.load(f)
+
+    tables = {}
+    for table_name, file_name in manifest.items():
+        source = pa.memory_map(os.path.join(snapshot_dir, file_name), "r")
+        tables[table_name] = ipc.open_file(source).read_all()
+
+    return tables
+
+
+# Function to load a snapshot as dataframes
+def load_snapshot(fingerprint):
+    tables = read_snapshot(fingerprint)
+    if tables is None:
+        return None
+
+    # split_blocks lets pandas reuse the mapped buffers of null-free numeric columns
+    return {name: table.to_pandas(split_blocks=True) for name, table in tables.items()}
+
+
+# Function to load a database through its columnar snapshot
+def load_data_cached(db_file, fingerprint=None, immutable=False):
+    """
+    Load `db_file` from its snapshot when one exists. Otherwise load it from SQLite
+    and write the snapshot for later sessions. See connect_readonly for `immutable`.
+    """
+    if fingerprint is None:
+        fingerprint = file_fingerprint(db_file)
+
+    try:
+        data_dict = load_snapshot(fingerprint)
+    except (OSError, ValueError):
+        data_dict = None
+
+    if data_dict is not None:
+        return data_dict, None
+
+    data_dict, error = load_data_parallel(db_file, immutable=immutable)
+    if not error:
+        write_snapshot(data_dict, fingerprint)
+
+    return data_dict, error
+
+
+# Function to expand comma-separated paths and glob patterns into database files
+def resolve_db_paths(paths_spec, root=None):
+    """
+    With `root`, relative patterns are resolved under it and every matched file must lie
+    inside it (after resolving symlinks and '..'); otherwise ValueError is raised.
+    """
+    root = os.path.realpath(root) if root else None
+    db_paths = []
+    for pattern in (paths_spec or "").split(","):
+        pattern = os.path.expanduser(pattern.strip())
+        if not pattern:
+            continue
+        if root:
+            pattern = os.path.join(root, pattern)
+        for path in sorted(path for path in glob.glob(pattern) if os.path.isfile(path)):
+            if root and os.path.commonpath([root, os.path.realpath(path)]) != root:
+                raise ValueError(f"{path} is outside the allowed directory {root}")
+            db_paths.append(path)
+
+    # Keep the first occurrence of each file
+    return list(dict.fromkeys(db_paths))
+
+
+# Function to combine the tables of several datasets
+def union_datasets(datasets):
+    """
+    Union tables with the same name across `datasets` ({source: data_dict}),
+    tagging every row with a `source` column.
+    """
+    tables = {}
+    for source, data_dict in datasets.items():
+        for table_name, df in data_dict.items():
+            tables.setdefault(table_name, []).append(df.assign(source=source))
+
+    return {table_name: pd.concat(frames, ignore_index=True) for table_name, frames in tables.items()}
+
+
+# Function to load several databases in parallel and combine them
+def load_databases(db_files, max_workers=None, use_processes=False, owned_files=()):
+    """
+    Load every database concurrently (threads by default, or processes for CPU-bound
+    conversion) and union them with a `source` column named after each file.
+    Total load time is bounded by the slowest file rather than the sum of all of them.
+    Only `owned_files` (copies of uploads) are opened as immutable.
+    """
+    if not db_files:
+        return None, "No database files given"
+
+    # Name each source after its file, keeping names unique
+    sources = []
+    for db_file in db_files:
+        source = os.path.splitext(os.path.basename(db_file))[0]
+        if source in sources:
+            source = f"{source}_{len(sources) + 1}"
+        sources.append(source)
+
+    workers = max_workers or min(len(db_files), MAX_LOAD_WORKERS)
+    executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    with executor_class(max_workers=workers) as executor:
+        results = list(executor.map(load_data_cached, db_files, [None] * len(db_files),
+                                    [db_file in owned_files for db_file in db_files]))
+
+    datasets = {}
+    for source, (data_dict, error) in zip(sources, results):
+        if error:
+            return None, f"{source}: {error}"
+        datasets[source] = data_dict
+
+    return union_datasets(datasets), None
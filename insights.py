@@ -0,0 +1,183 @@
+import json
+import os
+
+import numpy as np
+
+from engines import get_engine
+from providers import REQUEST_TIMEOUT, Endpoint, Router
+
+# Groq API details
+GROQ_API_URL = os.environ.get("GROQ_API_URL", "https://api.groq.com/openai/v1/chat/completions")
+GROQ_API_KEY = os.environ.get("GROQ_API_KEY", "")
+MODEL = "llama-3.3-70b-versatile"
+
+# Optional ordered list of OpenAI-compatible endpoints to route insight requests over, as JSON:
+# [{"url": "...", "model": "...", "api_key_env": "NAME_OF_KEY_VARIABLE"}, ...]
+# Without it every request goes to the Groq endpoint above.
+LLM_ENDPOINTS = os.environ.get("PERFORMX_LLM_ENDPOINTS", "")
+
+_router = None
+
+
+# Function to set the API key used for AI insights
+def set_api_key(api_key):
+    global GROQ_API_KEY
+    GROQ_API_KEY = api_key
+
+
+# Function to route insight requests over a list of endpoints
+def set_endpoints(endpoints):
+    """
+    `endpoints` is an ordered list of dicts with 'url', 'model' and optionally 'api_key'
+    or 'api_key_env' (the name of an environment variable holding the key).
+    """
+    global _router
+    _router = Router([
+        Endpoint(
+            endpoint['url'],
+            endpoint.get('model', MODEL),
+            api_key=endpoint.get('api_key') or os.environ.get(endpoint.get('api_key_env', ''), '')
+        )
+        for endpoint in endpoints
+    ], timeout=REQUEST_TIMEOUT)
+
+
+# Function to get the router of insight requests
+def get_router():
+    global _router
+    if _router is None:
+        if LLM_ENDPOINTS:
+            set_endpoints(json.loads(LLM_ENDPOINTS))
+        else:
+            _router = Router([Endpoint(GROQ_API_URL, MODEL, api_key=lambda: GROQ_API_KEY)], timeout=REQUEST_TIMEOUT)
+    return _router
+
+
+# Function to query Groq API for AI insights
+def query_groq_api(prompt):
+    """
+    Despite the name, requests go through the endpoint router: the fastest configured
+    endpoint answers, with a hedged request to the next one when it is slow.
+    """
+    try:
+        return get_router().complete(prompt)
+    except Exception as e:
+        return f"Error querying AI: {str(e)}"
+
+
+# Function to format the metric lines of a prompt from a digest (see engines.Engine.prompt_digest)
+def _metric_lines(digest):
+    return f"""- Tasks assigned: {digest['tasks_assigned']}
+        - Tasks completed: {digest['tasks_completed']}
+        - Completion rate: {(np.float64(digest['tasks_completed']) / digest['tasks_assigned'] * 100):.1f}%
+        - Average working hours: {digest['working_hours']:.1f}
+        - Average quality score: {digest['quality_score']:.2f}/5.0
+        - Average review score: {digest['review_score']:.2f}/5.0"""
+
+
+# Function to build the prompt for AI performance insights
+def build_insight_prompt(performance_data, employee_name=None, department=None, engine=None, manager_name=None):
+    """
+    Return (prompt, None), or (None, message) when there is no data to analyze. With
+    `manager_name`, `performance_data` holds the rows of that manager's team.
+    The figures are computed by `engine` (by default the one configured in PERFORMX_ENGINE).
+    """
+    engine = engine if engine is not None else get_engine()
+
+    if employee_name:
+        # Digest of the employee's rows
+        digest = engine.prompt_digest(performance_data, 'name', employee_name)
+
+        if digest['records'] == 0:
+            return None, "No data available for this employee."
+
+        # Create prompt for individual employee
+        prompt = f"""
+        Analyze the following employee's performance:
+
+        Name: {employee_name}
+        Department: {digest['department']}
+        Position: {digest['position']}
+
+        Performance metrics:
+        {_metric_lines(digest)}
+
+        Provide a concise professional performance analysis with 3-4 specific insights, strengths, and areas for improvement.
+        Format your response with bullet points where appropriate. Keep it under 300 words.
+        """
+
+        return prompt, None
+
+    elif department:
+        # For department analysis
+        digest = engine.prompt_digest(performance_data, 'department', department)
+
+        if digest['records'] == 0:
+            return None, "No data available for this department."
+
+        prompt = f"""
+        Analyze the following department performance:
+
+        Department: {department}
+        Number of employees: {digest['employees']}
+
+        Department metrics:
+        {_metric_lines(digest)}
+
+        Provide a concise professional department performance analysis with 3-4 key insights, strengths, and areas for improvement.
+        Format your response with bullet points where appropriate. Keep it under 300 words.
+        """
+
+        return prompt, None
+
+    elif manager_name:
+        # For a manager's team (the rows of their direct reports)
+        digest = engine.prompt_digest(performance_data)
+
+        if digest['records'] == 0:
+            return None, "No data available for this team."
+
+        prompt = f"""
+        Analyze the following team performance:
+
+        Manager: {manager_name}
+        Number of team members: {digest['employees']}
+        Number of departments: {digest['departments']}
+
+        Team metrics:
+        {_metric_lines(digest)}
+
+        Provide a concise professional team performance analysis with 3-4 key insights, strengths, and areas for improvement.
+        Format your response with bullet points where appropriate. Keep it under 300 words.
+        """
+
+        return prompt, None
+
+    else:
+        # For overall performance
+        digest = engine.prompt_digest(performance_data)
+
+        prompt = f"""
+        Analyze the following overall company performance:
+
+        Number of employees: {digest['employees']}
+        Number of departments: {digest['departments']}
+
+        Overall metrics:
+        {_metric_lines(digest)}
+
+        Provide a concise professional company performance analysis with 3-4 key insights, strengths, and areas for improvement.
+        Format your response with bullet points where appropriate. Keep it under 300 words.
+        """
+
+        return prompt, None
+
+
+# Function to generate AI performance insights
+def generate_ai_insights(employee_data, performance_data, employee_name=None, department=None):
+    prompt, message = build_insight_prompt(performance_data, employee_name=employee_name, department=department)
+
+    if prompt is None:
+        return message
+
+    return query_groq_api(prompt)
@@ -0,0 +1,251 @@
+"""
+Load test of one PerformX app instance with many concurrent sessions.
+
+Every simulated session is a Streamlit AppTest running app.py in this process
+(as sessions of one server do): it loads the database through the path input,
+then reruns the app on each view in turn. AI insight requests go to a local
+OpenAI-compatible stub servers with configurable latency instead of Groq (one
+per latency profile, routed like several providers). Reports rerun latency
+percentiles per view, throughput, memory per session and endpoint statistics.
+
+Usage:
+    python db.py                      # creates performx_test_data.db
+    python loadtest.py --sessions 20 --concurrency 5 --llm-latency 0.5
+    python loadtest.py --llm-latency 0.3,1.0 --llm-jitter 0.5,0.1   # two endpoints with different profiles
+    python loadtest.py --stub-only --port 8100   # stub for a real server: GROQ_API_URL=http://127.0.0.1:8100/v1/chat/completions
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+import ingest
+import insights
+
+SOURCE_DB = "performx_test_data.db"
+APP_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+DEFAULT_VIEWS = ["Overview", "Individual Performance", "Department Analysis", "AI Insights"]
+
+# Seconds a single rerun may take before AppTest gives up
+RERUN_TIMEOUT = 600
+
+
+# Function to build the request handler of the LLM stub server
+def stub_handler(latency, jitter):
+    class StubHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            model = json.loads(body or b"{}").get('model', 'stub')
+            time.sleep(max(0.0, random.gauss(latency, jitter)))
+
+            payload = json.dumps({
+                'model': model,
+                'choices': [{'message': {'role': 'assistant', 'content': "- Stub insight for load testing."}}]
+            }).encode()
+            try:
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+            except (BrokenPipeError, ConnectionResetError):
+                # The client cancelled the request (e.g. it lost a hedge)
+                pass
+
+        def log_message(self, *args):
+            pass
+
+    return StubHandler
+
+
+# Function to start an OpenAI-compatible stub server in a background thread
+def start_stub_server(latency=0.5, jitter=0.0, port=0):
+    """
+    Return (server, url). Every chat completion request is answered after `latency`
+    seconds (normally distributed with standard deviation `jitter`).
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', port), stub_handler(latency, jitter))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions"
+
+
+# Function to read the resident memory of this process in bytes
+def resident_memory():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        # Peak rather than current memory outside Linux (kilobytes on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+# Function to compile the app script once for every session, as a server does
+def share_script_cache():
+    """
+    AppTest compiles the script again on every run, while a server keeps one compiled copy.
+    Compiling concurrently is also unsafe on some Python versions, so compile once under a lock.
+    """
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+
+    compile_script = ScriptCache.get_bytecode
+    compiled = {}
+    lock = threading.Lock()
+
+    def get_bytecode(self, script_path):
+        with lock:
+            if script_path not in compiled:
+                compiled[script_path] = compile_script(self, script_path)
+            return compiled[script_path]
+
+    ScriptCache.get_bytecode = get_bytecode
+
+
+# Function to drive one simulated session through the views
+def run_session(database, views, iterations, timings, errors):
+    """
+    Append (view, seconds) to `timings` for every rerun; errors are appended to `errors`.
+    Returns the AppTest so the session stays alive until the run ends.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP_FILE, default_timeout=RERUN_TIMEOUT)
+
+    def rerun(view, action):
+        started = time.perf_counter()
+        action()
+        timings.append((view, time.perf_counter() - started))
+        if at.exception:
+            errors.append((view, at.exception[0].message))
+            return False
+        return True
+
+    if not rerun('Start', at.run):
+        return at
+    path_input = next(widget for widget in at.sidebar.text_input if widget.label.startswith("Or load databases"))
+    if not rerun('Load', path_input.set_value(database).run):
+        return at
+    for _ in range(iterations):
+        for view in views:
+            if not at.sidebar.radio:
+                errors.append((view, "; ".join(element.value for element in at.sidebar.error) or "View selector missing"))
+                return at
+            if not rerun(view, at.sidebar.radio[0].set_value(view).run):
+                return at
+    return at
+
+
+# Function to summarize rerun latencies per view
+def latency_report(timings):
+    rows = []
+    for view in dict.fromkeys(view for view, _ in timings):
+        seconds = np.array([value for name, value in timings if name == view]) * 1000
+        p50, p90, p95, p99 = np.percentile(seconds, [50, 90, 95, 99])
+        rows.append((view, len(seconds), p50, p90, p95, p99, seconds.max()))
+    return rows
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load test PerformX with concurrent simulated sessions")
+    parser.add_argument("--database", default=SOURCE_DB, help="Database loaded by every session (e.g. from db.py)")
+    parser.add_argument("--sessions", type=int, default=10, help="Number of simulated sessions")
+    parser.add_argument("--concurrency", type=int, default=5, help="Sessions running at the same time")
+    parser.add_argument("--iterations", type=int, default=2, help="Passes over the views per session")
+    parser.add_argument("--views", default=",".join(DEFAULT_VIEWS), help="Comma-separated views to visit")
+    parser.add_argument("--llm-latency", default="0.5",
+                        help="Mean stub response time in seconds; a comma-separated list starts one stub endpoint per value")
+    parser.add_argument("--llm-jitter", default="0.1",
+                        help="Standard deviation of the stub response time (one value, or one per endpoint)")
+    parser.add_argument("--port", type=int, default=0, help="Port of the first stub server (default: any free port)")
+    parser.add_argument("--stub-only", action="store_true", help="Only run the stub server until interrupted")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    latencies = [float(value) for value in args.llm_latency.split(",")]
+    jitters = [float(value) for value in args.llm_jitter.split(",")]
+    profiles = [(latency, jitters[i] if i < len(jitters) else jitters[-1]) for i, latency in enumerate(latencies)]
+
+    stubs = [
+        start_stub_server(latency, jitter, args.port + i if args.port else 0)
+        for i, (latency, jitter) in enumerate(profiles)
+    ]
+    profile_text = ", ".join(f"{latency}s ± {jitter}s" for latency, jitter in profiles)
+
+    if args.stub_only:
+        for (_, url), (latency, jitter) in zip(stubs, profiles):
+            print(f"LLM stub listening on {url} (latency {latency}s ± {jitter}s)")
+        print("Ctrl+C to stop")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            for server, _ in stubs:
+                server.shutdown()
+        return 0
+
+    if not os.path.exists(args.database):
+        print(f"{args.database} not found; run `python db.py` first", file=sys.stderr)
+        return 1
+    database = os.path.abspath(args.database)
+
+    # Sessions load the database through the path input, which only reads under the allowed directory
+    ingest.DB_PATH_ROOT = os.path.dirname(database)
+
+    # The app routes insight requests through the insights module, which sessions share with this process
+    insights.set_endpoints([{'url': url, 'model': insights.MODEL} for _, url in stubs])
+
+    # AppTest switches test mode on for the duration of each run and back off after it,
+    # which races between concurrent sessions; keep it on for the whole load test
+    from streamlit import config
+    config.set_option("global.appTest", True)
+    share_script_cache()
+    views = [view.strip() for view in args.views.split(",") if view.strip()]
+
+    timings, errors = [], []
+    memory_before = resident_memory()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as executor:
+        futures = [
+            executor.submit(run_session, database, views, args.iterations, timings, errors)
+            for _ in range(args.sessions)
+        ]
+        sessions = [future.result() for future in futures]
+    elapsed = time.perf_counter() - started
+    memory_after = resident_memory()
+
+    print(f"{args.sessions} sessions, concurrency {args.concurrency}, {args.iterations} passes over {len(views)} views, "
+          f"LLM stubs {profile_text}")
+    print(f"{'view':<24} {'reruns':>7} {'p50 ms':>9} {'p90 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for view, count, p50, p90, p95, p99, longest in latency_report(timings):
+        print(f"{view:<24} {count:>7} {p50:>9.0f} {p90:>9.0f} {p95:>9.0f} {p99:>9.0f} {longest:>9.0f}")
+
+    view_reruns = sum(1 for view, _ in timings if view in views)
+    print(f"Throughput: {len(timings) / elapsed:.1f} reruns/s ({view_reruns / elapsed:.1f} view reruns/s) over {elapsed:.1f}s")
+    print(f"Memory: {memory_before / 2**20:.0f} MB before, {memory_after / 2**20:.0f} MB with {len(sessions)} sessions open, "
+          f"{(memory_after - memory_before) / max(1, len(sessions)) / 2**20:.1f} MB per session")
+    print(f"{'endpoint':<24} {'requests':>9} {'wins':>6} {'hedges':>7} {'cancelled':>10} {'probes':>7} {'errors':>7} "
+          f"{'p50 ms':>9} {'p95 ms':>9}")
+    for endpoint in insights.get_router().stats():
+        p50, p95 = (f"{value * 1000:.0f}" if value is not None else "-" for value in (endpoint['p50'], endpoint['p95']))
+        print(f"{endpoint['name']:<24} {endpoint['requests']:>9} {endpoint['wins']:>6} {endpoint['hedges']:>7} "
+              f"{endpoint['cancelled']:>10} {endpoint['probes']:>7} {endpoint['errors']:>7} {p50:>9} {p95:>9}")
+    if errors:
+        print(f"Errors: {len(errors)} (first: {errors[0][0]}: {errors[0][1]})")
+
+    for server, _ in stubs:
+        server.shutdown()
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
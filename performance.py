@@ -0,0 +1,428 @@
+import numpy as np
+import pandas as pd
+
+from cohorts import build_cohort_cube
+from cube import build_cube, combine_cubes
+from hierarchy import build_hierarchy
+from ingest import load_tables_out_of_core, read_table_chunks
+from row_index import build_row_index, extend_row_index, lookup, period_keys, select_rows
+
+# Core performance analytics shared by the Streamlit app and the batch reporting CLI.
+# Nothing in this module depends on Streamlit.
+
+
+# Function to analyze employee performance
+def analyze_performance(employee_data, metrics_data):
+    """
+    Analyze employee performance based on available metrics
+    This is a simplified version - in a real app, more complex analysis would be done
+    """
+    # Merge employee data with metrics
+    if 'employee_id' in employee_data.columns and 'employee_id' in metrics_data.columns:
+        # Rows combined from several databases are only matched within their own source
+        if 'source' in employee_data.columns and 'source' in metrics_data.columns:
+            merge_keys = ['employee_id', 'source']
+        else:
+            merge_keys = 'employee_id'
+
+        performance_data = pd.merge(
+            employee_data,
+            metrics_data,
+            on=merge_keys,
+            how='inner'
+        )
+
+        # Calculate additional metrics (example)
+        if 'tasks_completed' in performance_data.columns and 'tasks_assigned' in performance_data.columns:
+            performance_data['completion_rate'] = (
+                performance_data['tasks_completed'] / performance_data['tasks_assigned']
+            ).fillna(0)
+
+        if 'working_hours' in performance_data.columns and 'tasks_completed' in performance_data.columns:
+            performance_data['productivity'] = (
+                performance_data['tasks_completed'] / performance_data['working_hours']
+            ).fillna(0)
+
+        return performance_data
+    else:
+        # Return basic employee data if metrics cannot be merged
+        return employee_data
+
+
+# Columns summed and averaged in the department and employee aggregates
+DEPARTMENT_SUM_COLS = ['tasks_completed', 'tasks_assigned', 'working_hours']
+DEPARTMENT_MEAN_COLS = ['productivity', 'completion_rate']
+EMPLOYEE_SUM_COLS = ['tasks_assigned', 'tasks_completed', 'working_hours']
+EMPLOYEE_MEAN_COLS = ['quality_score', 'review_score']
+
+
+# Function to compute additive totals (sums and non-null counts) per group
+def get_group_totals(performance_data, by, sum_cols, mean_cols):
+    """
+    Totals can be combined across batches of rows, so aggregates can be updated
+    incrementally when new rows arrive instead of being recomputed.
+    """
+    sum_cols = [col for col in sum_cols if col in performance_data.columns]
+    mean_cols = [col for col in mean_cols if col in performance_data.columns]
+
+    grouped = performance_data.groupby(by)
+    totals = grouped[sum_cols + mean_cols].sum()
+    counts = grouped[mean_cols].count().add_suffix('_count')
+
+    return totals.join(counts)
+
+
+# Function to add the totals of new rows to existing totals
+def combine_group_totals(totals, new_totals):
+    return pd.concat([totals, new_totals]).groupby(level=0).sum()
+
+
+# Function to get department performance
+def get_department_performance(performance_data, engine=None):
+    if engine is not None:
+        return engine.department_performance(performance_data)
+    if 'department' not in performance_data.columns:
+        return None
+
+    dept_totals = get_group_totals(performance_data, 'department', DEPARTMENT_SUM_COLS, DEPARTMENT_MEAN_COLS)
+    return department_performance_from_totals(dept_totals)
+
+
+# Function to get department performance from department totals
+def department_performance_from_totals(dept_totals):
+    # Sums per department, and averages from the summed values and their counts
+    dept_performance = dept_totals[DEPARTMENT_SUM_COLS].copy()
+    for col in DEPARTMENT_MEAN_COLS:
+        dept_performance[col] = dept_totals[col] / dept_totals[f'{col}_count']
+    dept_performance = dept_performance.reset_index()
+
+    # Calculate department completion rate
+    dept_performance['dept_completion_rate'] = (
+        dept_performance['tasks_completed'] / dept_performance['tasks_assigned'].replace(0, np.nan)
+    ).fillna(0)
+
+    # Calculate department productivity (0 for departments without recorded hours)
+    dept_performance['dept_productivity'] = (
+        dept_performance['tasks_completed'] / dept_performance['working_hours'].replace(0, np.nan)
+    ).fillna(0)
+
+    return dept_performance
+
+
+# Function to summarize performance per employee
+def get_employee_summary(performance_data):
+    if 'employee_id' not in performance_data.columns or 'tasks_completed' not in performance_data.columns:
+        return None
+
+    employee_totals = get_group_totals(performance_data, 'employee_id', EMPLOYEE_SUM_COLS, EMPLOYEE_MEAN_COLS)
+    return employee_summary_from_totals(employee_totals)
+
+
+# Function to get the per-employee summary from employee totals
+def employee_summary_from_totals(employee_totals):
+    # Lifetime totals and averages for every employee
+    employee_summary = employee_totals[[col for col in EMPLOYEE_SUM_COLS if col in employee_totals.columns]].copy()
+    for col in EMPLOYEE_MEAN_COLS:
+        if col in employee_totals.columns:
+            employee_summary[col] = employee_totals[col] / employee_totals[f'{col}_count']
+
+    if 'tasks_assigned' in employee_summary.columns:
+        employee_summary['completion_rate'] = (
+            employee_summary['tasks_completed'] / employee_summary['tasks_assigned']
+        ).fillna(0)
+
+    if 'working_hours' in employee_summary.columns:
+        employee_summary['productivity'] = (
+            employee_summary['tasks_completed'] / employee_summary['working_hours'].replace(0, np.nan)
+        ).fillna(0)
+
+    return employee_summary
+
+
+# Columns describing an employee and the metrics kept from their latest period
+EMPLOYEE_DETAIL_COLS = ['name', 'department', 'position', 'join_date', 'manager_id', 'source']
+LATEST_METRIC_COLS = ['tasks_assigned', 'tasks_completed', 'working_hours', 'quality_score', 'review_score',
+                      'completion_rate', 'productivity']
+
+
+# Function to get the latest-period row of every employee
+def get_latest_rows(performance_data):
+    """
+    Return one row per employee (indexed by employee_id) holding their details and the
+    metrics of their most recent period, plus a sortable 'period_key' column.
+    """
+    if 'employee_id' not in performance_data.columns:
+        return None
+
+    if 'year' in performance_data.columns and 'month' in performance_data.columns:
+        keys = period_keys(performance_data).fillna(-1).to_numpy()
+    else:
+        keys = np.zeros(len(performance_data))
+
+    # Position of the highest period key per employee (later rows win ties)
+    order = pd.DataFrame({'employee_id': performance_data['employee_id'].to_numpy(), 'key': keys})
+    positions = order.iloc[::-1].groupby('employee_id', sort=False)['key'].idxmax().to_numpy()
+
+    columns = [col for col in ['employee_id'] + EMPLOYEE_DETAIL_COLS + LATEST_METRIC_COLS + ['year', 'month']
+               if col in performance_data.columns]
+    latest_rows = performance_data.iloc[positions][columns].set_index('employee_id')
+    latest_rows['period_key'] = keys[positions]
+    return latest_rows
+
+
+# Function to merge the latest rows of newly appended data into existing latest rows
+def combine_latest_rows(latest_rows, new_latest_rows):
+    combined = pd.concat([latest_rows, new_latest_rows]).sort_values('period_key', kind='stable')
+    return combined[~combined.index.duplicated(keep='last')]
+
+
+# Function to build the employee lookup table from latest rows and lifetime totals
+def build_employee_index(latest_rows, employee_summary):
+    """
+    Return one row per employee indexed by employee_id and sorted by name, with the
+    employee's details, 'latest_*' metrics for their latest period, lifetime totals and
+    averages from `employee_summary`, and a unique 'label' for selectors.
+    """
+    if latest_rows is None or employee_summary is None or 'name' not in latest_rows.columns:
+        return None
+
+    employee_index = latest_rows[[col for col in EMPLOYEE_DETAIL_COLS if col in latest_rows.columns]].copy()
+
+    if 'year' in latest_rows.columns and 'month' in latest_rows.columns:
+        employee_index['latest_period'] = latest_rows['month'].astype(str) + ' ' + latest_rows['year'].astype(str)
+    for col in LATEST_METRIC_COLS:
+        if col in latest_rows.columns:
+            employee_index[f'latest_{col}'] = latest_rows[col]
+
+    employee_index = employee_index.join(employee_summary, how='inner')
+
+    # Names are not unique, so the label carries the ID (and source when datasets are combined)
+    employee_index['label'] = employee_index['name'].astype(str) + ' (#' + employee_index.index.astype(str) + ')'
+    if 'source' in employee_index.columns:
+        employee_index['label'] += ' · ' + employee_index['source'].astype(str)
+
+    return employee_index.sort_values(['name', 'label'], kind='stable')
+
+
+# Function to merge and aggregate the employee and metrics tables once
+def build_processed_state(employee_data, metrics_data, key=None, engine=None, performance_data=None):
+    """
+    Return the processed artifacts of a dataset: the merged frame, additive department and
+    employee totals, the aggregates derived from them, the per-employee lookup table, the
+    reporting hierarchy, the department x position x period cube, the hiring cohort cube
+    (see cohorts.py) and the row index used for filtering.
+    `engine` (see engines.py) merges, totals and filters the rows instead of the functions here
+    (engines that scan for filters get no row index), and `performance_data` passes rows it
+    already merged (e.g. straight from a SQLite file).
+    """
+    merge = engine.analyze_performance if engine is not None else analyze_performance
+    totals = engine.group_totals if engine is not None else get_group_totals
+
+    if performance_data is None:
+        performance_data = merge(employee_data, metrics_data)
+
+    if 'department' in performance_data.columns:
+        dept_totals = totals(performance_data, 'department', DEPARTMENT_SUM_COLS, DEPARTMENT_MEAN_COLS)
+    else:
+        dept_totals = None
+
+    if 'employee_id' in performance_data.columns and 'tasks_completed' in performance_data.columns:
+        employee_totals = totals(performance_data, 'employee_id', EMPLOYEE_SUM_COLS, EMPLOYEE_MEAN_COLS)
+    else:
+        employee_totals = None
+
+    latest_rows = get_latest_rows(performance_data)
+    employee_summary = employee_summary_from_totals(employee_totals) if employee_totals is not None else None
+
+    return {
+        'key': key,
+        'employee_data': employee_data,
+        'metrics_data': metrics_data,
+        'performance_data': performance_data,
+        'dept_totals': dept_totals,
+        'dept_performance': department_performance_from_totals(dept_totals) if dept_totals is not None else None,
+        'employee_totals': employee_totals,
+        'employee_summary': employee_summary,
+        'latest_rows': latest_rows,
+        'employee_index': build_employee_index(latest_rows, employee_summary),
+        'hierarchy': build_hierarchy(employee_data, employee_totals),
+        'cube': build_cube(performance_data),
+        'cohorts': build_cohort_cube(performance_data),
+        'row_index': build_row_index(performance_data) if engine is None or engine.row_index else None,
+        'engine': engine
+    }
+
+
+# Function to fold newly appended rows into the processed artifacts
+def refresh_processed_state(processed, employee_data, metrics_data, new_metrics, key=None, engine=None):
+    """
+    Merge only the new performance rows, append them to the merged frame and add their
+    totals to the department and employee totals. Returns None when a full rebuild is needed.
+    """
+    merge = engine.analyze_performance if engine is not None else analyze_performance
+    totals = engine.group_totals if engine is not None else get_group_totals
+
+    refreshed = dict(processed, key=key, employee_data=employee_data, metrics_data=metrics_data, engine=engine)
+
+    if new_metrics is None:
+        return refreshed
+
+    if processed['dept_totals'] is None or processed['employee_totals'] is None:
+        return None
+
+    new_performance = merge(employee_data, new_metrics)
+    offset = len(processed['performance_data'])
+    refreshed['performance_data'] = pd.concat([processed['performance_data'], new_performance], ignore_index=True)
+
+    refreshed['dept_totals'] = combine_group_totals(
+        processed['dept_totals'],
+        totals(new_performance, 'department', DEPARTMENT_SUM_COLS, DEPARTMENT_MEAN_COLS)
+    )
+    refreshed['dept_performance'] = department_performance_from_totals(refreshed['dept_totals'])
+
+    refreshed['employee_totals'] = combine_group_totals(
+        processed['employee_totals'],
+        totals(new_performance, 'employee_id', EMPLOYEE_SUM_COLS, EMPLOYEE_MEAN_COLS)
+    )
+    refreshed['employee_summary'] = employee_summary_from_totals(refreshed['employee_totals'])
+
+    # Only employees with new rows can change their latest period
+    refreshed['latest_rows'] = combine_latest_rows(processed['latest_rows'], get_latest_rows(new_performance))
+    refreshed['employee_index'] = build_employee_index(refreshed['latest_rows'], refreshed['employee_summary'])
+
+    # The employees table may have changed too, and the tree is cheap next to the rows
+    refreshed['hierarchy'] = build_hierarchy(employee_data, refreshed['employee_totals'])
+
+    new_cube = build_cube(new_performance)
+    if processed['cube'] is not None and new_cube is not None:
+        refreshed['cube'] = combine_cubes(processed['cube'], new_cube)
+
+    new_cohorts = build_cohort_cube(new_performance)
+    if processed['cohorts'] is not None and new_cohorts is not None:
+        refreshed['cohorts'] = combine_cubes(processed['cohorts'], new_cohorts)
+
+    # Index the new rows at their positions in the appended frame
+    if processed['row_index'] is not None:
+        refreshed['row_index'] = extend_row_index(processed['row_index'], new_performance, offset)
+
+    return refreshed
+
+
+# Function to build the aggregate artifacts from metrics read in chunks
+def build_processed_state_chunked(employee_data, metrics_chunks, key=None, engine=None):
+    """
+    Same aggregates as build_processed_state, but `metrics_chunks` is an iterable of metrics
+    frames that are merged and folded into the additive totals, latest rows and cubes one at a
+    time, so only one chunk of rows is held in memory. The merged frame and the row index are
+    not kept ('performance_data' and 'row_index' are None).
+    """
+    merge = engine.analyze_performance if engine is not None else analyze_performance
+    group_totals = engine.group_totals if engine is not None else get_group_totals
+    dept_totals = employee_totals = latest_rows = cube = cohorts = None
+    scanned_rows = 0
+
+    for chunk in metrics_chunks:
+        performance_chunk = merge(employee_data, chunk)
+        if performance_chunk is employee_data or performance_chunk.empty:
+            continue
+        scanned_rows += len(performance_chunk)
+
+        if 'department' in performance_chunk.columns:
+            totals = group_totals(performance_chunk, 'department', DEPARTMENT_SUM_COLS, DEPARTMENT_MEAN_COLS)
+            dept_totals = totals if dept_totals is None else combine_group_totals(dept_totals, totals)
+
+        if 'tasks_completed' in performance_chunk.columns:
+            totals = group_totals(performance_chunk, 'employee_id', EMPLOYEE_SUM_COLS, EMPLOYEE_MEAN_COLS)
+            employee_totals = totals if employee_totals is None else combine_group_totals(employee_totals, totals)
+
+        chunk_latest = get_latest_rows(performance_chunk)
+        latest_rows = chunk_latest if latest_rows is None else combine_latest_rows(latest_rows, chunk_latest)
+
+        chunk_cube = build_cube(performance_chunk)
+        if chunk_cube is not None:
+            cube = chunk_cube if cube is None else combine_cubes(cube, chunk_cube)
+
+        chunk_cohorts = build_cohort_cube(performance_chunk)
+        if chunk_cohorts is not None:
+            cohorts = chunk_cohorts if cohorts is None else combine_cubes(cohorts, chunk_cohorts)
+
+    employee_summary = employee_summary_from_totals(employee_totals) if employee_totals is not None else None
+
+    return {
+        'key': key,
+        'employee_data': employee_data,
+        'metrics_data': None,
+        'performance_data': None,
+        'dept_totals': dept_totals,
+        'dept_performance': department_performance_from_totals(dept_totals) if dept_totals is not None else None,
+        'employee_totals': employee_totals,
+        'employee_summary': employee_summary,
+        'latest_rows': latest_rows,
+        'employee_index': build_employee_index(latest_rows, employee_summary),
+        'hierarchy': build_hierarchy(employee_data, employee_totals),
+        'cube': cube,
+        'cohorts': cohorts,
+        'row_index': None,
+        'engine': engine,
+        'scanned_rows': scanned_rows
+    }
+
+
+# Function to load a database without reading its performance table into memory
+def load_out_of_core(db_file, employee_table='employees', performance_table='performance_metrics', key=None,
+                     engine=None, immutable=False):
+    """
+    Load every table but the performance table, then scan that one in chunks into the
+    processed aggregates. Returns ({'data_dict', 'processed'}, error).
+    Pass `immutable` only for copies the app owns (see ingest.connect_readonly).
+    """
+    data_dict, error = load_tables_out_of_core(db_file, [performance_table], immutable)
+    if error:
+        return None, error
+    if employee_table not in data_dict or performance_table not in data_dict:
+        return None, f"Large file mode requires '{employee_table}' and '{performance_table}' tables"
+
+    try:
+        processed = build_processed_state_chunked(
+            data_dict[employee_table],
+            read_table_chunks(db_file, performance_table, immutable=immutable),
+            key=key,
+            engine=engine
+        )
+    except Exception as e:
+        return None, str(e)
+
+    processed['metrics_data'] = data_dict[performance_table]
+    return {'data_dict': data_dict, 'processed': processed}, None
+
+
+# Function to filter performance data by department (row index or engine scan)
+def filter_by_department(processed, department):
+    performance_data = processed['performance_data']
+
+    if department == 'All':
+        return performance_data
+    if processed['row_index'] is None:
+        return filter_rows(processed, {'department': [department]})[0]
+    if 'department' not in processed['row_index']['values']:
+        return performance_data
+
+    return performance_data.iloc[lookup(processed['row_index'], 'department', [department])]
+
+
+# Function to filter performance data by several attributes (row index or engine scan)
+def filter_rows(processed, value_filters=None, range_filters=None):
+    """
+    Return the rows matching every filter (see row_index.select_rows) and their positions.
+    Positions are None when no filter is active. States without a row index are scanned by
+    their engine instead.
+    """
+    if processed['row_index'] is None:
+        positions = processed['engine'].filter_rows(processed['performance_data'], value_filters, range_filters)
+    else:
+        positions = select_rows(processed['row_index'], value_filters, range_filters)
+
+    if positions is None:
+        return processed['performance_data'], None
+
+    return processed['performance_data'].iloc[positions], positions
@@ -0,0 +1,297 @@
+import http.client
+import json
+import socket
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+import numpy as np
+
+# Routing of chat completions over several OpenAI-compatible endpoints. Each
+# endpoint keeps a rolling window of its latencies and failures; requests go
+# to the endpoint with the best expected latency, and when it has not answered
+# by its own p95 latency a hedged duplicate is sent to the next one. The first
+# successful answer wins and the other request is cancelled by closing its
+# connection. Cancelled requests say nothing about how long the endpoint would
+# have taken, so they are only counted; endpoints with too few (or only old)
+# samples are measured by probes, duplicates that run to completion and whose
+# answers are discarded.
+
+# Number of recent requests kept per endpoint
+ROLLING_WINDOW = 100
+
+# Successful requests needed before an endpoint's latency quantiles are trusted
+MIN_SAMPLES = 5
+
+# Latency quantile of the primary endpoint after which a hedged request is sent
+HEDGE_QUANTILE = 95
+
+# Hedge delay (in seconds) while an endpoint has too few samples, and the lower bound on it
+DEFAULT_HEDGE_DELAY = 5.0
+MIN_HEDGE_DELAY = 0.05
+
+# How much an endpoint's error rate inflates its expected latency when ranking
+ERROR_PENALTY = 4.0
+
+# Seconds after its last completed request that an endpoint is probed again
+PROBE_INTERVAL = 60.0
+
+# Seconds to wait for a response from an endpoint
+REQUEST_TIMEOUT = 60
+
+# Upper bound on concurrent requests across all routers
+MAX_REQUEST_WORKERS = 32
+
+_executor = ThreadPoolExecutor(max_workers=MAX_REQUEST_WORKERS, thread_name_prefix="llm-request")
+
+
+class RequestCancelled(Exception):
+    """Raised in a request that lost a hedge and was cancelled."""
+
+
+class Call:
+    """
+    Handle on one in-flight HTTP request that another thread can cancel.
+    Cancelling shuts its socket down, which aborts a blocked read immediately.
+    """
+
+    def __init__(self):
+        self.cancelled = False
+        self._connection = None
+        self._lock = threading.Lock()
+
+    # Function to attach the connection of the request (raises when already cancelled)
+    def attach(self, connection):
+        with self._lock:
+            if self.cancelled:
+                raise RequestCancelled()
+            self._connection = connection
+
+    # Function to abort the request
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+            connection = self._connection
+
+        if connection is not None and connection.sock is not None:
+            try:
+                connection.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            connection.close()
+
+
+# Function to POST a JSON payload and decode the JSON response
+def post_json(url, payload, headers=None, timeout=REQUEST_TIMEOUT, call=None):
+    """
+    Return (status, body). Uses one connection per request so that `call` (a Call)
+    can abort it from another thread; a cancelled request raises RequestCancelled.
+    """
+    parts = urlsplit(url)
+    connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+    connection = connection_class(parts.hostname, parts.port, timeout=timeout)
+    path = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+
+    try:
+        if call is not None:
+            call.attach(connection)
+        connection.request('POST', path, body=json.dumps(payload),
+                           headers={'Content-Type': 'application/json', **(headers or {})})
+        response = connection.getresponse()
+        return response.status, json.loads(response.read() or b'{}')
+    except (OSError, http.client.HTTPException):
+        if call is not None and call.cancelled:
+            raise RequestCancelled()
+        raise
+    finally:
+        connection.close()
+
+
+class Endpoint:
+    """
+    An OpenAI-compatible chat completions endpoint and its rolling statistics.
+    `api_key` may be a callable, so keys set later (e.g. insights.set_api_key) are picked up.
+    """
+
+    def __init__(self, url, model, api_key=None, name=None, window=ROLLING_WINDOW):
+        self.url = url
+        self.model = model
+        self.api_key = api_key
+        self.name = name or urlsplit(url).netloc
+        self.latencies = deque(maxlen=window)
+        self.failures = deque(maxlen=window)
+        self.counts = {'requests': 0, 'errors': 0, 'hedges': 0, 'wins': 0, 'cancelled': 0, 'probes': 0}
+        self.last_completed = None
+        self.probing = False
+        self._lock = threading.Lock()
+
+    # Function to record the outcome of a request
+    def record(self, seconds, ok):
+        with self._lock:
+            self.latencies.append(seconds)
+            self.failures.append(not ok)
+            self.last_completed = time.monotonic()
+            self.counts['requests'] += 1
+            if not ok:
+                self.counts['errors'] += 1
+
+    # Function to count a routing event (hedges sent to this endpoint, wins, cancellations, probes)
+    def count(self, event):
+        with self._lock:
+            self.counts[event] += 1
+
+    # Function to get a latency quantile over the window, or None with too few samples
+    def latency_quantile(self, quantile):
+        with self._lock:
+            samples = [seconds for seconds, failed in zip(self.latencies, self.failures) if not failed]
+        if len(samples) < MIN_SAMPLES:
+            return None
+        return float(np.percentile(samples, quantile))
+
+    # Function to get the share of failed requests over the window
+    def error_rate(self):
+        with self._lock:
+            return sum(self.failures) / len(self.failures) if self.failures else 0.0
+
+    # Function to estimate the latency of the next request, penalizing failures
+    def expected_latency(self):
+        median = self.latency_quantile(50)
+        if median is None:
+            median = DEFAULT_HEDGE_DELAY / 2
+        return median * (1 + ERROR_PENALTY * self.error_rate())
+
+    # Function to get the delay after which a request to this endpoint is hedged
+    def hedge_delay(self):
+        deadline = self.latency_quantile(HEDGE_QUANTILE)
+        return DEFAULT_HEDGE_DELAY if deadline is None else max(MIN_HEDGE_DELAY, deadline)
+
+    # Function to claim the endpoint for a probe when its statistics are missing or stale
+    def start_probe(self):
+        """Return True (and mark a probe in flight) when the endpoint should be probed now."""
+        with self._lock:
+            samples = sum(1 for failed in self.failures if not failed)
+            stale = self.last_completed is None or time.monotonic() - self.last_completed > PROBE_INTERVAL
+            if self.probing or (samples >= MIN_SAMPLES and not stale):
+                return False
+            self.probing = True
+            self.counts['probes'] += 1
+            return True
+
+    # Function to run a probe request, keeping only its latency
+    def probe(self, messages, timeout=REQUEST_TIMEOUT):
+        try:
+            self.complete(messages, timeout)
+        except Exception:
+            pass
+        finally:
+            with self._lock:
+                self.probing = False
+
+    # Function to request a chat completion and return the response text
+    def complete(self, messages, timeout=REQUEST_TIMEOUT, call=None):
+        api_key = self.api_key() if callable(self.api_key) else self.api_key
+        headers = {'Authorization': f'Bearer {api_key}'} if api_key else {}
+
+        started = time.perf_counter()
+        try:
+            status, body = post_json(self.url, {'model': self.model, 'messages': messages}, headers, timeout, call)
+            if status >= 400:
+                message = body.get('error', {}).get('message') if isinstance(body.get('error'), dict) else body.get('error')
+                raise RuntimeError(f"{self.name} returned HTTP {status}: {message or 'no details'}")
+        except RequestCancelled:
+            # Cancelled when another endpoint answered first: its latency is unknown, so it is only counted
+            self.count('cancelled')
+            raise
+        except Exception:
+            self.record(time.perf_counter() - started, False)
+            raise
+
+        self.record(time.perf_counter() - started, True)
+        return body.get("choices", [{}])[0].get("message", {}).get("content", "No response from AI.")
+
+    # Function to describe the endpoint's statistics
+    def stats(self):
+        with self._lock:
+            counts = dict(self.counts)
+        return dict(counts, name=self.name, model=self.model, error_rate=self.error_rate(),
+                    p50=self.latency_quantile(50), p95=self.latency_quantile(HEDGE_QUANTILE))
+
+
+class Router:
+    """
+    Send each request to the endpoint with the lowest expected latency. When it has not
+    answered within its hedge delay (its p95 latency), send the same request to the next
+    endpoint as well and keep whichever succeeds first; a failure fails over immediately.
+    Other endpoints without recent samples get a probe copy of the request (see Endpoint.probe).
+    """
+
+    def __init__(self, endpoints, hedge=True, timeout=REQUEST_TIMEOUT):
+        if not endpoints:
+            raise ValueError("A router needs at least one endpoint")
+        self.endpoints = list(endpoints)
+        self.hedge = hedge
+        self.timeout = timeout
+
+    # Function to order the endpoints by expected latency (configured order breaks ties)
+    def ranked(self):
+        return sorted(self.endpoints, key=lambda endpoint: endpoint.expected_latency())
+
+    # Function to get a chat completion for a prompt from the fastest endpoint
+    def complete(self, prompt):
+        messages = [{"role": "user", "content": prompt}]
+        candidates = self.ranked()
+        in_flight = {}
+        errors = []
+
+        def launch():
+            endpoint = candidates.pop(0)
+            call = Call()
+            in_flight[_executor.submit(endpoint.complete, messages, self.timeout, call)] = (endpoint, call)
+            return endpoint
+
+        primary = launch()
+        hedge_at = time.perf_counter() + primary.hedge_delay()
+
+        # Measure endpoints that never (or no longer) get traffic, so they can earn it back
+        for endpoint in candidates:
+            if endpoint.start_probe():
+                _executor.submit(endpoint.probe, messages, self.timeout)
+
+        while in_flight:
+            can_hedge = self.hedge and candidates
+            wait_for = max(0.0, hedge_at - time.perf_counter()) if can_hedge else None
+            done, _ = wait(in_flight, timeout=wait_for, return_when=FIRST_COMPLETED)
+
+            if not done:
+                # The requests in flight are slower than usual: hedge with the next endpoint
+                hedged = launch()
+                hedged.count('hedges')
+                hedge_at = time.perf_counter() + hedged.hedge_delay()
+                continue
+
+            for future in done:
+                endpoint, _ = in_flight.pop(future)
+                try:
+                    text = future.result()
+                except RequestCancelled:
+                    continue
+                except Exception as e:
+                    errors.append(f"{endpoint.name}: {e}")
+                    continue
+
+                endpoint.count('wins')
+                for _, call in in_flight.values():
+                    call.cancel()
+                return text
+
+            # Every request in flight failed: fail over to the next endpoint right away
+            if not in_flight and candidates:
+                hedge_at = time.perf_counter() + launch().hedge_delay()
+
+        raise RuntimeError("; ".join(errors) or "No endpoint answered")
+
+    # Function to describe every endpoint's statistics
+    def stats(self):
+        return [endpoint.stats() for endpoint in self.endpoints]
@@ -0,0 +1,90 @@
+import numpy as np
+
+from performance import build_employee_index, filter_rows, get_employee_summary, get_latest_rows
+from registry import acquire
+
+# Employee leaderboards. Rows are aggregated per employee before ranking, so
+# an employee appears once however many months they have. For every metric
+# (and optionally a single period) a ranking table with company rank,
+# department rank and percentile is computed once per dataset version and
+# kept in its own registry entry (sized and evicted like any other), ordered
+# best first; a leaderboard of any size is then a slice of it. Arbitrary subsets (e.g. the sidebar filters) use
+# partial selection (nlargest) over their per-employee aggregates instead.
+
+RANK_METRICS = ['productivity', 'completion_rate', 'quality_score', 'review_score', 'tasks_completed']
+LEADERBOARD_COLS = ['name', 'department', 'position']
+
+
+def _rank_table(summary, metric):
+    table = summary[[col for col in LEADERBOARD_COLS if col in summary.columns] + [metric]].dropna(subset=[metric])
+    values = table[metric]
+
+    table['rank'] = values.rank(ascending=False, method='min').astype(int)
+    table['percentile'] = values.rank(pct=True) * 100
+    if 'department' in table.columns:
+        table['department_rank'] = table.groupby('department')[metric].rank(ascending=False, method='min').astype(int)
+
+    # Best first, ties broken by name so leaderboards are stable across reruns
+    sort_cols = [metric] + (['name'] if 'name' in table.columns else [])
+    return table.sort_values(sort_cols, ascending=[False] + [True] * (len(sort_cols) - 1), kind='stable')
+
+
+def _build_ranking(processed, metric, period):
+    if period is None:
+        summary = processed['employee_index']
+    else:
+        rows, _ = filter_rows(processed, None, {'period': (period, period)})
+        summary = build_employee_index(get_latest_rows(rows), get_employee_summary(rows))
+
+    if summary is None or metric not in summary.columns:
+        return None
+
+    table = _rank_table(summary, metric)
+    department_positions = table.groupby('department', sort=False).indices if 'department' in table.columns else {}
+    return table, department_positions
+
+
+# Function to get the cached ranking of every employee by a metric
+def get_ranking(processed, metric, period=None):
+    """
+    Return (table, department_positions): employees ordered best first with their metric,
+    'rank', 'department_rank' and 'percentile', plus the positions of each department's
+    employees within the table. `period` (a period key) ranks that period only.
+    The result is shared through the registry, keyed by the processed state's key; states
+    without a dataset fingerprint are ranked on every call.
+    """
+    if processed['key'] is None or processed['key'][0] is None:
+        return _build_ranking(processed, metric, period)
+
+    lease, _ = acquire(('ranking',) + tuple(processed['key']) + (metric, period),
+                       lambda: (_build_ranking(processed, metric, period), None))
+    # Nothing holds the entry between reruns: it stays cached until the memory budget evicts it
+    ranking = lease.value
+    lease.release()
+    return ranking
+
+
+# Function to get the top `n` employees by a metric from the cached ranking
+def leaderboard(processed, metric, n, department=None, period=None):
+    ranking = get_ranking(processed, metric, period)
+    if ranking is None:
+        return None
+
+    table, department_positions = ranking
+    if department is None:
+        return table.iloc[:n]
+    return table.iloc[department_positions.get(department, np.empty(0, dtype=np.int64))[:n]]
+
+
+# Function to get the top `n` employees by a metric within a slice of performance rows
+def leaderboard_for_rows(performance_data, metric, n):
+    """
+    Aggregate the rows per employee (lifetime totals and averages within the slice),
+    then pick the best `n` with partial selection rather than a full sort.
+    """
+    summary = build_employee_index(get_latest_rows(performance_data), get_employee_summary(performance_data))
+    if summary is None or metric not in summary.columns:
+        return None
+
+    columns = [col for col in LEADERBOARD_COLS if col in summary.columns] + [metric]
+    return summary[columns].nlargest(n, metric)
@@ -0,0 +1,211 @@
+import os
+import threading
+import weakref
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Process-wide registry of loaded datasets and their processed artifacts,
+# shared by every session of the server. Entries are keyed by content
+# (dataset fingerprint plus whatever selection they depend on) and must be
+# treated as read-only by their users. Sessions hold a lease per entry; an
+# entry nobody leases stays cached until the memory budget is exceeded, then
+# the least recently used unleased entries are evicted first. Entries often
+# share frames (e.g. processed artifacts keep the loaded tables), so memory is
+# counted per distinct frame or array: a shared one counts once, and is only
+# freed when the last entry holding it is evicted.
+
+# Global memory budget for registry entries (in MB)
+MEMORY_BUDGET_MB = int(os.environ.get("PERFORMX_MEMORY_BUDGET_MB", "4096"))
+
+# Maximum number of entries built in the background at the same time
+BACKGROUND_WORKERS = 2
+
+_entries = OrderedDict()
+# id of every frame or array held by an entry -> [bytes, number of entries holding it, the object]
+_objects = {}
+_key_locks = {}
+_registry_lock = threading.Lock()
+# Keys of released leases not yet subtracted from their entries
+_pending_releases = deque()
+_background = ThreadPoolExecutor(max_workers=BACKGROUND_WORKERS, thread_name_prefix="registry-build")
+
+
+class Lease:
+    """
+    A session's reference to a registry entry. The reference is dropped when the lease
+    is released or garbage collected (e.g. with the session state that held it).
+    """
+
+    def __init__(self, key, value):
+        self.key = key
+        self.value = value
+        self._finalizer = weakref.finalize(self, _release, key)
+
+    # Function to give the entry back to the registry
+    def release(self):
+        self._finalizer()
+
+
+# Function to find the frames and arrays held by a value and their memory
+def object_sizes(value, sizes=None):
+    """Return {id: (object, bytes)} of every distinct frame, series, index or array in `value` and its containers."""
+    sizes = {} if sizes is None else sizes
+    if id(value) in sizes:
+        return sizes
+
+    if isinstance(value, pd.DataFrame):
+        sizes[id(value)] = (value, int(value.memory_usage(deep=True, index=True).sum()))
+    elif isinstance(value, (pd.Series, pd.Index)):
+        sizes[id(value)] = (value, int(value.memory_usage(deep=True)))
+    elif isinstance(value, np.ndarray):
+        sizes[id(value)] = (value, int(value.nbytes))
+    elif isinstance(value, dict):
+        for item in list(value) + list(value.values()):
+            object_sizes(item, sizes)
+    elif isinstance(value, (list, tuple, set)):
+        for item in value:
+            object_sizes(item, sizes)
+    return sizes
+
+
+# Function to estimate the memory held by a value (frames, arrays and containers of them)
+def estimate_nbytes(value):
+    return sum(nbytes for _, nbytes in object_sizes(value).values())
+
+
+def _add_objects(sizes):
+    # Called with the registry lock held
+    # The object is kept with its id, so the id cannot be reused while it is counted
+    for object_id, (value, nbytes) in sizes.items():
+        if object_id in _objects:
+            _objects[object_id][1] += 1
+        else:
+            _objects[object_id] = [nbytes, 1, value]
+
+
+def _remove_objects(sizes):
+    # Called with the registry lock held; returns the bytes no other entry holds any more
+    freed = 0
+    for object_id in sizes:
+        held = _objects[object_id]
+        held[1] -= 1
+        if held[1] == 0:
+            freed += held[0]
+            del _objects[object_id]
+    return freed
+
+
+def _total_nbytes():
+    # Called with the registry lock held
+    return sum(held[0] for held in _objects.values())
+
+
+def _release(key):
+    # Lease finalizers can run during garbage collection inside a registry operation on this
+    # thread, so releases are queued and only applied here when the lock is free
+    _pending_releases.append(key)
+    if _registry_lock.acquire(blocking=False):
+        try:
+            _evict()
+        finally:
+            _registry_lock.release()
+
+
+def _apply_releases():
+    # Called with the registry lock held
+    while _pending_releases:
+        entry = _entries.get(_pending_releases.popleft())
+        if entry is not None:
+            entry['leases'] -= 1
+
+
+def _evict():
+    # Called with the registry lock held
+    _apply_releases()
+    budget = MEMORY_BUDGET_MB * 1024 * 1024
+    total = _total_nbytes()
+
+    for key in list(_entries):
+        if total <= budget:
+            break
+        if _entries[key]['leases'] == 0:
+            total -= _remove_objects(_entries.pop(key)['objects'])
+
+
+def _lease(key):
+    # Called with the registry lock held
+    entry = _entries.get(key)
+    if entry is None:
+        return None
+    entry['leases'] += 1
+    _entries.move_to_end(key)
+    return Lease(key, entry['value'])
+
+
+# Function to lease a shared entry, building it once if no session has yet
+def acquire(key, loader=None):
+    """
+    Return (lease, error). When the entry is missing, `loader()` is called to build it
+    and must return (value, error); failures are not cached. Concurrent sessions asking
+    for the same missing key wait for a single build instead of loading their own copy.
+    Without a loader a missing entry returns (None, None).
+    """
+    with _registry_lock:
+        lease = _lease(key)
+        if lease is not None or loader is None:
+            return lease, None
+        key_lock = _key_locks.setdefault(key, threading.Lock())
+
+    with key_lock:
+        # Another session may have built it while we waited
+        with _registry_lock:
+            lease = _lease(key)
+        if lease is not None:
+            return lease, None
+
+        value, error = loader()
+        if error:
+            return None, error
+
+        sizes = object_sizes(value)
+        with _registry_lock:
+            _entries[key] = {'value': value, 'objects': sizes, 'leases': 0}
+            _add_objects(sizes)
+            lease = _lease(key)
+            _key_locks.pop(key, None)
+            _evict()
+
+    return lease, None
+
+
+# Function to lease a shared entry from a background thread
+def acquire_in_background(key, loader):
+    """
+    Return a Future of acquire(key, loader), so a session can render something else while
+    the entry is built. Dropping the future's lease (or the future) releases the entry.
+    """
+    return _background.submit(acquire, key, loader)
+
+
+# Function to describe the registry contents (for display and monitoring)
+def registry_stats():
+    with _registry_lock:
+        _apply_releases()
+        return {
+            'entries': len(_entries),
+            'leased': sum(1 for entry in _entries.values() if entry['leases']),
+            'leases': sum(entry['leases'] for entry in _entries.values()),
+            'bytes': _total_nbytes(),
+            'budget_bytes': MEMORY_BUDGET_MB * 1024 * 1024
+        }
+
+
+# Function to drop every unleased entry
+def clear_registry():
+    with _registry_lock:
+        _apply_releases()
+        for key in [key for key, entry in _entries.items() if entry['leases'] == 0]:
+            _remove_objects(_entries.pop(key)['objects'])
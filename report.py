@@ -0,0 +1,333 @@
+"""
+Headless batch reporting for PerformX.
+
+Computes all aggregates once, generates AI insights concurrently and writes one
+report per department and per manager (plus a company report) without Streamlit.
+
+Usage:
+    python report.py performx_test_data.db --output-dir reports --workers 4
+    python report.py units/*.db --formats md,json --no-ai
+    python report.py performx_test_data.db --engine duckdb --no-ai
+"""
+import argparse
+import hashlib
+import html
+import json
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import insights
+from engines import ENGINE, ENGINES, get_engine
+from ingest import load_data_cached, load_databases, load_tables_out_of_core
+from performance import build_processed_state, filter_by_department
+
+DEFAULT_OUTPUT_DIR = "reports"
+DEFAULT_CACHE_DIR = ".performx_insight_cache"
+DEFAULT_WORKERS = 4
+REPORT_FORMATS = ["md", "html", "json"]
+
+# Columns shown in the employee tables of each report
+EMPLOYEE_TABLE_COLS = ['name', 'position', 'tasks_assigned', 'tasks_completed', 'completion_rate',
+                       'productivity', 'quality_score', 'review_score']
+
+_cache_lock = threading.Lock()
+
+
+# Function to turn a name into a file name
+def slugify(name):
+    return re.sub(r'[^a-z0-9]+', '-', str(name).lower()).strip('-') or 'unnamed'
+
+
+# Function to get an AI insight, reusing a cached response for the same endpoints and prompt
+def cached_insight(prompt, cache_dir, stats):
+    # Any configured endpoint may answer, so responses are only shared between runs routed over the same ones
+    endpoints = [f"{endpoint.url} {endpoint.model}" for endpoint in insights.get_router().endpoints]
+    prompt_hash = hashlib.sha256("\n".join(endpoints + [prompt]).encode()).hexdigest()
+    cache_path = os.path.join(cache_dir, f"{prompt_hash}.json")
+
+    try:
+        with open(cache_path) as f:
+            response = json.load(f)['response']
+        with _cache_lock:
+            stats['insights_cached'] += 1
+        return response
+    except (OSError, ValueError, KeyError):
+        # Not cached yet (or a damaged entry from an older version): ask again
+        pass
+
+    response = insights.query_groq_api(prompt)
+
+    # Failed requests are not cached so the next run retries them. The entry is written to a temporary
+    # file and renamed, so an interrupted or concurrent run never leaves a partial file behind
+    if not response.startswith("Error querying AI"):
+        tmp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({'endpoints': endpoints, 'response': response}, f)
+        os.replace(tmp_path, cache_path)
+
+    with _cache_lock:
+        stats['insights_generated'] += 1
+    return response
+
+
+# Function to summarize the metrics of a slice of performance data
+def summarize_metrics(data):
+    tasks_assigned = data['tasks_assigned'].sum()
+    tasks_completed = data['tasks_completed'].sum()
+
+    return {
+        'employees': int(data['employee_id'].nunique()),
+        'tasks_assigned': int(tasks_assigned),
+        'tasks_completed': int(tasks_completed),
+        'completion_rate': float(tasks_completed / tasks_assigned) if tasks_assigned else 0.0,
+        'productivity': float(tasks_completed / data['working_hours'].sum()) if data['working_hours'].sum() else 0.0,
+        'average_working_hours': float(data['working_hours'].mean()),
+        'average_quality_score': float(data['quality_score'].mean()),
+        'average_review_score': float(data['review_score'].mean())
+    }
+
+
+# Function to build the per-employee table for a set of employee IDs
+def employee_table(employee_rows, employee_summary, employee_ids):
+    table = employee_rows[employee_rows['employee_id'].isin(employee_ids)]
+    table = table.join(employee_summary, on='employee_id', how='inner')
+    return table[[col for col in EMPLOYEE_TABLE_COLS if col in table.columns]].sort_values('name')
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return f"{value:.2f}"
+    return str(value)
+
+
+# Function to render a report as Markdown
+def render_markdown(report):
+    lines = [f"# {report['title']}", "", f"_Generated {report['generated_at']}_", "", "## Key Metrics", ""]
+    lines += [f"- **{key.replace('_', ' ').title()}:** {_format_value(value)}" for key, value in report['metrics'].items()]
+
+    if report['insight']:
+        lines += ["", "## AI Insights", "", report['insight'].strip()]
+
+    table = report['table']
+    if not table.empty:
+        lines += ["", f"## {report['table_title']}", ""]
+        lines.append("| " + " | ".join(col.replace('_', ' ').title() for col in table.columns) + " |")
+        lines.append("|" + "---|" * len(table.columns))
+        for row in table.itertuples(index=False):
+            lines.append("| " + " | ".join(_format_value(value) for value in row) + " |")
+
+    return "\n".join(lines) + "\n"
+
+
+# Function to render a report as HTML
+def render_html(report):
+    metrics = "".join(
+        f"<li><strong>{html.escape(key.replace('_', ' ').title())}:</strong> {html.escape(_format_value(value))}</li>"
+        for key, value in report['metrics'].items()
+    )
+    parts = [
+        "<!DOCTYPE html>",
+        f"<html><head><meta charset='utf-8'><title>{html.escape(report['title'])}</title></head><body>",
+        f"<h1>{html.escape(report['title'])}</h1>",
+        f"<p><em>Generated {html.escape(report['generated_at'])}</em></p>",
+        f"<h2>Key Metrics</h2><ul>{metrics}</ul>"
+    ]
+
+    if report['insight']:
+        parts.append(f"<h2>AI Insights</h2><div style='white-space: pre-wrap'>{html.escape(report['insight'].strip())}</div>")
+
+    if not report['table'].empty:
+        parts.append(f"<h2>{html.escape(report['table_title'])}</h2>")
+        parts.append(report['table'].to_html(index=False, float_format=lambda value: f"{value:.2f}"))
+
+    parts.append("</body></html>")
+    return "\n".join(parts)
+
+
+# Function to render a report as JSON
+def render_json(report):
+    return json.dumps({
+        'title': report['title'],
+        'generated_at': report['generated_at'],
+        'metrics': report['metrics'],
+        'insight': report['insight'],
+        slugify(report['table_title']): json.loads(report['table'].to_json(orient='records'))
+    }, indent=2)
+
+
+RENDERERS = {'md': render_markdown, 'html': render_html, 'json': render_json}
+
+
+# Function to write a report in every requested format
+def write_report(report, output_dir, formats):
+    os.makedirs(output_dir, exist_ok=True)
+    for fmt in formats:
+        with open(os.path.join(output_dir, f"{report['slug']}.{fmt}"), "w", encoding="utf-8") as f:
+            f.write(RENDERERS[fmt](report))
+    return len(formats)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate PerformX department and manager reports.")
+    parser.add_argument("databases", nargs="+", help="SQLite database files (several are loaded in parallel and combined)")
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR, help="Directory the reports are written to")
+    parser.add_argument("--formats", default=",".join(REPORT_FORMATS),
+                        help="Comma-separated report formats (md, html, json)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="Maximum number of concurrent AI insight requests")
+    parser.add_argument("--no-ai", action="store_true", help="Skip AI insights")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Directory for cached AI insights")
+    parser.add_argument("--engine", default=ENGINE, choices=list(ENGINES),
+                        help="Analytics engine; duckdb reads a single database straight from SQLite (default: PERFORMX_ENGINE or pandas)")
+    parser.add_argument("--api-key", default=os.environ.get("GROQ_API_KEY", ""),
+                        help="Groq API key (defaults to the GROQ_API_KEY environment variable)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    formats = [fmt.strip() for fmt in args.formats.split(",") if fmt.strip()]
+    unknown_formats = [fmt for fmt in formats if fmt not in RENDERERS]
+    if unknown_formats:
+        print(f"Unknown report formats: {', '.join(unknown_formats)}", file=sys.stderr)
+        return 2
+
+    try:
+        engine = get_engine(args.engine)
+    except ValueError as e:
+        print(str(e), file=sys.stderr)
+        return 2
+
+    timings = {}
+    stats = {'insights_generated': 0, 'insights_cached': 0, 'reports': 0, 'files': 0}
+    started = time.perf_counter()
+
+    # Load the databases; an engine that merges straight from SQLite leaves the performance table on disk
+    merge_from_sqlite = len(args.databases) == 1 and hasattr(engine, 'analyze_sqlite')
+    if merge_from_sqlite:
+        data_dict, error = load_tables_out_of_core(args.databases[0], ['performance_metrics'])
+    elif len(args.databases) == 1:
+        data_dict, error = load_data_cached(args.databases[0])
+    else:
+        data_dict, error = load_databases(args.databases)
+
+    if error:
+        print(f"Error loading database: {error}", file=sys.stderr)
+        return 1
+
+    if 'employees' not in data_dict or 'performance_metrics' not in data_dict:
+        print("The database must contain 'employees' and 'performance_metrics' tables.", file=sys.stderr)
+        return 1
+
+    timings['load'] = time.perf_counter() - started
+
+    # Compute every aggregate once
+    step_started = time.perf_counter()
+    performance_data = engine.analyze_sqlite(args.databases[0]) if merge_from_sqlite else None
+    processed = build_processed_state(data_dict['employees'], data_dict['performance_metrics'], engine=engine,
+                                      performance_data=performance_data)
+    performance_data = processed['performance_data']
+    employee_summary = processed['employee_summary']
+    employee_rows = processed['employee_data'].drop_duplicates('employee_id')
+    departments = sorted(performance_data['department'].dropna().unique().tolist())
+    department_data = {department: filter_by_department(processed, department) for department in departments}
+
+    managers = []
+    if 'manager_id' in employee_rows.columns:
+        manager_ids = set(employee_rows['manager_id'].dropna().astype(int))
+        managers = employee_rows[employee_rows['employee_id'].isin(manager_ids)].sort_values('name')
+        managers = list(managers[['employee_id', 'name']].itertuples(index=False))
+
+    teams = {}
+    for manager_id, manager_name in managers:
+        team_ids = employee_rows.loc[employee_rows['manager_id'] == manager_id, 'employee_id']
+        team_data = performance_data[performance_data['employee_id'].isin(team_ids)]
+        if not team_data.empty:
+            teams[manager_id] = (manager_name, team_ids, team_data)
+    timings['aggregate'] = time.perf_counter() - step_started
+
+    # Generate insights concurrently with bounded parallelism
+    step_started = time.perf_counter()
+    insight_texts = {}
+    if not args.no_ai:
+        insights.set_api_key(args.api_key)
+        os.makedirs(args.cache_dir, exist_ok=True)
+
+        prompts = {'company': insights.build_insight_prompt(performance_data, engine=engine)}
+        for department, data in department_data.items():
+            prompts[('department', department)] = insights.build_insight_prompt(data, department=department, engine=engine)
+        for manager_id, (manager_name, _, team_data) in teams.items():
+            prompts[('manager', manager_id)] = insights.build_insight_prompt(team_data, engine=engine,
+                                                                             manager_name=manager_name)
+
+        with ThreadPoolExecutor(max_workers=max(1, args.workers)) as executor:
+            futures = {
+                key: executor.submit(cached_insight, prompt, args.cache_dir, stats)
+                for key, (prompt, _) in prompts.items() if prompt is not None
+            }
+            for key, (prompt, message) in prompts.items():
+                insight_texts[key] = futures[key].result() if prompt is not None else message
+    timings['insights'] = time.perf_counter() - step_started
+
+    # Write the reports
+    step_started = time.perf_counter()
+    generated_at = time.strftime("%Y-%m-%d %H:%M:%S")
+
+    company_report = {
+        'title': "Company Performance Report",
+        'slug': "company",
+        'generated_at': generated_at,
+        'metrics': summarize_metrics(performance_data),
+        'insight': insight_texts.get('company'),
+        'table_title': "Departments",
+        'table': processed['dept_performance']
+    }
+    stats['files'] += write_report(company_report, args.output_dir, formats)
+    stats['reports'] += 1
+
+    for department, data in department_data.items():
+        report = {
+            'title': f"{department} Department Report",
+            'slug': slugify(department),
+            'generated_at': generated_at,
+            'metrics': summarize_metrics(data),
+            'insight': insight_texts.get(('department', department)),
+            'table_title': "Employees",
+            'table': employee_table(employee_rows, employee_summary, data['employee_id'].unique())
+        }
+        stats['files'] += write_report(report, os.path.join(args.output_dir, "departments"), formats)
+        stats['reports'] += 1
+
+    for manager_id, (manager_name, team_ids, team_data) in teams.items():
+        report = {
+            'title': f"Team Report: {manager_name}",
+            'slug': f"{manager_id}-{slugify(manager_name)}",
+            'generated_at': generated_at,
+            'metrics': summarize_metrics(team_data),
+            'insight': insight_texts.get(('manager', manager_id)),
+            'table_title': "Direct Reports",
+            'table': employee_table(employee_rows, employee_summary, team_ids)
+        }
+        stats['files'] += write_report(report, os.path.join(args.output_dir, "managers"), formats)
+        stats['reports'] += 1
+    timings['write'] = time.perf_counter() - step_started
+
+    # Throughput summary
+    elapsed = time.perf_counter() - started
+    insight_count = stats['insights_generated'] + stats['insights_cached']
+    print(f"Wrote {stats['reports']} reports ({stats['files']} files) to {args.output_dir}")
+    print(f"- {len(performance_data)} performance records, {len(departments)} departments, {len(managers)} managers")
+    print(f"- AI insights: {stats['insights_generated']} generated, {stats['insights_cached']} cached")
+    for step, seconds in timings.items():
+        print(f"- {step}: {seconds:.2f}s")
+    print(f"- total: {elapsed:.2f}s ({stats['reports'] / elapsed:.1f} reports/s"
+          + (f", {insight_count / timings['insights']:.1f} insights/s)" if insight_count and timings['insights'] else ")"))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+import numpy as np
+import pandas as pd
+
+from ingest import MONTH_ORDER
+
+# Row index over the merged performance frame, built once per dataset.
+# Categorical columns map each value to the sorted row positions holding it
+# (posting lists); date-like columns keep their values sorted alongside the
+# matching row positions so range predicates are two binary searches.
+# Filters resolve by union within a column and intersection across columns,
+# touching only the matching positions instead of scanning every row.
+
+# Columns indexed by value
+VALUE_COLUMNS = ['department', 'position', 'employee_id', 'name', 'source']
+
+
+# Function to compute a sortable period key (year * 100 + month number)
+def period_keys(data):
+    # Map the few distinct month names rather than every row (missing months become 0)
+    codes, months = pd.factorize(data['month'])
+    month_numbers = np.array([MONTH_ORDER.index(month) + 1 if month in MONTH_ORDER else 0 for month in months] + [0])
+    return pd.to_numeric(data['year'], errors='coerce') * 100 + pd.Series(month_numbers[codes], index=data.index)
+
+
+def _range_values(data, column):
+    if column == 'period':
+        if 'year' not in data.columns or 'month' not in data.columns:
+            return None
+        return period_keys(data).to_numpy(dtype=float)
+
+    if column == 'join_date':
+        if 'join_date' not in data.columns:
+            return None
+        dates = pd.to_datetime(data['join_date'], errors='coerce')
+        return dates.to_numpy(dtype='datetime64[ns]').astype('int64').astype(float)
+
+    return None
+
+
+def _build_range(values, offset=0):
+    values = np.where(values == np.iinfo('int64').min, np.nan, values)
+    valid = np.flatnonzero(~np.isnan(values))
+    order = valid[np.argsort(values[valid], kind='stable')]
+    return values[order], order + offset
+
+
+# Function to build the row index of the merged performance data
+def build_row_index(performance_data):
+    row_index = {'size': len(performance_data), 'values': {}, 'ranges': {}}
+
+    for column in VALUE_COLUMNS:
+        if column in performance_data.columns:
+            groups = performance_data.groupby(column, sort=False).indices
+            row_index['values'][column] = {key: positions.astype(np.int64) for key, positions in groups.items()}
+
+    for column in ['period', 'join_date']:
+        values = _range_values(performance_data, column)
+        if values is not None:
+            row_index['ranges'][column] = _build_range(values)
+
+    return row_index
+
+
+# Function to add rows appended at `offset` to an existing row index
+def extend_row_index(row_index, new_rows, offset):
+    extended = {'size': row_index['size'] + len(new_rows), 'values': {}, 'ranges': {}}
+
+    for column, postings in row_index['values'].items():
+        postings = dict(postings)
+        if column in new_rows.columns:
+            for key, positions in new_rows.groupby(column, sort=False).indices.items():
+                new_positions = positions.astype(np.int64) + offset
+                postings[key] = np.concatenate([postings[key], new_positions]) if key in postings else new_positions
+        extended['values'][column] = postings
+
+    for column, (sorted_values, order) in row_index['ranges'].items():
+        new_values = _range_values(new_rows, column)
+        if new_values is None:
+            extended['ranges'][column] = (sorted_values, order)
+            continue
+
+        # Merge the new sorted run into the existing one
+        new_sorted, new_order = _build_range(new_values, offset)
+        insert_at = np.searchsorted(sorted_values, new_sorted, side='right')
+        extended['ranges'][column] = (
+            np.insert(sorted_values, insert_at, new_sorted),
+            np.insert(order, insert_at, new_order)
+        )
+
+    return extended
+
+
+# Function to get the row positions holding any of `values` in `column`
+def lookup(row_index, column, values):
+    postings = row_index['values'][column]
+    matches = [postings[value] for value in values if value in postings]
+
+    if not matches:
+        return np.empty(0, dtype=np.int64)
+    if len(matches) == 1:
+        return matches[0]
+    return np.sort(np.concatenate(matches))
+
+
+# Function to get the row positions whose `column` value lies in [low, high]
+def range_lookup(row_index, column, low=None, high=None):
+    sorted_values, order = row_index['ranges'][column]
+    start = 0 if low is None else np.searchsorted(sorted_values, low, side='left')
+    end = len(sorted_values) if high is None else np.searchsorted(sorted_values, high, side='right')
+    return np.sort(order[start:end])
+
+
+# Function to resolve combined filters to row positions
+def select_rows(row_index, value_filters=None, range_filters=None):
+    """
+    `value_filters` maps a column to the accepted values, `range_filters` maps
+    'period' or 'join_date' to an inclusive (low, high) pair (None for open ends).
+    Empty filters are ignored. Returns sorted row positions, or None when nothing is filtered.
+    """
+    candidates = []
+
+    for column, values in (value_filters or {}).items():
+        if values and column in row_index['values']:
+            candidates.append(lookup(row_index, column, values))
+
+    for column, (low, high) in (range_filters or {}).items():
+        if (low is not None or high is not None) and column in row_index['ranges']:
+            candidates.append(range_lookup(row_index, column, low, high))
+
+    if not candidates:
+        return None
+
+    # Intersect the smallest sets first so every step stays as small as possible
+    candidates.sort(key=len)
+    positions = candidates[0]
+    for other in candidates[1:]:
+        if positions.size == 0:
+            break
+        positions = np.intersect1d(positions, other, assume_unique=True)
+
+    return positions
+
+
+# Function to convert a date to the value stored in the join_date range index
+def date_key(value):
+    return float(pd.Timestamp(value).value)
+
+
+# Function to format a period key as "Month Year"
+def period_label(key):
+    year, month = divmod(int(key), 100)
+    return f"{MONTH_ORDER[month - 1]} {year}" if month else str(year)
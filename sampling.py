@@ -0,0 +1,226 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from ingest import connect_readonly
+from performance import analyze_performance
+from row_index import build_row_index
+
+# Approximate aggregates from a stratified sample, shown while the exact
+# aggregation of a large dataset runs in the background. Employees are sampled
+# within each department (all of their performance rows come along, so an
+# employee is one sampling unit) and every estimate is a stratified total or
+# ratio with a normal-approximation confidence interval. Filters are applied
+# to the sampled rows; sampled employees without matching rows count as zeros,
+# which keeps the estimators valid for any subset of rows. For a database file
+# the sample is drawn in SQL (only the sampled employees' performance rows are
+# read), so the estimates can be shown while the full tables are still loading.
+
+# Performance tables with at least this many rows are loaded progressively
+PROGRESSIVE_MIN_ROWS = 500_000
+
+# Seconds to wait for the exact aggregates before showing the sample estimates instead
+FIRST_PAINT_SECONDS = 0.3
+
+# Seconds between checks whether the exact aggregates are ready
+REFINE_POLL_SECONDS = 1.0
+
+# Employees sampled per department
+SAMPLE_PER_DEPARTMENT = 2000
+
+# z value of the reported confidence intervals (95%)
+CONFIDENCE_Z = 1.96
+
+SAMPLE_SEED = 42
+
+# Per-employee sums of the sampled rows: (name, column, non-null count of the column instead of its sum)
+UNIT_COLUMNS = [
+    ('rows', None, True),
+    ('tasks_completed', 'tasks_completed', False),
+    ('tasks_assigned', 'tasks_assigned', False),
+    ('working_hours', 'working_hours', False),
+    ('quality_score', 'quality_score', False),
+    ('quality_score_count', 'quality_score', True),
+    ('review_score', 'review_score', False),
+    ('review_score_count', 'review_score', True),
+]
+
+
+def _pick_employees(employee_data, per_stratum, seed):
+    # Positions of the sampled employees, every employee's stratum, and the headcount and sample size per stratum
+    if 'department' in employee_data.columns:
+        strata, _ = pd.factorize(employee_data['department'], use_na_sentinel=False)
+    else:
+        strata = np.zeros(len(employee_data), dtype=np.int64)
+
+    # Random order within each department, then the first `per_stratum` employees of each
+    rng = np.random.default_rng(seed)
+    order = np.lexsort((rng.random(len(strata)), strata))
+    sorted_strata = strata[order]
+    starts = np.searchsorted(sorted_strata, sorted_strata, side='left')
+    picked = np.sort(order[np.arange(len(order)) - starts < per_stratum])
+
+    population = np.bincount(strata)
+    sampled = np.bincount(strata[picked], minlength=len(population))
+    return picked, strata, population, sampled
+
+
+def _sample_state(employee_data, metrics, picked, strata, population, sampled):
+    employees = employee_data.iloc[picked]
+    keys = ['employee_id', 'source'] if 'source' in employee_data.columns and 'source' in metrics.columns else ['employee_id']
+    performance_data = analyze_performance(employees, metrics).reset_index(drop=True)
+
+    units = employees[keys].reset_index(drop=True)
+    units['stratum'] = strata[picked]
+    units['population'] = population[strata[picked]]
+    units['sampled'] = sampled[strata[picked]]
+    if 'department' in employees.columns:
+        units['department'] = employees['department'].to_numpy()
+
+    return {
+        'keys': keys,
+        'performance_data': performance_data,
+        'row_index': build_row_index(performance_data),
+        'units': units,
+        'population': int(population.sum()),
+        'sampled': int(sampled.sum())
+    }
+
+
+# Function to draw a stratified sample of employees with all of their performance rows
+def stratified_sample(employee_data, metrics_data, per_stratum=SAMPLE_PER_DEPARTMENT, seed=SAMPLE_SEED):
+    """
+    Return the sampled rows merged like analyze_performance, their row index (for filter_rows),
+    and the sampled employees with their department, its headcount and its sample size.
+    """
+    picked, strata, population, sampled = _pick_employees(employee_data, per_stratum, seed)
+    sampled_ids = employee_data['employee_id'].iloc[picked].unique()
+    metrics = metrics_data[metrics_data['employee_id'].isin(sampled_ids)]
+    return _sample_state(employee_data, metrics, picked, strata, population, sampled)
+
+
+# Function to draw the stratified sample straight from a database file
+def stratified_sample_sqlite(db_file, employee_table='employees', performance_table='performance_metrics',
+                             per_stratum=SAMPLE_PER_DEPARTMENT, seed=SAMPLE_SEED, immutable=False):
+    """
+    Same sample as stratified_sample on the tables as loaded by ingest.load_data, reading the
+    employee table and only the sampled employees' performance rows. See connect_readonly for
+    `immutable`.
+    """
+    conn = connect_readonly(db_file, immutable)
+    try:
+        employee_data = pd.read_sql_query(f'SELECT * FROM "{employee_table}"', conn)
+        picked, strata, population, sampled = _pick_employees(employee_data, per_stratum, seed)
+
+        sampled_ids = [value.item() if isinstance(value, np.generic) else value
+                       for value in employee_data['employee_id'].iloc[picked].unique()]
+        # One pass over the table, matching the IDs through SQLite's index of the IN list
+        metrics = pd.read_sql_query(
+            f'SELECT * FROM "{performance_table}" WHERE employee_id IN (SELECT value FROM json_each(?)) ORDER BY rowid',
+            conn, params=[json.dumps(sampled_ids)]
+        )
+    finally:
+        conn.close()
+
+    return _sample_state(employee_data, metrics, picked, strata, population, sampled)
+
+
+# Function to sum the given sampled rows per sampled employee
+def unit_totals(sample, rows):
+    """
+    One row per sampled employee (zeros for those without rows among `rows`), with the
+    UNIT_COLUMNS sums that the estimators are computed from.
+    """
+    keys = sample['keys']
+    grouped = rows.groupby(keys)
+    totals = {}
+    for name, column, count in UNIT_COLUMNS:
+        if column is None:
+            totals[name] = grouped.size()
+        elif column in rows.columns:
+            totals[name] = grouped[column].count() if count else grouped[column].sum()
+
+    totals = pd.DataFrame(totals)
+    units = sample['units'].set_index(keys)
+    return units.join(totals).fillna({name: 0 for name in totals.columns}).reset_index()
+
+
+def _stratified_variance(values, units):
+    # Variance of a stratified estimate of the total of `values`, with finite population correction
+    grouped = values.groupby(units['stratum'])
+    variances = grouped.var(ddof=1).fillna(0)
+    population = units.groupby('stratum')['population'].first()
+    sampled = grouped.size()
+    return float((population ** 2 * (1 - sampled / population) * variances / sampled).sum())
+
+
+# Function to estimate a population total from per-employee sums
+def estimate_total(units, column):
+    """Return (estimate, half-width of the confidence interval)."""
+    weights = units['population'] / units['sampled']
+    estimate = float((units[column] * weights).sum())
+    return estimate, float(CONFIDENCE_Z * np.sqrt(_stratified_variance(units[column], units)))
+
+
+# Function to estimate a ratio of population totals (e.g. tasks completed per task assigned)
+def estimate_ratio(units, numerator, denominator):
+    """Return (estimate, half-width of the confidence interval), or None when the denominator is zero."""
+    weights = units['population'] / units['sampled']
+    denominator_total = float((units[denominator] * weights).sum())
+    if denominator_total == 0:
+        return None
+
+    ratio = float((units[numerator] * weights).sum()) / denominator_total
+    residuals = units[numerator] - ratio * units[denominator]
+    return ratio, float(CONFIDENCE_Z * np.sqrt(_stratified_variance(residuals, units))) / denominator_total
+
+
+# Function to estimate the Overview KPIs of the filtered rows
+def approximate_kpis(units):
+    """Same keys as dashboards.overview_kpis, each an (estimate, half-width) pair or None."""
+    kpis = {'employees': estimate_total(units, 'rows'), 'completion_rate': None, 'quality_score': None, 'review_score': None}
+
+    if 'tasks_assigned' in units.columns:
+        completion = estimate_ratio(units, 'tasks_completed', 'tasks_assigned')
+        kpis['completion_rate'] = (completion[0] * 100, completion[1] * 100) if completion is not None else None
+    for col in ['quality_score', 'review_score']:
+        if f'{col}_count' in units.columns:
+            kpis[col] = estimate_ratio(units, col, f'{col}_count')
+
+    return kpis
+
+
+# Function to estimate the department completion rates and productivity
+def approximate_department_performance(units):
+    """
+    One row per department with dept_completion_rate and dept_productivity (as in
+    get_department_performance), each with a `_ci` half-width column.
+    """
+    if 'department' not in units.columns or 'tasks_assigned' not in units.columns:
+        return None
+
+    records = []
+    for department, department_units in units.groupby('department', sort=True):
+        completion = estimate_ratio(department_units, 'tasks_completed', 'tasks_assigned')
+        if completion is None:
+            continue
+        productivity = estimate_ratio(department_units, 'tasks_completed', 'working_hours') \
+            if 'working_hours' in department_units.columns else None
+        records.append({
+            'department': department,
+            'dept_completion_rate': completion[0],
+            'dept_completion_rate_ci': completion[1],
+            'dept_productivity': productivity[0] if productivity is not None else np.nan,
+            'dept_productivity_ci': productivity[1] if productivity is not None else np.nan
+        })
+
+    return pd.DataFrame(records, columns=['department', 'dept_completion_rate', 'dept_completion_rate_ci',
+                                          'dept_productivity', 'dept_productivity_ci'])
+
+
+# Function to get the weight of every sampled row (the employees it stands for)
+def row_weights(sample, rows):
+    units = sample['units'].set_index(sample['keys'])
+    weights = units['population'] / units['sampled']
+    return rows.set_index(sample['keys']).index.map(weights).to_numpy(dtype=float)
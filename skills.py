@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+
+# Inverted indexes over the employee_skills and training_records tables.
+# Every skill (or training) maps to the employees holding it, sorted by
+# employee ID, with their rating (or score) and, for trainings, their latest
+# completion date alongside, so a "rating >= r" or "completed since d" clause
+# is one vectorized comparison over that skill's postings. Queries AND
+# their clauses by intersecting the sorted posting lists, smallest first, and
+# rank the matches against the per-employee performance summary.
+
+SKILLS_TABLE = 'employee_skills'
+TRAINING_TABLE = 'training_records'
+
+# Columns the matches can be ranked by (see performance.build_employee_index)
+RANK_COLUMNS = ['productivity', 'completion_rate', 'quality_score', 'review_score', 'tasks_completed']
+
+
+def _build_postings(data, key, value, date=None):
+    # Keep the best value per employee (e.g. retaken trainings), ordered by employee ID,
+    # with the employee's latest date as a row_index.date_key value (NaN when unknown)
+    data = data[['employee_id', key, value] + ([date] if date else [])].dropna(subset=['employee_id', key])
+    if date:
+        dates = pd.to_datetime(data[date], errors='coerce')
+        data = data.assign(**{date: np.where(dates.isna(), np.nan, dates.to_numpy(dtype='datetime64[ns]').astype('int64'))})
+        data[date] = data.groupby([key, 'employee_id'])[date].transform('max')
+    data = data.sort_values([key, 'employee_id', value], ascending=[True, True, False], kind='stable')
+    data = data.drop_duplicates([key, 'employee_id'])
+
+    postings = {}
+    for name, positions in data.groupby(key, sort=True).indices.items():
+        postings[name] = (
+            data['employee_id'].to_numpy()[positions],
+            data[value].to_numpy(dtype=float)[positions],
+            data[date].to_numpy(dtype=float)[positions] if date else None
+        )
+    return postings
+
+
+# Function to build the skill -> (employee_id, rating) inverted index
+def build_skill_index(skills_data):
+    if not {'employee_id', 'skill', 'rating'}.issubset(skills_data.columns):
+        return None
+    return _build_postings(skills_data, 'skill', 'rating')
+
+
+# Function to build the training -> (employee_id, score, completion date) inverted index
+def build_training_index(training_data):
+    if not {'employee_id', 'training_name', 'score'}.issubset(training_data.columns):
+        return None
+    date = 'completion_date' if 'completion_date' in training_data.columns else None
+    return _build_postings(training_data, 'training_name', 'score', date)
+
+
+# Function to get the employees holding `name` with a value of at least `minimum`
+def postings_lookup(index, name, minimum=None, since=None):
+    """
+    Return (employee_ids, values, dates) sorted by employee ID; dates are None for postings
+    without them. `since` (a row_index.date_key value) keeps only employees whose latest date
+    is on or after it. Unknown names match nobody.
+    """
+    if name not in index:
+        return np.empty(0, dtype=np.int64), np.empty(0), np.empty(0)
+
+    employee_ids, values, dates = index[name]
+    keep = np.ones(len(employee_ids), dtype=bool)
+    if minimum is not None:
+        keep &= values >= minimum
+    if since is not None and dates is not None:
+        keep &= dates >= since
+
+    return employee_ids[keep], values[keep], dates[keep] if dates is not None else None
+
+
+# Function to intersect two sorted arrays of unique IDs
+def intersect_sorted(small, large):
+    """
+    Binary-search each element of the smaller array in the larger one:
+    O(len(small) * log(len(large))) instead of sorting both arrays together.
+    """
+    if len(small) > len(large):
+        small, large = large, small
+    if len(small) == 0:
+        return small
+
+    found = np.searchsorted(large, small)
+    found[found == len(large)] = 0
+    return small[large[found] == small]
+
+
+# Function to find the employees matching every skill and training clause
+def match_employees(skill_index, training_index, skill_filters=None, training_filters=None, employee_ids=None,
+                    completed_since=None):
+    """
+    `skill_filters` maps a skill to its minimum rating and `training_filters` maps a training
+    to its minimum score (None for any completion); `completed_since` (a row_index.date_key
+    value) requires the trainings to have been completed on or after that date. `employee_ids`,
+    when given, restricts the matches (e.g. to the sidebar filters). Returns a frame indexed by
+    employee_id with one column per clause holding the employee's rating or score, plus the
+    latest completion date of each training, or None when there is no clause.
+    """
+    clauses = []
+    for name, minimum in (skill_filters or {}).items():
+        clauses.append((name, "rating", *postings_lookup(skill_index or {}, name, minimum)))
+    for name, minimum in (training_filters or {}).items():
+        clauses.append((name, "score", *postings_lookup(training_index or {}, name, minimum, completed_since)))
+
+    if not clauses:
+        return None
+
+    # Intersect the smallest posting lists first
+    matched = np.unique(employee_ids) if employee_ids is not None else None
+    for clause in sorted(clauses, key=lambda clause: len(clause[2])):
+        matched = clause[2] if matched is None else intersect_sorted(matched, clause[2])
+        if matched.size == 0:
+            break
+
+    matches = pd.DataFrame(index=pd.Index(matched, name='employee_id'))
+    for name, kind, clause_ids, values, dates in clauses:
+        found = np.searchsorted(clause_ids, matched)
+        matches[f"{name} {kind}"] = values[found] if matched.size else []
+        if dates is not None:
+            matches[f"{name} completed"] = pd.to_datetime(dates[found] if matched.size else [], unit='ns')
+
+    return matches
+
+
+# Function to rank matched employees by a performance column
+def rank_matches(matches, employee_index, by='productivity', top_n=None):
+    """
+    Join the matches to the per-employee summary and return them ordered by `by`, best first.
+    Employees without performance data are dropped.
+    """
+    ranked = employee_index.reindex(matches.index).dropna(subset=[by]).join(matches)
+    if top_n is not None:
+        return ranked.nlargest(top_n, by)
+    return ranked.sort_values(by, ascending=False)
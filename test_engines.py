@@ -0,0 +1,144 @@
+"""
+Parity tests of the analytics engines: every installed engine must give the
+same results as pandas on generated data (see bench_engines.py for the same
+checks at larger scales with timings). Engines whose library is not installed
+are skipped.
+
+Usage:
+    python -m pytest -q test_engines.py
+"""
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bench_engines import build_operations, compare, write_sqlite
+from demo import build_demo_data
+from engines import ENGINES, get_engine
+from ingest import load_data
+from performance import build_processed_state, filter_by_department, filter_rows
+from row_index import build_row_index, select_rows
+
+# Employees in the generated dataset (six months of metrics each)
+SCALE = 300
+
+
+@pytest.fixture(scope="module")
+def tables():
+    return build_demo_data(SCALE, today='2025-06-30')
+
+
+@pytest.fixture(scope="module")
+def rows(tables):
+    return get_engine('pandas').analyze_performance(tables['employees'], tables['performance_metrics'])
+
+
+# Function to get an installed engine, skipping the test otherwise
+def installed_engine(name):
+    if not ENGINES[name].available():
+        pytest.skip(f"the {name} engine is not installed")
+    return get_engine(name)
+
+
+@pytest.mark.parametrize("name", list(ENGINES))
+@pytest.mark.parametrize("operation", [
+    'merge', 'department totals', 'employee totals', 'department performance', 'filters', 'prompt digests'
+])
+def test_operation_matches_pandas(tables, rows, name, operation):
+    engine = installed_engine(name)
+    operations, _ = build_operations(tables)
+    function = operations[operation]
+
+    assert compare(function(get_engine('pandas'), rows), function(engine, rows)) is None
+
+
+def test_filter_scans_match_row_index(tables, rows):
+    operations, filters = build_operations(tables)
+    row_index = build_row_index(rows)
+    indexed = [select_rows(row_index, values, ranges) for values, ranges in filters]
+
+    assert compare(indexed, operations['filters'](get_engine('pandas'), rows)) is None
+
+
+@pytest.mark.parametrize("name", list(ENGINES))
+def test_processed_state_filters_match_pandas(tables, name):
+    engine = installed_engine(name)
+    expected = build_processed_state(tables['employees'], tables['performance_metrics'])
+    processed = build_processed_state(tables['employees'], tables['performance_metrics'], engine=engine)
+    assert (processed['row_index'] is None) == (not engine.row_index)
+
+    _, filters = build_operations(tables)
+    for values, ranges in filters:
+        expected_rows, expected_positions = filter_rows(expected, values, ranges)
+        actual_rows, actual_positions = filter_rows(processed, values, ranges)
+        assert compare(expected_positions, actual_positions) is None
+        assert compare(expected_rows, actual_rows) is None
+
+    department = tables['employees']['department'].iloc[0]
+    assert compare(filter_by_department(expected, department), filter_by_department(processed, department)) is None
+
+
+# Function to write a small database with the db.py column types and missing values
+def write_sparse_sqlite(path):
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("CREATE TABLE employees (employee_id INTEGER, name TEXT, department TEXT, join_date TEXT, "
+                     "manager_id INTEGER, notes TEXT)")
+        conn.execute("CREATE TABLE performance_metrics (employee_id INTEGER, month TEXT, year INTEGER, "
+                     "tasks_assigned INTEGER, tasks_completed INTEGER, working_hours INTEGER, bugs_fixed INTEGER, "
+                     "quality_score REAL)")
+        conn.executemany("INSERT INTO employees VALUES (?, ?, ?, ?, ?, ?)", [
+            (i, f"Employee {i}", f"Department {i % 3}", f"2020-0{i % 9 + 1}-01", None if i % 2 else 1, None)
+            for i in range(1, 40)
+        ])
+        conn.executemany("INSERT INTO performance_metrics VALUES (?, ?, ?, ?, ?, ?, ?, ?)", [
+            (i % 45, ['January', 'February'][i % 2], 2024, i % 5, i % 4, i % 7, None if i % 3 else i, i / 7)
+            for i in range(200)
+        ])
+        conn.commit()
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize("name", list(ENGINES))
+def test_merge_of_sparse_tables_matches_pandas(tmp_path, name):
+    engine = installed_engine(name)
+    db_file = str(tmp_path / "sparse.db")
+    write_sparse_sqlite(db_file)
+    stored, _ = load_data(db_file)
+
+    expected = get_engine('pandas').analyze_performance(stored['employees'], stored['performance_metrics'])
+    assert compare(expected, engine.analyze_performance(stored['employees'], stored['performance_metrics'])) is None
+
+
+@pytest.mark.parametrize("dataset", ['generated', 'sparse'])
+def test_analyze_sqlite_matches_pandas(tables, tmp_path, dataset):
+    engine = installed_engine('duckdb')
+    db_file = str(tmp_path / f"{dataset}.db")
+    if dataset == 'generated':
+        write_sqlite({name: tables[name] for name in ['employees', 'performance_metrics']}, db_file)
+    else:
+        write_sparse_sqlite(db_file)
+
+    stored, error = load_data(db_file)
+    assert error is None
+    expected = get_engine('pandas').analyze_performance(stored['employees'], stored['performance_metrics'])
+
+    assert compare(expected, engine.analyze_sqlite(db_file)) is None
+    assert compare(expected, engine.analyze_sqlite(db_file, tables=stored)) is None
+
+
+def test_analyze_sqlite_feeds_processed_state(tables, tmp_path):
+    engine = installed_engine('duckdb')
+    db_file = str(tmp_path / "processed.db")
+    write_sqlite({name: tables[name] for name in ['employees', 'performance_metrics']}, db_file)
+    stored, _ = load_data(db_file)
+
+    expected = build_processed_state(stored['employees'], stored['performance_metrics'])
+    processed = build_processed_state(stored['employees'], stored['performance_metrics'], engine=engine,
+                                      performance_data=engine.analyze_sqlite(db_file))
+    for key in ['performance_data', 'dept_performance', 'employee_summary']:
+        assert compare(expected[key], processed[key]) is None
+    assert np.array_equal(expected['employee_index'].index, processed['employee_index'].index)
+    pd.testing.assert_frame_equal(expected['cube'], processed['cube'])